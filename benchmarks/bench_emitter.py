@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Microbenchmark: writing the LaTeX source through a LatexEmitter (one write per
+chapter) versus the former style of one f.write call per output line.
+    python benchmarks/bench_emitter.py [chapters]
+
+Both sides replay the output of rendering a generated deck, so only the way
+it reaches the file differs: the emitter is given the calls the renderer
+makes (a write per frame rendered from the templates, a line per heading
+line), the former style the same output a line at a time.
+'''
+
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from texgen import build, renderer
+
+# records the calls made to an emitter, as (indent, text): None for a blank
+# line, and an indent of None for text written as it is
+class RecordingEmitter(renderer.LatexEmitter):
+    def __init__(self, indent=0):
+        renderer.LatexEmitter.__init__(self, indent)
+        self.ops = []
+
+    def line(self, text):
+        self.ops.append((self.indent, text))
+
+    def blank(self):
+        self.ops.append((None, None))
+
+    # text rendered from the templates, already indented
+    def write(self, text):
+        self.ops.append((None, text))
+
+# returns the output lines of the calls in ops, as (indent, text), None for a blank line
+def splitLines(ops):
+    lines = []
+    for (indent, text) in ops:
+        if indent is not None or text is None:
+            lines.append((indent, text))
+            continue
+        for line in text.splitlines():
+            lines.append((None, None) if len(line) == 0 else (0, line))
+    return lines
+
+# returns a list of chapters, each a list of the calls made to the emitter
+def recordChapters(chapterCount):
+    paragraph = "3. Joseph said unto his brethren, Come near to me, I pray you. And they came near. [Gen 45:4]\n"
+    deckRenderer = renderer.Renderer(renderer.Config()).prepare()
+    chapters = []
+    for ch in range(1, chapterCount + 1):
+        lines = ["1. Chapter {0}: Joseph makes himself known\n".format(ch)]
+        for slide in range(1, 21):
+            lines.append("   1. Slide {0}\n".format(slide))
+            for p in range(slide % 4):
+                lines.append("      " + paragraph)
+        out = RecordingEmitter(renderer.texBodyIndent)
+        tokens = renderer.tokenizeLines(lines, renderer.indentationMark)
+        renderer.emitSlides(out, deckRenderer, renderer.paginateSlides(renderer.assembleSlides(tokens), deckRenderer))
+        chapters.append(out.ops)
+    return chapters
+
+def main():
+    chapterCount = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    chapters = recordChapters(chapterCount)
+    chapterLines = [splitLines(ops) for ops in chapters]
+    LatexIndentation = renderer.LatexIndentation
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "out.tex")
+
+        def direct():
+            with open(path, "w") as f:
+                for lines in chapterLines:
+                    for (indent, text) in lines:
+                        if indent is None:
+                            f.write("\n")
+                        else:
+                            f.write(LatexIndentation[indent] + text + "\n")
+
+        def emitter():
+            with open(path, "w", encoding=build.outputEncoding, buffering=build.outputBufferSize) as f:
+                out = renderer.LatexEmitter()
+                for ops in chapters:
+                    for (indent, text) in ops:
+                        if text is None:
+                            out.blank()
+                        elif indent is None:
+                            out.write(text)
+                        else:
+                            out.indent = indent
+                            out.line(text)
+                    out.flushTo(f)
+
+        outputs = []
+        for (name, fn) in (("f.write per line", direct), ("LatexEmitter", emitter)):
+            seconds = min(timeit.repeat(fn, number=1, repeat=7))
+            size = os.path.getsize(path)
+            print("{0:>18}: {1:8.1f} ms  {2:6.1f} MB/s".format(name, 1000 * seconds, size / seconds / 1e6))
+            with open(path, encoding="utf-8") as f:
+                outputs.append(f.read())
+        if outputs[0] != outputs[1]:
+            sys.exit("the outputs differ")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Microbenchmark: the inline rules of a summary bullet applied in one re.sub
+pass, versus the former str.translate followed by one str.replace over the
+whole bullet for each ALL-CAPS word.
+    python benchmarks/bench_inline.py [words]
+
+The bullets are generated with [words] words each. The former
+boldfaceAllCaps mangled an ALL-CAPS word repeated, or inside another one
+(GOD in GODLY), so both sides must agree only on the bullets without any.
+'''
+
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from texgen import inline, renderer
+
+# the inline stage as it was before the rules, for reference
+LatexCharTable = str.maketrans(inline.LatexCharTable)
+
+def boldfaceAllCaps(str):
+    allcaps = re.findall("\\b[A-Z]{2,}\\b", str)
+    for ac in allcaps:
+        str = str.replace(ac, "\\textbf{" + ac + "}")
+    return str
+
+def formerSummary(line):
+    return boldfaceAllCaps(line.translate(LatexCharTable).strip())
+
+# returns generated bullets of about wordCount words
+def generateBullets(wordCount, bulletCount=2000):
+    words = ["Joseph", "said", "unto", "his", "brethren", "“Come", "near", "to", "me,”", "it's",
+             "LORD", "GOD", "GODLY", "PHARAOH", "JACOB", "GRAIN", "and", "the", "…"]
+    rng = random.Random(1)
+    return [" ".join(rng.choice(words) for w in range(wordCount)) for b in range(bulletCount)]
+
+def main():
+    wordCount = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    bullets = generateBullets(wordCount)
+    transform = renderer.Renderer(renderer.Config()).inlineSummary
+
+    agreed = 0
+    for bullet in bullets:
+        allcaps = re.findall("\\b[A-Z]{2,}\\b", bullet)
+        if not any(a in b for (i, a) in enumerate(allcaps) for (j, b) in enumerate(allcaps) if i != j):
+            if formerSummary(bullet) != transform(bullet):
+                sys.exit("the two disagree on: {0}".format(bullet))
+            agreed += 1
+    print("{0} bullets of {1} words, {2} without repeated ALL-CAPS words".format(len(bullets), wordCount, agreed))
+
+    for (name, fn) in (("translate + replace", formerSummary), ("one re.sub", transform)):
+        seconds = min(timeit.repeat(lambda: [fn(bullet) for bullet in bullets], number=1, repeat=7))
+        print("{0:>20}: {1:8.1f} ms  {2:8.2f} us/bullet".format(name, 1000 * seconds, 1e6 * seconds / len(bullets)))
+
+if __name__ == "__main__":
+    main()
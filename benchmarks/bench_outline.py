@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Microbenchmark: reading an outline file into an Outline, from the decoded
+text or memory-mapped, versus the former lists of (indentation, line) tuples
+read line by line, grouped by chapter.
+    python benchmarks/bench_outline.py [lines]
+
+Reports the time to read the outline and split it into chapters, the time to
+read every line back, the memory allocated by Python for the result
+(including the decoded text, if any), and the peak RSS of a process doing
+both, measured in a fresh process per reader.
+'''
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from texgen import outline, renderer
+
+# the tokenizer as it was before the Outline, for reference
+def countIndentations(textLine, indentationMark):
+    indentation = 0
+    while (textLine.startswith(indentationMark)):
+        indentation += 1
+        textLine = textLine[len(indentationMark):]
+    return (indentation, textLine)
+
+def splitChapters(tokens):
+    chapterLines = []
+    prevIndentation = 0
+    for (indentation, line) in tokens:
+        if prevIndentation > 0 and indentation == 0:
+            yield chapterLines
+            chapterLines = []
+        chapterLines.append((indentation, line))
+        prevIndentation = indentation
+    if len(chapterLines) > 0:
+        yield chapterLines
+
+def readTuples(path):
+    with open(path, encoding="utf-8") as f:
+        tokens = (countIndentations(line, renderer.indentationMark) for line in f)
+        return list(splitChapters(tokens))
+
+def readOutlineText(path):
+    with open(path, encoding="utf-8") as f:
+        return list(outline.Outline.parse(f.read(), renderer.indentationMark).chapters())
+
+def readOutlineMapped(path):
+    return list(outline.Outline.read(path, renderer.indentationMark).chapters())
+
+readers = [
+    ("(indent, line) lists", readTuples),
+    ("Outline (str)", readOutlineText),
+    ("Outline (mmap)", readOutlineMapped),
+]
+
+# returns a generated concordance-style outline of about lineCount lines
+def generateOutline(lineCount):
+    paragraph = "Joseph said unto his brethren, “Come near to me, I pray you.” And they came near… [Gen 45:4]\n"
+    lines = []
+    ch = 0
+    while len(lines) < lineCount:
+        ch += 1
+        lines.append("1. Chapter {0}: Joseph makes himself known\n".format(ch))
+        for slide in range(1, 21):
+            lines.append("   {0}. Slide {0}\n".format(slide))
+            for p in range(1, 5):
+                lines.append("      {0}. {1}".format(p, paragraph))
+                for sb in range(slide % 3):
+                    lines.append("         {0}. GRAIN and the LORD\n".format(sb + 1))
+    return "".join(lines)
+
+# returns the number of bytes allocated by fn() that are still held by its result
+def heldBytes(fn):
+    tracemalloc.start()
+    result = fn()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return current
+
+# returns the peak RSS, in bytes, of a new process reading path with the
+# reader at readerIndex (-1 for none) and iterating over every line
+def peakRss(path, readerIndex):
+    output = subprocess.run([sys.executable, __file__, "--rss", path, str(readerIndex)],
+                            check=True, capture_output=True, text=True).stdout
+    return int(output)
+
+def measureRss(path, readerIndex):
+    if readerIndex >= 0:
+        chapters = readers[readerIndex][1](path)
+        sum(len(line) for chapter in chapters for (indentation, line) in chapter)
+    # on Linux, ru_maxrss carries over the peak of the parent process across
+    # exec, so the peak of this process is read from /proc if possible
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    print(int(line.split()[1]) * 1024)
+                    return
+    except OSError:
+        pass
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+def main():
+    # map the file whatever its size
+    outline.mapSizeThreshold = 0
+    if len(sys.argv) > 1 and sys.argv[1] == "--rss":
+        measureRss(sys.argv[2], int(sys.argv[3]))
+        return
+
+    lineCount = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "outline.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(generateOutline(lineCount))
+
+        expected = readTuples(path)
+        for (name, read) in readers[1:]:
+            if [list(chapter) for chapter in read(path)] != expected:
+                sys.exit("{0} disagrees".format(name))
+
+        print("{0} lines, {1:.1f} MB".format(sum(len(chapter) for chapter in expected), os.path.getsize(path) / 1e6))
+        baseRss = peakRss(path, -1)
+        for (readerIndex, (name, read)) in enumerate(readers):
+            chapters = read(path)
+            readSeconds = min(timeit.repeat(lambda: read(path), number=1, repeat=5))
+            iterSeconds = min(timeit.repeat(lambda: [len(line) for chapter in chapters for (indentation, line) in chapter],
+                                            number=1, repeat=5))
+            held = heldBytes(lambda: read(path))
+            rss = peakRss(path, readerIndex) - baseRss
+            print("{0:>21}: read {1:7.1f} ms  iterate {2:7.1f} ms  held {3:6.1f} MB  peak RSS +{4:6.1f} MB".format(
+                  name, 1000 * readSeconds, 1000 * iterSeconds, held / 1e6, rss / 1e6))
+
+if __name__ == "__main__":
+    main()
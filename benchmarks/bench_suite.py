@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Benchmark suite: times each stage of rendering generated outlines (see
+outlinegen.py) from one chapter up to 10k slides, and compares the timings
+with a baseline.
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --sizes chapter,200 --output results.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json --threshold 0.25
+
+The stages, each timed on its own with the output of the stage before:
+  read: reading the outline file
+  tokenize: Outline.parse, counting the indentation of each line
+  trim: trimTextLine on every line (stripping numbers and bracketed notes)
+  assemble: assembleSlides, the trimming included
+  paginate: paginateSlides, applying the inline rules and fitting the paragraphs into sub slides
+  emit: emitSlides, writing the LaTeX source
+  total: rendering the outline file into the LaTeX source of the deck
+The caches of the stages are cleared before each run, and each timing is
+the fastest of at least --repeat runs (more for the short stages).
+
+With --baseline, the exit status is 1 if a stage of a size in both runs got
+slower than its baseline by more than the threshold (and by more than
+--min-delta milliseconds, so that the shortest stages do not fail on
+noise). The baseline is the --output of an earlier run on the same machine;
+benchmarks/baseline.json is one such run, to be replaced with one of your own.
+'''
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from texgen import fontmetrics, outline, renderer
+from outlinegen import generateOutline
+
+resultsFormatVersion = 1
+
+# name -> the parameters of generateOutline (the other ones are its defaults)
+sizes = {
+    "chapter": dict(chapters=1),
+    "200": dict(chapters=10),
+    "1k": dict(chapters=50),
+    "10k": dict(chapters=500),
+}
+
+stages = ("read", "tokenize", "trim", "assemble", "paginate", "emit", "total")
+
+defaultRepeat = 5
+defaultThreshold = 0.25
+defaultMinDeltaMs = 0.5
+
+# see timeStage
+minStageSeconds = 0.5
+maxStageRuns = 200
+
+def clearCaches():
+    renderer.trimTextLine.cache_clear()
+    renderer.transformLine.cache_clear()
+    fontmetrics.clearCaches()
+
+# returns the fastest of the runs of fn, in seconds, and what it returned:
+# at least repeat runs, and more while they took less than minSeconds in
+# all, so that the short stages are run often enough to see past the noise.
+# like timeit, the garbage collector is off while fn runs.
+def timeStage(fn, repeat, minSeconds=minStageSeconds):
+    best = None
+    runs = 0
+    spent = 0.0
+    while runs < repeat or (spent < minSeconds and runs < maxStageRuns):
+        clearCaches()
+        result = None
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = fn()
+            seconds = time.perf_counter() - start
+        finally:
+            gc.enable()
+        best = seconds if best is None else min(best, seconds)
+        runs += 1
+        spent += seconds
+    return (best, result)
+
+# returns the results of one size: the numbers of slides and lines, and the
+# milliseconds of each stage
+def measureSize(deckRenderer, path, repeat):
+    config = deckRenderer.config
+    timings = {}
+
+    def stage(name, fn):
+        (seconds, result) = timeStage(fn, repeat)
+        timings[name] = round(1000 * seconds, 3)
+        return result
+
+    def read():
+        with open(path, "rb") as f:
+            return f.read()
+
+    data = stage("read", read)
+    tokens = stage("tokenize", lambda: outline.Outline.parse(data, config.indentationMark))
+    stage("trim", lambda: [renderer.trimTextLine(line) for (indentation, line) in tokens])
+    slides = stage("assemble", lambda: list(renderer.assembleSlides(tokens)))
+    paginated = stage("paginate", lambda: list(renderer.paginateSlides(slides, deckRenderer)))
+
+    def emit():
+        out = renderer.LatexEmitter(config.bodyIndent)
+        renderer.emitSlides(out, deckRenderer, paginated)
+        return out.getvalue()
+
+    stage("emit", emit)
+    stage("total", lambda: renderer.renderDeck(deckRenderer, outline.Outline.read(path, config.indentationMark)))
+    return {
+        "slides": sum(1 for slide in slides if isinstance(slide, renderer.Slide)),
+        "lines": len(tokens),
+        "bytes": len(data),
+        "stages": timings,
+    }
+
+def runSuite(sizeNames, repeat):
+    deckRenderer = renderer.Renderer(renderer.Config(graphicsFolders=())).prepare()
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for name in sizeNames:
+            path = os.path.join(folder, name + ".txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(generateOutline(**sizes[name]))
+            results[name] = measureSize(deckRenderer, path, repeat)
+    return {
+        "version": resultsFormatVersion,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "sizes": results,
+    }
+
+def printResults(results):
+    print("{0:>8} {1:>7} {2:>8}  ".format("size", "slides", "lines") + " ".join("{0:>9}".format(s) for s in stages))
+    for (name, size) in results["sizes"].items():
+        print("{0:>8} {1:>7} {2:>8}  ".format(name, size["slides"], size["lines"]) +
+              " ".join("{0:>9.2f}".format(size["stages"][s]) for s in stages))
+    print("(milliseconds)")
+
+# returns the regressions of results against baseline: a list of
+# (size, stage, baseline ms, ms)
+def findRegressions(results, baseline, threshold, minDeltaMs):
+    regressions = []
+    for (name, size) in results["sizes"].items():
+        baseSize = baseline["sizes"].get(name)
+        if baseSize is None:
+            continue
+        for (stage, ms) in size["stages"].items():
+            baseMs = baseSize["stages"].get(stage)
+            if baseMs is not None and ms > baseMs * (1 + threshold) and ms - baseMs > minDeltaMs:
+                regressions.append((name, stage, baseMs, ms))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the stages of texgen on generated outlines.")
+    parser.add_argument("--sizes", type=str, default=",".join(sizes),
+                        help="the sizes to run, separated by commas, of: {0} (default: all)".format(", ".join(sizes)))
+    parser.add_argument("--repeat", type=int, default=defaultRepeat,
+                        help="the runs of each stage, the fastest counting (default: {0})".format(defaultRepeat))
+    parser.add_argument("--output", type=str, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=str, help="compare the results with this JSON file of an earlier run")
+    parser.add_argument("--threshold", type=float, default=defaultThreshold,
+                        help="the slowdown of a stage, as a fraction of its baseline, "
+                             "that counts as a regression (default: {0})".format(defaultThreshold))
+    parser.add_argument("--min-delta", type=float, default=defaultMinDeltaMs, metavar="MS",
+                        help="the least slowdown in milliseconds that counts as a regression (default: {0})".format(defaultMinDeltaMs))
+    args = parser.parse_args()
+
+    sizeNames = [name for name in args.sizes.split(",") if len(name) > 0]
+    for name in sizeNames:
+        if name not in sizes:
+            parser.error("--sizes: no such size: {0}".format(name))
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    baseline = None
+    if args.baseline is not None:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            parser.error("--baseline: {0}".format(e))
+        if baseline.get("version") != resultsFormatVersion:
+            parser.error("--baseline: not a results file of this version of the suite")
+
+    results = runSuite(sizeNames, args.repeat)
+    printResults(results)
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    if baseline is not None:
+        regressions = findRegressions(results, baseline, args.threshold, args.min_delta)
+        for (name, stage, baseMs, ms) in regressions:
+            print("regression: {0} {1}: {2:.2f} ms -> {3:.2f} ms (+{4:.0%})".format(name, stage, baseMs, ms, ms / baseMs - 1))
+        if len(regressions) > 0:
+            sys.exit(1)
+        print("no stage slower than the baseline by more than {0:.0%}".format(args.threshold))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Microbenchmark: writing regular slides from the precompiled templates versus
+the former style of one out.line call per LaTeX line.
+    python benchmarks/bench_templates.py [chapters]
+
+Both sides render the same slides of a generated deck into a LatexEmitter,
+and must produce the same text.
+'''
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from texgen import renderer
+
+# the slide writer as it was before the templates, for reference
+def lineItem(out, size, smallFont, text):
+    out.line("\\item " + ("{\\" + size + " " if smallFont else "") + text + ("}" if smallFont else ""))
+
+def lineLevel2Bullets(out, smallFont, subBullets):
+    out.indent += 1
+    out.line("\\begin{itemize}")
+    out.indent += 1
+    if len(subBullets) <= 3:
+        for sb in subBullets:
+            lineItem(out, "scriptsize", smallFont, sb)
+    else:
+        half = (len(subBullets) + 1) // 2
+        for column in (subBullets[:half], subBullets[half:]):
+            out.line("\\begin{minipage}[t]{0.4\\linewidth}")
+            out.indent += 1
+            out.line("\\vspace{-0.6\\baselineskip}")
+            for sb in column:
+                lineItem(out, "scriptsize", smallFont, sb)
+            out.indent -= 1
+            out.line("\\end{minipage}")
+    out.indent -= 1
+    out.line("\\end{itemize}")
+    out.indent -= 1
+
+def lineSubSlidesRegular(out, title, graphicsName, subSlidesParagraphics):
+    subSlideTotal = len(subSlidesParagraphics)
+    titleSuffix = ""
+    for (subSlideIndex, subSlide) in enumerate(subSlidesParagraphics, 1):
+        subSlideParas = subSlide.paragraphs
+        out.line("\\frame {")
+        out.indent += 1
+        if subSlideTotal > 1:
+            titleSuffix = " ({0}/{1})".format(subSlideIndex, subSlideTotal)
+        out.line("\\frametitle{" + title + titleSuffix + "}")
+        if len(graphicsName) > 0:
+            out.line("\\begin{minipage}[t][0.82\\textheight][c]{1.0\\textwidth}")
+            out.indent += 1
+            out.line("\\vspace{-1.2\\baselineskip}")
+            out.line("\\begin{figure}")
+            out.indent += 1
+            out.line("\\includegraphics[width=1.0\\textwidth,height=0.82\\textheight,keepaspectratio]{" + graphicsName + "}")
+            out.indent -= 1
+            out.line("\\end{figure}")
+            out.indent -= 1
+            out.line("\\end{minipage}")
+        out.line("\\begin{minipage}[t][0.18\\textheight][t]{1.0\\textwidth}")
+        out.indent += 1
+        if len(subSlideParas) > 0:
+            # the font size is chosen by the paginator (see pagination.py)
+            smallFont = subSlide.smallFont
+            if smallFont:
+                out.line("\\begin{spacing}{0.8}")
+                out.indent += 1
+            out.line("\\begin{itemize}")
+            out.indent += 1
+            for (para, subBullets) in subSlideParas:
+                lineItem(out, "footnotesize", smallFont, para)
+                if len(subBullets) > 0:
+                    lineLevel2Bullets(out, smallFont, subBullets)
+            out.indent -= 1
+            out.line("\\end{itemize}")
+            if smallFont:
+                out.line("\\end{spacing}")
+                out.indent -= 1
+        out.line("\\vfill")
+        out.indent -= 1
+        out.line("\\end{minipage}")
+        out.indent -= 1
+        out.line("}")
+        out.blank()
+
+# returns the regular slides with body text of a generated deck
+def generateSlides(deckRenderer, chapterCount):
+    paragraph = "3. Joseph said unto his brethren, Come near to me, I pray you. And they came near. [Gen 45:4]\n"
+    lines = []
+    for ch in range(1, chapterCount + 1):
+        lines.append("1. Chapter {0}: Joseph makes himself known\n".format(ch))
+        for slide in range(1, 21):
+            lines.append("   1. Slide {0}\n".format(slide))
+            for p in range(slide % 4):
+                lines.append("      " + paragraph)
+                for sb in range(slide % 6 if p == 0 else 0):
+                    lines.append("         4. Bullet {0}\n".format(sb))
+    tokens = renderer.tokenizeLines(lines, renderer.indentationMark)
+    return [s for s in renderer.paginateSlides(renderer.assembleSlides(tokens), deckRenderer)
+            if isinstance(s, renderer.RegularSlide) and len(s.subSlides) > 0]
+
+def main():
+    chapterCount = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    deckRenderer = renderer.Renderer(renderer.Config()).prepare()
+    slides = generateSlides(deckRenderer, chapterCount)
+
+    def lines():
+        out = renderer.LatexEmitter(renderer.texBodyIndent)
+        for s in slides:
+            lineSubSlidesRegular(out, s.title, s.graphicsName, s.subSlides)
+        return out.getvalue()
+
+    def templates():
+        out = renderer.LatexEmitter(renderer.texBodyIndent)
+        for s in slides:
+            renderer.generateSubSlidesRegular(out, deckRenderer, s.title, s.graphicsName, s.subSlides, s.chIndex, s.slideIndex)
+        return out.getvalue()
+
+    if lines() != templates():
+        sys.exit("the two writers disagree")
+
+    print("{0} slides".format(len(slides)))
+    for (name, fn) in (("out.line per line", lines), ("templates", templates)):
+        seconds = min(timeit.repeat(fn, number=1, repeat=7))
+        print("{0:>18}: {1:8.1f} ms  {2:8.1f} slides/ms".format(name, 1000 * seconds, len(slides) / seconds / 1000))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Generates a synthetic outline, for the benchmarks:
+    python benchmarks/outlinegen.py --chapters 50 --slides 20 -o outline.txt
+    python benchmarks/outlinegen.py --chapters 1 --caps 0.3 --brackets 0.5 | python scripts/texgen.py - > deck.tex
+
+The same parameters (and seed) always generate the same outline. Each
+chapter ends with a summary ("Takeaway") slide; the other slides have
+between 0 and --paragraphs paragraphs of about --words words, a paragraph
+having between 0 and --fan-out level-2 bullets.
+'''
+
+import argparse
+import random
+import sys
+
+# the defaults: a deck the size of a long retreat
+chapterCount = 10
+slidesPerChapter = 20
+paragraphsPerSlide = 3
+wordsPerParagraph = 18
+subBulletFanOut = 4
+bracketDensity = 0.3
+capsRatio = 0.05
+seed = 1
+
+vocabulary = ("Joseph", "said", "unto", "his", "brethren", "come", "near", "to", "me", "I", "pray", "you",
+              "and", "they", "came", "the", "famine", "was", "over", "all", "face", "of", "earth", "opened",
+              "storehouses", "sold", "Egyptians", "grain", "dream", "Pharaoh", "land", "it's", "“Come", "near,”", "…")
+capsVocabulary = ("LORD", "GOD", "GODLY", "PHARAOH", "JACOB", "GRAIN", "EGYPT")
+notes = ("[Gen 45:4]", "[ref 1]", "[note]", "[see v. 12]")
+
+# params:
+#  chapters: the number of chapters
+#  slides: the slides of each chapter, including its summary slide
+#  paragraphs: the most paragraphs (level-1 bullets) of a slide
+#  words: the average number of words of a paragraph
+#  fanOut: the most level-2 bullets of a paragraph
+#  brackets: the share of the paragraphs with a bracketed note, 0 to 1
+#  caps: the share of the words in ALL-CAPS, 0 to 1
+# returns the outline, as a str
+def generateOutline(chapters=chapterCount, slides=slidesPerChapter, paragraphs=paragraphsPerSlide,
+                    words=wordsPerParagraph, fanOut=subBulletFanOut, brackets=bracketDensity,
+                    caps=capsRatio, seed=seed):
+    rng = random.Random(seed)
+
+    def sentence(count):
+        text = " ".join(rng.choice(capsVocabulary) if rng.random() < caps else rng.choice(vocabulary)
+                        for w in range(max(1, count)))
+        if rng.random() < brackets:
+            text += " " + rng.choice(notes)
+        return text
+
+    lines = []
+    for ch in range(1, chapters + 1):
+        lines.append("1. Chapter {0}: {1}\n".format(ch, sentence(4)))
+        for slide in range(1, slides + 1):
+            if slide == slides:
+                lines.append("   {0}. Takeaway\n".format(slide))
+                for p in range(1, paragraphs + 1):
+                    lines.append("      {0}. {1}\n".format(p, sentence(words)))
+                continue
+            lines.append("   {0}. Slide {0}: {1}\n".format(slide, sentence(3)))
+            for p in range(1, rng.randint(0, paragraphs) + 1):
+                lines.append("      {0}. {1}\n".format(p, sentence(rng.randint(words // 2, words * 3 // 2))))
+                for sb in range(1, rng.randint(0, fanOut) + 1):
+                    lines.append("         {0}. {1}\n".format(sb, sentence(4)))
+    return "".join(lines)
+
+# adds the parameters of generateOutline to parser
+def addOutlineArguments(parser):
+    parser.add_argument("--chapters", type=int, default=chapterCount,
+                        help="the number of chapters (default: {0})".format(chapterCount))
+    parser.add_argument("--slides", type=int, default=slidesPerChapter,
+                        help="the slides of each chapter (default: {0})".format(slidesPerChapter))
+    parser.add_argument("--paragraphs", type=int, default=paragraphsPerSlide,
+                        help="the most paragraphs of a slide (default: {0})".format(paragraphsPerSlide))
+    parser.add_argument("--words", type=int, default=wordsPerParagraph,
+                        help="the average words of a paragraph (default: {0})".format(wordsPerParagraph))
+    parser.add_argument("--fan-out", type=int, default=subBulletFanOut,
+                        help="the most level-2 bullets of a paragraph (default: {0})".format(subBulletFanOut))
+    parser.add_argument("--brackets", type=float, default=bracketDensity,
+                        help="the share of the paragraphs with a bracketed note (default: {0})".format(bracketDensity))
+    parser.add_argument("--caps", type=float, default=capsRatio,
+                        help="the share of the words in ALL-CAPS (default: {0})".format(capsRatio))
+    parser.add_argument("--seed", type=int, default=seed,
+                        help="the seed of the random choices (default: {0})".format(seed))
+
+def outlineFromArguments(args):
+    return generateOutline(args.chapters, args.slides, args.paragraphs, args.words, args.fan_out,
+                           args.brackets, args.caps, args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates a synthetic outline.")
+    addOutlineArguments(parser)
+    parser.add_argument("-o", "--output", type=str, help="the outline file (default: standard output)")
+    args = parser.parse_args()
+    text = outlineFromArguments(args)
+    if args.output is None:
+        sys.stdout.write(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    main()
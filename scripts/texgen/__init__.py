@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+'''
+Generates the LaTeX source of a beamer deck from an outline text file.
+
+From the command line (see python texgen.py --help):
+    python texgen.py input.txt -o output.tex
+    python -m texgen input.txt -o output.tex
+    python texgen.py serve --port 8040    (see server.py)
+
+As a library:
+    import texgen
+    latex = texgen.render(open("input.txt").read())
+    texgen.render_to("input.txt", "output.tex", texgen.Config(pagination="balanced"))
+
+Importing the package does no I/O: the templates and the graphics folders of
+a Config are read when it is first rendered, and kept for the next renders
+with the same Config.
+'''
+
+import functools
+
+from .outline import Outline
+from .renderer import Config, Renderer, renderDeck
+
+__all__ = ["Config", "Renderer", "render", "render_to"]
+
+# one renderer per Config, so that repeated renders skip loading the
+# templates and scanning the graphics folders (folders that changed since are
+# listed again).
+@functools.lru_cache(maxsize=8)
+def rendererFor(config):
+    return Renderer(config)
+
+# returns the LaTeX source of the deck, as a str
+# params:
+#  source: the outline, as a str, UTF-8 bytes, or an iterable of its lines (e.g. an open file)
+#  config: a Config, or None for the defaults
+def render(source, config=None):
+    if not isinstance(source, (str, bytes)):
+        source = "".join(source)
+    renderer = rendererFor(config if config is not None else Config()).prepare()
+    return renderDeck(renderer, Outline.parse(source, renderer.config.indentationMark))
+
+# renders the outline file at sourcePath (UTF-8) into the file at path,
+# unless the file already has exactly this content.
+# returns whether the file was written
+def render_to(sourcePath, path, config=None):
+    from . import build
+    renderer = rendererFor(config if config is not None else Config()).prepare()
+    latex = renderDeck(renderer, Outline.read(sourcePath, renderer.config.indentationMark))
+    return build.writeIfChanged(path, latex)
@@ -0,0 +1,641 @@
+# -*- coding: utf-8 -*-
+
+'''
+Builds decks from outline files: renders them, in worker processes if asked
+to, reusing the chapter cache, and writes the LaTeX files (or the HTML
+previews, see preview.py, or the PDFs, see pdfbuild.py, or the slide models,
+see slidemodel.py). Also the watch and batch modes of the command line.
+'''
+
+import collections
+import contextlib
+import io
+import itertools
+import multiprocessing
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+from . import pdfbuild
+from . import preview
+from . import slidemodel
+from . import stats
+from . import watcher
+from .outline import Outline
+from .renderer import LatexEmitter, RegularSlide, chapterCacheKey, frameCount, pipelineSlides, readLines, renderChapter, \
+    renderChapterEntry, renderDeckSlides, slidesEntry, streamSlides, tokenizeLines, transformSlides, writeLatexHeading, \
+    writeLatexTailing
+
+outputEncoding = "utf-8"
+outputBufferSize = 1024 * 1024
+
+watchDebounceSeconds = 0.3
+# how long watch mode waits for another change before it numbers the pages
+# of a PDF again
+watchRenumberSeconds = 2
+
+# the outlines picked up when a folder is given to --batch
+batchOutlineExtension = ".txt"
+
+# the output formats, and the extension of their files: the LaTeX source, the
+# HTML preview, the PDF compiled a chapter at a time, or the slide model
+outputExtensions = {
+    "latex": ".tex",
+    "html": ".html",
+    "pdf": ".pdf",
+}
+outputExtensions.update(slidemodel.formats)
+
+# chapters (and the decks of a batch) are independent of each other, so they
+# can be rendered in worker processes. each worker receives the renderer once,
+# when it starts, so that this also works when the processes are spawned
+# rather than forked. it is the only state of a worker process, along with its
+# stats, which it sends back with each result (None if stats are off).
+workerRenderer = None
+
+# params:
+#  statsOptions: see stats.workerOptions
+def initWorker(renderer, statsOptions):
+    global workerRenderer
+    workerRenderer = renderer
+    if statsOptions is not None:
+        stats.enable(statsOptions)
+
+def createPool(jobs, renderer):
+    return multiprocessing.Pool(jobs, initWorker, (renderer, stats.workerOptions()))
+
+def renderChapterInWorker(lines):
+    return (renderChapter(workerRenderer, lines), stats.take())
+
+def renderChapterEntryInWorker(lines):
+    return (renderChapterEntry(workerRenderer, lines), stats.take())
+
+# writes the chapters to f in their original order, rendered by a pool of jobs processes
+def processChaptersParallel(f, renderer, outline, jobs):
+    with createPool(jobs, renderer) as pool:
+        for (text, snapshot) in stats.timed("wait", pool.imap(renderChapterInWorker, outline.chapters())):
+            stats.merge(snapshot)
+            with stats.stage("write"):
+                f.write(text)
+
+# returns the cache entry of a chapter, or None if it is missing, or if any
+# graphics it looked up now resolves differently
+def cachedChapterEntry(renderer, cache, key):
+    entry = cache.get(key) if cache is not None else None
+    if entry is not None:
+        for (chIndex, slideIndex, graphicsName) in entry["graphics"]:
+            if renderer.graphicsIndex.resolve(chIndex, slideIndex) != graphicsName:
+                return None
+    return entry
+
+# yields the cache entry of each chapter (see renderChapterEntry), in their
+# original order, one at a time. a chapter is rendered only if its cache
+# entry is missing (see cachedChapterEntry); the rest are taken from the
+# cache. without a cache (None), every chapter is rendered.
+# with one job, the chapters are taken from the outline as they are needed.
+# with several, the chapters to render are looked for first, and handed to a
+# pool of processes if there is more than one; the cached entries are read
+# again as their turn comes, rather than held until then.
+def iterChaptersCached(renderer, outline, jobs, cache):
+    salt = renderer.cacheSalt()
+    chapters = ((chapterCacheKey(salt, lines), lines) for lines in outline.chapters())
+    # whether each chapter is looked up in the cache when its turn comes:
+    # with one job, all of them are
+    lookUp = itertools.repeat(True)
+    if jobs != 1:
+        with stats.stage("cache"):
+            chapters = list(chapters)
+            lookUp = [cachedChapterEntry(renderer, cache, key) is not None for (key, lines) in chapters]
+    chapterCount = 0
+    misses = 0
+    with contextlib.ExitStack() as stack:
+        rendered = None
+        if jobs != 1 and lookUp.count(False) > 1:
+            pool = stack.enter_context(createPool(jobs, renderer))
+            rendered = pool.imap(renderChapterEntryInWorker, [lines for ((key, lines), look) in zip(chapters, lookUp) if not look])
+        for ((key, lines), look) in zip(chapters, lookUp):
+            chapterCount += 1
+            entry = None
+            if look:
+                with stats.stage("cache"):
+                    entry = cachedChapterEntry(renderer, cache, key)
+            if entry is None:
+                if rendered is not None and not look:
+                    with stats.stage("wait"):
+                        (entry, snapshot) = next(rendered)
+                    stats.merge(snapshot)
+                else:
+                    entry = renderChapterEntry(renderer, lines)
+                misses += 1
+                if cache is not None:
+                    cache.put(key, entry)
+            yield entry
+
+    if cache is not None:
+        with stats.stage("cache"):
+            cache.evict()
+    stats.count("cachedChapters", chapterCount - misses)
+
+# returns the cache entry of each chapter, see iterChaptersCached
+def renderChaptersCached(renderer, outline, jobs, cache):
+    return list(iterChaptersCached(renderer, outline, jobs, cache))
+
+# writes the chapters to f in their original order, one at a time, see
+# iterChaptersCached.
+# returns a tuple (lookups, frames): the (chIndex, slideIndex) of every slide
+# which needed graphics, and the number of frames written.
+def processChaptersCached(f, renderer, outline, jobs, cache):
+    lookups = []
+    frames = 0
+    for entry in iterChaptersCached(renderer, outline, jobs, cache):
+        with stats.stage("write"):
+            f.write(entry["latex"])
+        frames += entry["frames"]
+        lookups.extend((chIndex, slideIndex) for (chIndex, slideIndex, graphicsName) in entry["graphics"])
+    return (lookups, frames)
+
+
+def atomicTmpPath(path):
+    return "{0}.{1}.tmp".format(path, os.getpid())
+
+# opens a temporary file next to path, which replaces path once it is closed
+# without errors. a crashed run never leaves a half-written file behind.
+# params:
+#  binary: whether to open it for bytes rather than text
+@contextlib.contextmanager
+def openAtomic(path, binary=False):
+    tmpPath = atomicTmpPath(path)
+    if binary:
+        f = open(tmpPath, 'wb', buffering=outputBufferSize)
+    else:
+        f = open(tmpPath, 'w', encoding=outputEncoding, buffering=outputBufferSize)
+    try:
+        yield f
+        f.close()
+        os.replace(tmpPath, path)
+    except BaseException:
+        f.close()
+        os.remove(tmpPath)
+        raise
+
+# a text file replacing another (see openIfChanged), which compares what is
+# written with the content the file had as it goes
+class ComparingWriter:
+    # params:
+    #  f: the file written
+    #  old: the file as it was, open for reading, or None
+    def __init__(self, f, old):
+        self.f = f
+        self.old = old
+        # whether what was written so far is what old starts with
+        self.same = old is not None
+        # whether what was written differs from the content the file had,
+        # once finished
+        self.changed = None
+
+    def write(self, text):
+        self.f.write(text)
+        if self.same:
+            try:
+                self.same = self.old.read(len(text)) == text
+            except UnicodeDecodeError:
+                self.same = False
+
+    def finish(self):
+        if self.same:
+            try:
+                self.same = self.old.read(1) == ""
+            except UnicodeDecodeError:
+                self.same = False
+        self.changed = not self.same
+
+# opens the file at path ('-' for stdout) for the text written to it to
+# replace it, unless the file already has exactly this content. leaving it
+# untouched keeps its timestamp, so LaTeX build tools do not rebuild anything.
+# the content is compared a write at a time, so that neither is held in memory.
+# yields a ComparingWriter, whose changed tells, once it is closed, whether
+# the file was written.
+@contextlib.contextmanager
+def openIfChanged(path):
+    if path == "-":
+        writer = ComparingWriter(sys.stdout, None)
+        yield writer
+        writer.finish()
+        return
+    try:
+        old = open(path, encoding=outputEncoding)
+    except OSError:
+        old = None
+    tmpPath = atomicTmpPath(path)
+    f = open(tmpPath, 'w', encoding=outputEncoding, buffering=outputBufferSize)
+    try:
+        writer = ComparingWriter(f, old)
+        yield writer
+        writer.finish()
+        if old is not None:
+            old.close()
+        f.close()
+        if writer.changed:
+            os.replace(tmpPath, path)
+        else:
+            os.remove(tmpPath)
+    except BaseException:
+        if old is not None:
+            old.close()
+        f.close()
+        os.remove(tmpPath)
+        raise
+
+# writes text to the file at path ('-' for stdout), unless the file already
+# has exactly this content (see openIfChanged).
+# returns True if the file was written.
+def writeIfChanged(path, text):
+    with openIfChanged(path) as f:
+        f.write(text)
+    return f.changed
+
+# writes the deck to the file f, streaming chapter by chapter
+def streamDeck(f, renderer, outline, jobs):
+    out = LatexEmitter()
+    writeLatexHeading(out, renderer.config)
+    out.flushTo(f)
+    if jobs == 1:
+        streamSlides(f, renderer, pipelineSlides(renderer, outline), renderer.config.bodyIndent)
+    else:
+        processChaptersParallel(f, renderer, outline, jobs)
+    writeLatexTailing(out)
+    out.flushTo(f)
+
+# the lines of an outline read from a text stream (e.g. stdin) as they come,
+# rather than as a whole. it is read once: as (indentation, line) tuples (see
+# tokenizeLines), or as chapters, each a list of them. the lines are counted
+# in the stats once they are all read.
+class StreamedOutline:
+    def __init__(self, f, indentationMark):
+        self.f = f
+        self.indentationMark = indentationMark
+        self.lineCount = 0
+
+    def __iter__(self):
+        try:
+            for token in stats.timed("read", tokenizeLines(readLines(self.f), self.indentationMark)):
+                self.lineCount += 1
+                yield token
+        except UnicodeDecodeError as e:
+            raise ValueError("the input is not valid UTF-8 after line {0}: {1}".format(self.lineCount, e.reason)) from None
+        stats.count("lines", self.lineCount)
+
+    # yields the chapters, split by the rule of Outline.chapters
+    def chapters(self):
+        chapter = []
+        for (indentation, line) in self:
+            if indentation == 0 and len(chapter) > 0 and chapter[-1][0] > 0:
+                yield chapter
+                chapter = []
+            chapter.append((indentation, line))
+        if len(chapter) > 0:
+            yield chapter
+
+# reads the outline file at inputPath ('-' for stdin), as UTF-8.
+# params:
+#  streamed: whether stdin may be read as it is rendered (see StreamedOutline),
+#    which only one process can do
+def readOutline(inputPath, indentationMark, mapped, streamed=False):
+    if inputPath == "-":
+        if streamed:
+            # (lines end with "\n" only, as in an Outline; and the BOM is dropped)
+            stdin = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="\n")
+            return StreamedOutline(stdin, indentationMark)
+        return Outline.parse(sys.stdin.buffer.read(), indentationMark)
+    return Outline.read(inputPath, indentationMark, mapped)
+
+# renders the input file into the output file, streaming it chapter by chapter.
+# with a cache (or buffered set), the file is only replaced if it changed.
+# an input file with the extension of a slide model (see slidemodel.formats)
+# is read as one, and rendered with the pagination it records.
+# returns a BuildResult: whether the output was written, the (chIndex, slideIndex)
+# of every slide which needed graphics, and the number of frames (both None if streamed).
+# params:
+#  mapped: whether a large input file may be memory-mapped (see Outline.read)
+#  outputFormat: one of outputExtensions. the HTML preview and the slide
+#    model are always rendered in this process, without the cache, and have
+#    the lookups and frames; so does the PDF, with the cache.
+#  compiler: the PdfCompiler of the PDF
+BuildResult = collections.namedtuple("BuildResult", ["changed", "lookups", "frames"])
+
+def buildDeck(renderer, inputPath, outputPath, jobs, cache, buffered, mapped=True, outputFormat="latex", compiler=None):
+    if inputPath != "-" and slidemodel.formatOf(inputPath) is not None:
+        return buildFromModel(renderer, inputPath, outputPath, jobs, outputFormat, compiler)
+    with stats.stage("read"):
+        outline = readOutline(inputPath, renderer.config.indentationMark, mapped, jobs == 1)
+    if isinstance(outline, Outline):
+        stats.count("lines", len(outline))
+    if outputFormat == "html":
+        return buildPreview(renderer, list(pipelineSlides(renderer, outline)), outputPath)
+    if outputFormat == "pdf":
+        return compilePdf(renderer, renderChaptersCached(renderer, outline, jobs, cache), outputPath, jobs, compiler)
+    if outputFormat in slidemodel.formats:
+        return exportModel(pipelineSlides(renderer, outline, plainText=True), outputPath, outputFormat)
+
+    changed = True
+    lookups = None
+    frames = None
+    if cache is None and not buffered:
+        if outputPath == "-":
+            streamDeck(sys.stdout, renderer, outline, jobs)
+        else:
+            with openAtomic(outputPath) as fout:
+                streamDeck(fout, renderer, outline, jobs)
+    else:
+        out = LatexEmitter()
+        with openIfChanged(outputPath) as f:
+            writeLatexHeading(out, renderer.config)
+            out.flushTo(f)
+            (lookups, frames) = processChaptersCached(f, renderer, outline, jobs, cache)
+            writeLatexTailing(out)
+            out.flushTo(f)
+        changed = f.changed
+
+    return BuildResult(changed, lookups, frames)
+
+# renders the slide model at inputPath (see buildDeck), without the cache
+def buildFromModel(renderer, inputPath, outputPath, jobs, outputFormat, compiler):
+    with stats.stage("read"):
+        chapters = list(slidemodel.readChapters(inputPath))
+    if outputFormat in slidemodel.formats:
+        return exportModel(slidemodel.pipelineSlidesOf(chapters), outputPath, outputFormat)
+    if outputFormat == "html":
+        return buildPreview(renderer, list(transformSlides(slidemodel.pipelineSlidesOf(chapters), renderer)), outputPath)
+    if outputFormat == "pdf":
+        entries = [slidesEntry(renderer, list(transformSlides(slidemodel.pipelineSlidesOf([chapter]), renderer)))
+                   for chapter in chapters]
+        return compilePdf(renderer, entries, outputPath, jobs, compiler)
+
+    slides = list(transformSlides(slidemodel.pipelineSlidesOf(chapters), renderer))
+    text = renderDeckSlides(renderer, slides)
+    with stats.stage("write"):
+        changed = writeIfChanged(outputPath, text)
+    lookups = [(slide.chIndex, slide.slideIndex) for slide in slides if isinstance(slide, RegularSlide)]
+    return BuildResult(changed, lookups, sum(frameCount(slide) for slide in slides))
+
+# writes the slides to the file at outputPath ('-' for stdout) as a slide
+# model in modelFormat, streaming chapter by chapter
+def exportModel(slides, outputPath, modelFormat):
+    lookups = []
+    frames = 0
+
+    def tally(slides):
+        nonlocal frames
+        for slide in slides:
+            if isinstance(slide, RegularSlide):
+                lookups.append((slide.chIndex, slide.slideIndex))
+            frames += frameCount(slide)
+            yield slide
+
+    chapters = slidemodel.buildChapters(tally(slides))
+    binary = modelFormat != "jsonl"
+    with stats.stage("write"):
+        if outputPath == "-":
+            slidemodel.writeChapters(sys.stdout.buffer if binary else sys.stdout, chapters, modelFormat)
+        else:
+            with openAtomic(outputPath, binary) as f:
+                slidemodel.writeChapters(f, chapters, modelFormat)
+    return BuildResult(True, lookups, frames)
+
+# writes the HTML preview of the slides to the file at outputPath ('-' for stdout)
+# params:
+#  slides: a list of ChapterTitleSlide, SummarySlide and RegularSlide
+def buildPreview(renderer, slides, outputPath):
+    folder = os.path.dirname(outputPath) if outputPath != "-" else ""
+    text = preview.renderPreview(renderer, slides, folder or ".")
+    with stats.stage("write"):
+        changed = writeIfChanged(outputPath, text)
+    lookups = [(slide.chIndex, slide.slideIndex) for slide in slides if isinstance(slide, RegularSlide)]
+    return BuildResult(changed, lookups, sum(frameCount(slide) for slide in slides))
+
+# compiles the chapters into the PDF at outputPath, see PdfCompiler.build.
+# the graphics are preprocessed, if compiler has an ImageCache, before the
+# fragments showing them are compiled.
+# params:
+#  entries: the chapter cache entry of each chapter (see renderChaptersCached)
+def compilePdf(renderer, entries, outputPath, jobs, compiler):
+    lookups = [(chIndex, slideIndex) for entry in entries for (chIndex, slideIndex, graphicsName) in entry["graphics"]]
+    if compiler.imageCache is not None:
+        preprocessGraphics(renderer, compiler.imageCache, lookups)
+    changed = compiler.build(renderer, entries, outputPath, jobs)
+    return BuildResult(changed, lookups, sum(entry["frames"] for entry in entries))
+
+# makes sure the graphics referenced by the deck have up-to-date resized copies
+# params:
+#  lookups: the (chIndex, slideIndex) of every slide which needed graphics
+def preprocessGraphics(renderer, imageCache, lookups):
+    sourcePaths = set()
+    for (chIndex, slideIndex) in lookups:
+        path = renderer.graphicsIndex.resolvePath(chIndex, slideIndex)
+        if path is not None:
+            sourcePaths.add(path)
+    (converted, failed) = imageCache.update(sorted(sourcePaths))
+    if converted > 0:
+        print("texgen: resized {0} graphics into {1}".format(converted, imageCache.outputFolder), file=sys.stderr)
+    for (path, error) in failed:
+        print("texgen: failed to resize {0}: {1}".format(path, error), file=sys.stderr)
+
+def printGraphicsReport(report):
+    for (chIndex, (missing, extra)) in report.items():
+        line = "chapter {0}:".format(chIndex)
+        if len(missing) > 0:
+            line += " missing graphics for slides " + ", ".join(str(i) for i in missing) + ";"
+        if len(extra) > 0:
+            line += " unused graphics for slides " + ", ".join(str(i) for i in extra) + ";"
+        print(line[:-1], file=sys.stderr)
+
+# compiles the LaTeX file at texPath with buildCommand, run from its folder
+def runLatexBuild(buildCommand, texPath):
+    cmd = shlex.split(buildCommand) + [os.path.basename(texPath)]
+    return subprocess.run(cmd, cwd=os.path.dirname(texPath) or ".").returncode
+
+# stays resident, rebuilding the output whenever the input file or the set of
+# files in graphicsFolders changes. the graphics index is kept up to date from
+# the watcher events rather than rescanned. a graphics file of the deck written
+# in place leaves the LaTeX source as it is, but the graphics are preprocessed
+# and the output compiled again. with reportStats, the stats (see stats.py) of
+# each rebuild are printed.
+def watchDeck(renderer, inputPath, outputPath, jobs, cache, imageCache, buildCommand, reportStats=False,
+              outputFormat="latex", compiler=None):
+    graphicsFolders = renderer.config.graphicsFolders
+    graphicsIndex = renderer.graphicsIndex
+    w = watcher.createWatcher()
+    w.watchFile(inputPath)
+    folders = {}  # normalized path -> the folder as given in graphicsFolders
+    for folder in graphicsFolders:
+        if os.path.isdir(folder):
+            w.watchFolder(folder)
+            folders[os.path.normpath(folder)] = folder
+    print("texgen: watching {0} and {1} ({2})".format(inputPath, ", ".join(graphicsFolders), type(w).__name__), file=sys.stderr)
+
+    if reportStats and stats.active is not None:
+        # the report is of each rebuild, not of the start
+        stats.active.clear()
+    rebuild = True
+    graphicsChanged = False
+    try:
+        while True:
+            if rebuild:
+                start = time.monotonic()
+                try:
+                    # the input is being edited, and may be truncated at any time
+                    result = buildDeck(renderer, inputPath, outputPath, jobs, cache, True, mapped=False,
+                                       outputFormat=outputFormat, compiler=compiler)
+                    changed = result.changed
+                    if imageCache is not None and outputFormat != "pdf":
+                        preprocessGraphics(renderer, imageCache, result.lookups)
+                except (OSError, ValueError, pdfbuild.CompileError) as e:
+                    # e.g. the input is being saved right now, or is malformed. wait for the next save.
+                    print("texgen: failed to build {0}: {1!r}".format(outputPath, e), file=sys.stderr)
+                    changed = False
+                print("texgen: {0} {1} in {2:.0f} ms".format("wrote" if changed else "unchanged", outputPath,
+                      1000 * (time.monotonic() - start)), file=sys.stderr)
+                if reportStats and stats.active is not None:
+                    stats.active.report(sys.stderr, outputPath, time.monotonic() - start)
+                    stats.active.clear()
+                if (changed or graphicsChanged) and buildCommand is not None and outputPath != "-":
+                    runLatexBuild(buildCommand, outputPath)
+
+            # wait for a change, then keep collecting until things have been
+            # quiet for a moment, so that a burst of saves results in one rebuild.
+            # the page numbers the last PDF build left out of date (see
+            # pdfbuild.py) are brought up to date once things are quiet.
+            if outputFormat == "pdf" and compiler.outdatedFragments > 0:
+                events = w.read(watchRenumberSeconds)
+                if len(events) == 0:
+                    rebuild = True
+                    graphicsChanged = False
+                    continue
+            else:
+                events = w.read()
+            while True:
+                more = w.read(watchDebounceSeconds)
+                if len(more) == 0:
+                    break
+                events += more
+
+            rebuild = False
+            graphicsChanged = False
+            for event in events:
+                if os.path.normpath(event.path) == os.path.normpath(inputPath):
+                    rebuild = True
+                    continue
+                folder = folders.get(os.path.normpath(os.path.dirname(event.path)))
+                if folder is None:
+                    continue
+                name = os.path.basename(event.path)
+                if event.removed:
+                    rebuild = graphicsIndex.removeFile(folder, name) or rebuild
+                elif graphicsIndex.addFile(folder, name):
+                    rebuild = True
+                elif graphicsIndex.isResolved(folder, name) or \
+                        os.path.splitext(name)[0] == renderer.config.placeholderGraphics:
+                    # written in place
+                    rebuild = True
+                    graphicsChanged = True
+    except KeyboardInterrupt:
+        pass
+    finally:
+        w.close()
+
+# reads the decks of a batch: every outline (*.txt) in a folder, or the decks
+# listed in a manifest file, one per line as
+#     inputs/Genesis_41-50.txt [latex/Genesis_41-50.tex]
+# with the paths relative to the manifest, and # starting a comment. a deck
+# without an output file is written to outputFolder, or if that is None, next
+# to its outline, with the extension outputExtension.
+# returns a list of (inputPath, outputPath).
+def readBatch(path, outputFolder, outputExtension=outputExtensions["latex"]):
+    decks = []
+    if os.path.isdir(path):
+        for filename in sorted(os.listdir(path)):
+            if os.path.splitext(filename)[1] == batchOutlineExtension:
+                decks.append((os.path.join(path, filename), None))
+    else:
+        folder = os.path.dirname(path)
+        with open(path, encoding="utf-8") as f:
+            for (lineIndex, line) in enumerate(f, 1):
+                fields = shlex.split(line, comments=True)
+                if len(fields) == 0:
+                    continue
+                if len(fields) > 2:
+                    raise ValueError("{0}:{1}: expected an input file and an optional output file".format(path, lineIndex))
+                fields = [os.path.join(folder, field) for field in fields]
+                decks.append((fields[0], fields[1] if len(fields) > 1 else None))
+
+    result = []
+    for (inputPath, outputPath) in decks:
+        if outputPath is None:
+            filename = os.path.splitext(os.path.basename(inputPath))[0] + outputExtension
+            outputPath = os.path.join(outputFolder if outputFolder is not None else os.path.dirname(inputPath), filename)
+        result.append((inputPath, outputPath))
+    return result
+
+# builds one deck of a batch.
+# returns a tuple (result, seconds, error): the BuildResult (None if it failed), and the error message
+def buildBatchDeck(renderer, job):
+    (inputPath, outputPath, cache, outputFormat) = job
+    start = time.monotonic()
+    result = None
+    error = None
+    try:
+        result = buildDeck(renderer, inputPath, outputPath, 1, cache, True, outputFormat=outputFormat)
+    except (OSError, ValueError) as e:
+        error = repr(e)
+    return (result, time.monotonic() - start, error)
+
+def buildBatchDeckInWorker(job):
+    return (buildBatchDeck(workerRenderer, job), stats.take())
+
+# builds every deck of a batch, several at a time, in one process each. the
+# graphics index is scanned once and shared by all of them, so a batch takes
+# about as long as its slowest deck, given enough CPUs. the largest outlines
+# are started first, so that they do not end up last.
+# returns the tuple (result, seconds, error) of each deck (see buildBatchDeck), in the order of decks.
+def buildBatch(renderer, decks, jobs, cache, outputFormat="latex"):
+    for (inputPath, outputPath) in decks:
+        folder = os.path.dirname(outputPath)
+        if len(folder) > 0:
+            os.makedirs(folder, exist_ok=True)
+
+    order = list(range(len(decks)))
+    order.sort(key=lambda i: -os.path.getsize(decks[i][0]) if os.path.isfile(decks[i][0]) else 0)
+    work = [(decks[i][0], decks[i][1], cache, outputFormat) for i in order]
+
+    processes = min(jobs or os.cpu_count() or 1, len(decks))
+    if processes <= 1:
+        outcomes = [buildBatchDeck(renderer, job) for job in work]
+    else:
+        with createPool(processes, renderer) as pool, stats.stage("wait"):
+            results = pool.map(buildBatchDeckInWorker, work, chunksize=1)
+        outcomes = []
+        for (outcome, snapshot) in results:
+            stats.merge(snapshot)
+            outcomes.append(outcome)
+
+    result = [None] * len(decks)
+    for (i, outcome) in zip(order, outcomes):
+        result[i] = outcome
+    return result
+
+def printBatchSummary(decks, outcomes, seconds):
+    frames = 0
+    failed = 0
+    for ((inputPath, outputPath), (result, deckSeconds, error)) in zip(decks, outcomes):
+        if result is None:
+            failed += 1
+            print("texgen: {0:8.0f} ms  {1:13}  failed    {2}: {3}".format(1000 * deckSeconds, "", inputPath, error), file=sys.stderr)
+            continue
+        frames += result.frames
+        print("texgen: {0:8.0f} ms  {1:6d} frames  {2} {3}".format(1000 * deckSeconds, result.frames,
+              "wrote    " if result.changed else "unchanged", outputPath), file=sys.stderr)
+    print("texgen: {0:8.0f} ms  {1:6d} frames  {2} decks built{3}".format(1000 * seconds, frames, len(decks) - failed,
+          ", {0} failed".format(failed) if failed > 0 else ""), file=sys.stderr)
+
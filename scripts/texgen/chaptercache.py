@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+'''
+An on-disk cache of rendered chapters. Each entry is a small JSON file named
+after the hash of whatever the rendering depends on, e.g.
+    .texgen-cache/3f2a...e1.json
+The least recently used entries are removed once the cache grows past its
+size limit.
+
+A long-running process can put a MemoryChapterCache in front of it, which
+keeps the recently used entries in memory and may be shared by threads.
+'''
+
+import collections
+import hashlib
+import json
+import os
+import threading
+
+# bump this whenever the layout of the cache entries changes
+cacheFormatVersion = 2
+
+# returns the hex digest of a list of strings, each one terminated so that
+# ["ab", "c"] and ["a", "bc"] hash differently
+def hashStrings(strings):
+    h = hashlib.sha256()
+    for s in strings:
+        h.update(s.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ChapterCache:
+    # params:
+    #  folder: where the entries are stored; created on the first write
+    #  sizeLimit: the maximum total size of the entries, in bytes
+    def __init__(self, folder, sizeLimit):
+        self.folder = folder
+        self.sizeLimit = sizeLimit
+        self.hits = 0
+        self.misses = 0
+
+    def entryPath(self, key):
+        return os.path.join(self.folder, key + ".json")
+
+    # returns the entry stored under key, or None
+    def get(self, key):
+        path = self.entryPath(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if entry.get("version") != cacheFormatVersion:
+            self.misses += 1
+            return None
+        # refresh the timestamp, which is what the eviction goes by
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry
+
+    # stores entry (a dict that can be serialized to JSON) under key
+    def put(self, key, entry):
+        os.makedirs(self.folder, exist_ok=True)
+        entry = dict(entry, version=cacheFormatVersion)
+        path = self.entryPath(key)
+        # write to a temporary file first, so that a crashed run never leaves
+        # a truncated entry behind
+        tmpPath = "{0}.{1}.{2}.tmp".format(path, os.getpid(), threading.get_ident())
+        with open(tmpPath, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmpPath, path)
+
+    # removes the least recently used entries until the cache fits in sizeLimit
+    def evict(self):
+        entries = []
+        totalSize = 0
+        try:
+            with os.scandir(self.folder) as it:
+                for e in it:
+                    if not e.name.endswith(".json") or not e.is_file():
+                        continue
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+                    totalSize += st.st_size
+        except FileNotFoundError:
+            return
+        if totalSize <= self.sizeLimit:
+            return
+        entries.sort()
+        for (mtime, size, path) in entries:
+            if totalSize <= self.sizeLimit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            totalSize -= size
+
+
+class MemoryChapterCache:
+    # params:
+    #  sizeLimit: the maximum total size of the LaTeX source of the entries, in characters
+    #  backing: a ChapterCache consulted on a miss, and updated by put, or None
+    def __init__(self, sizeLimit, backing=None):
+        self.sizeLimit = sizeLimit
+        self.backing = backing
+        self.entries = collections.OrderedDict()  # key -> entry, least recently used first
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        if self.backing is None:
+            return None
+        entry = self.backing.get(key)
+        if entry is not None:
+            self.store(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        self.store(key, entry)
+        if self.backing is not None:
+            self.backing.put(key, entry)
+
+    def store(self, key, entry):
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous["latex"])
+            self.entries[key] = entry
+            self.size += len(entry["latex"])
+            while self.size > self.sizeLimit and len(self.entries) > 1:
+                (oldKey, old) = self.entries.popitem(last=False)
+                self.size -= len(old["latex"])
+
+    # the entries in memory are evicted as they are stored
+    def evict(self):
+        if self.backing is not None:
+            self.backing.evict()
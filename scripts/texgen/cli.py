@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+
+'''
+The command line of texgen (see the package docstring).
+'''
+
+import argparse
+import cProfile
+import os
+import shlex
+import sys
+import time
+
+from . import build
+from . import chaptercache
+from . import imagecache
+from . import pagination
+from . import pdfbuild
+from . import renderer
+from . import server
+from . import stats
+
+graphicsManifestName = "graphics-manifest.json"
+
+imageMaxSize = "1280x720"
+imageQuality = 82
+imageConvertCommand = "convert"
+
+chapterCacheFolder = ".texgen-cache"
+chapterCacheSizeLimitMB = 64
+memoryCacheSizeLimitMB = 64
+
+latexBuildCommand = "latexmk -pdf -interaction=nonstopmode"
+
+# the options of the chapter cache, shared by the subcommands
+def addCacheArguments(parser):
+    parser.add_argument("--no-cache", action="store_true",
+                        help="render every chapter, without reading or updating the chapter cache")
+    parser.add_argument("--cache-dir", type=str, default=chapterCacheFolder,
+                        help="the folder of the chapter cache (default: {0})".format(chapterCacheFolder))
+    parser.add_argument("--cache-size", type=int, default=chapterCacheSizeLimitMB,
+                        help="the size limit of the chapter cache in MB (default: {0})".format(chapterCacheSizeLimitMB))
+
+# the options that make up the Config, shared by the subcommands
+def addRenderArguments(parser):
+    parser.add_argument("--figures", action="append", metavar="FOLDER",
+                        help="a folder with the slide graphics; may be repeated (default: {0})".format(" ".join(renderer.graphicsFolders)))
+    parser.add_argument("--pagination", choices=sorted(pagination.policies), default=renderer.paginationPolicy,
+                        help="how the paragraphs of a slide are divided into sub slides: greedy fills each sub slide, "
+                             "balanced spreads the text evenly (default: {0})".format(renderer.paginationPolicy))
+    parser.add_argument("--fit", choices=pagination.fits, default=renderer.fitMeasure,
+                        help="how the text is fitted to the frames: metrics predicts its height from the font, "
+                             "chars counts its characters (default: {0})".format(renderer.fitMeasure))
+    parser.add_argument("--sub-slide-chars", type=int, default=renderer.subSlideCharLimit, metavar="N",
+                        help="with --fit chars, the characters allowed on a sub slide with several paragraphs "
+                             "(default: {0})".format(renderer.subSlideCharLimit))
+    parser.add_argument("--sub-slide-paragraphs", type=int, default=renderer.subSlideParaLimit, metavar="N",
+                        help="the paragraphs allowed on a sub slide (default: {0})".format(renderer.subSlideParaLimit))
+    parser.add_argument("--templates", type=str, metavar="FOLDER",
+                        help="a folder of slide templates, replacing the default ones of the same name")
+
+# returns the ChapterCache the arguments ask for, or None
+def openChapterCache(args):
+    if args.no_cache:
+        return None
+    return chaptercache.ChapterCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+# returns a prepared Renderer for the arguments of addRenderArguments: the
+# templates are loaded, and the graphics files collected
+def createRenderer(parser, args, cache, processedGraphicsFolder):
+    if args.sub_slide_paragraphs < 1:
+        parser.error("--sub-slide-paragraphs must be at least 1")
+    if args.templates is not None and not os.path.isdir(args.templates):
+        parser.error("--templates: no such folder: " + args.templates)
+    config = renderer.Config(
+        subSlideCharLimit=args.sub_slide_chars,
+        subSlideParaLimit=args.sub_slide_paragraphs,
+        pagination=args.pagination,
+        fit=args.fit,
+        graphicsFolders=tuple(args.figures) if args.figures is not None else renderer.graphicsFolders,
+        processedGraphicsFolder=processedGraphicsFolder,
+        templatesFolder=args.templates)
+    return renderer.Renderer(config).prepare(
+        os.path.join(args.cache_dir, graphicsManifestName) if cache is not None else None)
+
+# texgen serve: see server.py
+def serveMain(argv):
+    parser = argparse.ArgumentParser(prog="texgen serve",
+                                     description="render outlines posted to a local HTTP server")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="log every request")
+    parser.add_argument("--host", type=str, default=server.defaultHost,
+                        help="the address to listen on (default: {0})".format(server.defaultHost))
+    parser.add_argument("--port", type=int, default=server.defaultPort,
+                        help="the port to listen on, 0 for any free one (default: {0})".format(server.defaultPort))
+    parser.add_argument("--memory-cache-size", type=int, default=memoryCacheSizeLimitMB, metavar="MB",
+                        help="the size limit of the rendered chapters kept in memory, in MB of LaTeX "
+                             "(default: {0})".format(memoryCacheSizeLimitMB))
+    addCacheArguments(parser)
+    addRenderArguments(parser)
+    args = parser.parse_args(argv)
+
+    backing = openChapterCache(args)
+    cache = chaptercache.MemoryChapterCache(args.memory_cache_size * 1024 * 1024, backing)
+    service = server.RenderService(createRenderer(parser, args, backing, None), cache)
+    server.serve(service, args.host, args.port, args.verbose)
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if len(argv) > 0 and argv[0] == "serve":
+        serveMain(argv[1:])
+        return
+
+    parser = argparse.ArgumentParser(epilog="run 'texgen.py serve --help' for the HTTP server")
+    parser.add_argument("filename", type=str,
+                        help="the filename of the input text file, or '-' to read from stdin, or of a slide model "
+                             "(*.jsonl, *.slides) to render as it is; "
+                             "with --batch, a folder of outlines or a manifest listing them")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="increase output verbosity: same as --stats")
+    parser.add_argument("-o", type=str, default="-",
+                        help="the filename of output LaTeX file, or '-' to write to stdout (default); "
+                             "with --batch, the folder of the output files (default: next to each outline)")
+    parser.add_argument("--format", choices=sorted(build.outputExtensions), default="latex",
+                        help="what to write: the LaTeX source of the deck (default), an HTML preview of its frames, "
+                             "which a browser shows without running LaTeX, the PDF, compiled a chapter at a time "
+                             "on --jobs processes and only for the chapters which changed, or the slide model "
+                             "(the parsed slides, for other tools) as JSON Lines (jsonl) or binary (slides)")
+    parser.add_argument("-b", "--batch", action="store_true",
+                        help="build several decks in one run, as listed in a manifest (lines of 'input [output]') "
+                             "or found in a folder (*{0}), spreading them over the --jobs processes".format(build.batchOutlineExtension))
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="the number of processes rendering chapters (or with --batch, decks; with --format pdf, "
+                             "compiling chapters) in parallel, 0 for one per CPU "
+                             "(default: 1, or one per CPU with --batch or --format pdf)")
+    addCacheArguments(parser)
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help="keep running, and rebuild the output whenever the input or the graphics change")
+    parser.add_argument("--graphics-report", action="store_true",
+                        help="report the slides without graphics and the unused graphics of each chapter")
+    parser.add_argument("--preprocess-images", action="store_true",
+                        help="point the deck at resized copies of its graphics, kept in the cache folder, "
+                             "made on --jobs threads (default: one per CPU)")
+    parser.add_argument("--image-size", type=str, default=imageMaxSize, metavar="WxH",
+                        help="the size preprocessed graphics are scaled down to fit (default: {0})".format(imageMaxSize))
+    parser.add_argument("--image-quality", type=int, default=imageQuality,
+                        help="the JPEG quality of preprocessed graphics (default: {0})".format(imageQuality))
+    parser.add_argument("--convert", type=str, default=imageConvertCommand, metavar="COMMAND",
+                        help="the ImageMagick command used to preprocess graphics (default: {0})".format(imageConvertCommand))
+    addRenderArguments(parser)
+    parser.add_argument("--build", nargs="?", const=latexBuildCommand, default=None, metavar="COMMAND",
+                        help="in watch mode, compile the output after each change (default command: {0})".format(latexBuildCommand))
+    parser.add_argument("--latex", type=str, default=pdfbuild.latexCommand, metavar="COMMAND",
+                        help="with --format pdf, the command compiling a chapter, given its LaTeX file "
+                             "(default: {0})".format(pdfbuild.latexCommand))
+    parser.add_argument("--merge", type=str, default=pdfbuild.mergeCommand, metavar="COMMAND",
+                        help="with --format pdf, the command merging the PDFs of the chapters, given them "
+                             "and then the output file (default: {0})".format(pdfbuild.mergeCommand))
+    parser.add_argument("--stats", action="store_true",
+                        help="report the time taken by each stage, and the numbers of lines, slides, sub slides and frames "
+                             "(in watch mode, for each rebuild)")
+    parser.add_argument("--profile", type=str, metavar="FILE",
+                        help="write a profile of the run: a Chrome trace of the stages if FILE ends with .json "
+                             "(see chrome://tracing), otherwise the cProfile statistics of this process "
+                             "(see python -m pstats FILE)")
+    args = parser.parse_args(argv)
+
+    if args.watch and (args.filename == "-" or args.o == "-"):
+        parser.error("--watch needs an input file and an output file (-o)")
+    if args.batch and (args.watch or args.filename == "-"):
+        parser.error("--batch needs a folder or a manifest file, and does not support --watch")
+    if args.build is not None and args.format != "latex":
+        parser.error("--build compiles the LaTeX source, and does not support --format " + args.format)
+    if args.format == "pdf" and (args.batch or args.o == "-"):
+        parser.error("--format pdf needs an output file (-o), and does not support --batch")
+
+    reportStats = args.stats or args.verbose
+    tracePath = args.profile if args.profile is not None and args.profile.endswith(".json") else None
+    if reportStats or tracePath is not None:
+        stats.enable(tracing=tracePath is not None)
+    profiler = None
+    if args.profile is not None and tracePath is None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        buildMain(parser, args, reportStats)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print("texgen: wrote the profile to {0} (python -m pstats {0})".format(args.profile), file=sys.stderr)
+        if stats.active is not None:
+            if reportStats and not args.watch:
+                stats.active.report(sys.stderr, args.filename if args.batch or args.o == "-" else args.o,
+                                    time.perf_counter() - start)
+            if tracePath is not None:
+                stats.active.writeTrace(tracePath)
+                print("texgen: wrote the trace to {0}".format(tracePath), file=sys.stderr)
+            stats.disable()
+
+# the rest of main, once the arguments are checked
+def buildMain(parser, args, reportStats):
+    # the graphics are converted one per CPU, unless --jobs says otherwise
+    imageJobs = args.jobs if args.jobs is not None and args.jobs > 0 else None
+    if args.jobs is None:
+        args.jobs = 0 if args.batch or args.format == "pdf" else 1
+    jobs = args.jobs if args.jobs > 0 else None
+    cache = openChapterCache(args)
+
+    imageCache = None
+    if args.preprocess_images:
+        try:
+            (maxWidth, maxHeight) = (int(n) for n in args.image_size.lower().split("x"))
+        except ValueError:
+            parser.error("--image-size expects WIDTHxHEIGHT, e.g. " + imageMaxSize)
+        imageCache = imagecache.ImageCache(args.cache_dir, maxWidth, maxHeight, args.image_quality, shlex.split(args.convert),
+                                            imageJobs)
+
+    deckRenderer = createRenderer(parser, args, cache, imageCache.outputFolder if imageCache is not None else None)
+    graphicsIndex = deckRenderer.graphicsIndex
+    compiler = None
+    if args.format == "pdf":
+        compiler = pdfbuild.PdfCompiler(shlex.split(args.latex), shlex.split(args.merge), imageCache, args.watch)
+
+    if args.watch:
+        build.watchDeck(deckRenderer, args.filename, args.o, jobs, cache, imageCache, args.build, reportStats, args.format,
+                        compiler)
+        return
+
+    if args.batch:
+        try:
+            decks = build.readBatch(args.filename, None if args.o == "-" else args.o, build.outputExtensions[args.format])
+        except (OSError, ValueError) as e:
+            parser.error("--batch: {0}".format(e))
+        outputs = [os.path.normpath(outputPath) for (inputPath, outputPath) in decks]
+        if len(set(outputs)) != len(outputs):
+            parser.error("--batch: several decks are written to the same output file")
+        start = time.monotonic()
+        outcomes = build.buildBatch(deckRenderer, decks, jobs, cache, args.format)
+        build.printBatchSummary(decks, outcomes, time.monotonic() - start)
+        lookups = [lookup for (result, seconds, error) in outcomes if result is not None for lookup in result.lookups]
+        if imageCache is not None:
+            build.preprocessGraphics(deckRenderer, imageCache, lookups)
+        if args.graphics_report:
+            build.printGraphicsReport(graphicsIndex.report(lookups))
+        if any(result is None for (result, seconds, error) in outcomes):
+            sys.exit(1)
+        return
+
+    try:
+        result = build.buildDeck(deckRenderer, args.filename, args.o, jobs, cache, args.graphics_report or imageCache is not None,
+                                 outputFormat=args.format, compiler=compiler)
+    except (ValueError, pdfbuild.CompileError) as e:
+        # e.g. the input is not UTF-8
+        sys.exit("texgen: {0}: {1}".format(args.filename, e))
+    if imageCache is not None and compiler is None:
+        build.preprocessGraphics(deckRenderer, imageCache, result.lookups)
+    if args.graphics_report:
+        build.printGraphicsReport(graphicsIndex.report(result.lookups))
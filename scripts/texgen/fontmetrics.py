@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+'''
+Predicts the height of the text of a sub slide from the widths of the glyphs,
+so that the paginator can tell whether it fits the 0.18\\textheight minipage
+of regular.tex without running LaTeX.
+
+beamer sets the text in sans serif, which \\usepackage[T1]{fontenc} (see
+writeLatexHeading) makes the EC sans, the T1 version of Computer Modern Sans.
+fonts/ecss.json holds the width of each of its glyphs, in ems of its 10pt
+design size; it is loaded once. The lines of an item are broken the way TeX
+breaks the ragged-right lines of beamer: as many words on a line as fit its
+width. The widths of the words are kept in a table, since words repeat a lot
+more than lines do; a line is measured by looking its words up. The height
+of a paragraph is its number of lines times the baseline skip.
+
+The prediction is close, not exact: kerning, ligatures and hyphenation are
+ignored, the widths of the other design sizes are scaled from the 10pt ones,
+and the geometry below assumes the default templates and the lucid theme. It
+errs on the high side, as the first line of an item is counted as a whole
+baseline skip.
+'''
+
+import bisect
+import collections
+import functools
+import itertools
+import json
+import os
+import re
+
+from . import inline
+
+widthTablePath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "ecss.json")
+
+# the paper and the text area, in points (see writeLatexHeading and the lucid theme)
+pointsPerMM = 72.27 / 25.4
+paperWidth = 160 * pointsPerMM
+paperHeight = 120 * pointsPerMM
+textMargin = 4.0                    # \setbeamersize{text margin left=4pt, text margin right=4pt}
+footlineHeight = 10 * pointsPerMM   # the footline of the lucid theme is 1cm high
+textWidth = paperWidth - 2 * textMargin
+textHeight = paperHeight - footlineHeight
+bodyHeight = 0.18 * textHeight      # the minipage of regular.tex
+
+# about the width of the label of a beamer itemize item, and the space after it
+itemIndent = 12.0
+# the space between the items of a level-1 list, and around and between the
+# items of a level-2 list
+level1ItemSep = 3.0
+level2TopSep = 2.0
+level2ItemSep = 1.5
+# the \vspace{-0.6\baselineskip} at the top of the columns of level2-columns.tex
+columnsRaise = 0.6
+# the minipages of level2-columns.tex are 0.4\linewidth wide
+columnWidthRatio = 0.4
+
+# the smaller design sizes of the EC fonts are drawn relatively wider: the
+# width of a glyph at each size, relative to the 10pt design, in ems
+designSizeScale = {8.0: 1.04, 9.0: 1.02, 10.0: 1.0, 10.95: 0.985}
+
+# a font size of the beamer class at 11pt: the size and the baseline skip, in points
+FontSize = collections.namedtuple("FontSize", ["size", "baselineSkip"])
+normalSize = FontSize(10.95, 13.6)
+smallSize = FontSize(10.0, 12.0)        # beamer sets the level-2 items in \small
+footnoteSize = FontSize(9.0, 11.0)
+scriptSize = FontSize(8.0, 9.5)
+
+# how the text of a body is set: the widths of its lines, in ems of its font,
+# and the baseline skips, in points
+#  level1Width: the line width of the level-1 items
+#  level2Width, columnWidth: of the level-2 items, in one column or in two
+BodyStyle = collections.namedtuple("BodyStyle", ["level1Width", "level1Skip", "level2Width", "columnWidth", "level2Skip"])
+
+def emsOf(points, font):
+    return points / (font.size * designSizeScale[font.size])
+
+# params:
+#  level1Font, level2Font: the fonts of the text of the items
+#  level1Outer, level2Outer: the fonts around them, which set the baseline
+#    skips: {\footnotesize ...} ends before the paragraph does, so its lines
+#    are spaced by the size the list is in
+#  stretch: the factor of the spacing environment
+def bodyStyle(level1Font, level1Outer, level2Font, level2Outer, stretch):
+    level1Line = textWidth - itemIndent
+    level2Line = level1Line - itemIndent
+    return BodyStyle(emsOf(level1Line, level1Font), level1Outer.baselineSkip * stretch,
+                     emsOf(level2Line, level2Font), emsOf(columnWidthRatio * level2Line, level2Font),
+                     level2Outer.baselineSkip * stretch)
+
+# regular-body.tex and regular-body-small.tex, by smallFont
+bodyStyles = (
+    bodyStyle(normalSize, normalSize, smallSize, smallSize, 1.0),
+    bodyStyle(footnoteSize, normalSize, scriptSize, smallSize, 0.8),
+)
+
+# the widths of the glyphs, in ems of the 10pt design: a dict, the width of
+# the glyphs it does not have, and the widest of all
+WidthTable = collections.namedtuple("WidthTable", ["widths", "defaultWidth", "maxWidth"])
+
+# stands for a tie (~), which is as wide as a space but does not break the line
+tieChar = "\u2060"  # word joiner
+
+@functools.lru_cache(maxsize=1)
+def widthTable():
+    with open(widthTablePath, encoding="utf-8") as f:
+        table = json.load(f)
+    widths = dict(table["widths"])
+    widths[tieChar] = widths[" "]
+    return WidthTable(widths, table["defaultWidth"], max(max(widths.values()), table["defaultWidth"]))
+
+# the commands of the inline rules (see inline.py) back to the characters they set
+LatexTextTable = {latex: char for (char, latex) in inline.LatexCharTable.items() if "\\" in latex}
+LatexMarkupRegex = re.compile("\\\\[a-zA-Z]+ ?|\\\\(.)|[{}]")
+
+def replaceMarkup(m):
+    if m.group(1) is not None:
+        # an escaped character, e.g. \&
+        return m.group(1)
+    # a command (e.g. \emph) or a brace: only its argument is set
+    return ""
+
+# returns the text LaTeX sets for line, roughly: the commands and braces
+# dropped, the escaped characters unescaped
+def plainText(line):
+    if "\\" not in line and "{" not in line and "~" not in line:
+        return line
+    for (latex, text) in LatexTextTable.items():
+        if latex in line:
+            line = line.replace(latex, text)
+    line = line.replace("~", tieChar)
+    if "\\" not in line and "{" not in line:
+        return line
+    return LatexMarkupRegex.sub(replaceMarkup, line)
+
+# the width of each word measured, with the space after it, in ems of the
+# 10pt design. words repeat a lot more than lines, so they are looked up in a
+# plain dict, which is emptied when it grows past wordCacheSize.
+wordCache = {}
+wordCacheSize = 65536
+
+def measureWord(word):
+    table = widthTable()
+    widths = table.widths
+    default = table.defaultWidth
+    advance = sum([widths.get(c, default) for c in word]) + widths[" "]
+    if len(wordCache) >= wordCacheSize:
+        wordCache.clear()
+    wordCache[word] = advance
+    return advance
+
+# returns the widths of the words of line (LaTeX), each with the space after
+# it, in ems of the 10pt design
+def wordAdvances(line):
+    words = plainText(line).split()
+    advances = list(map(wordCache.get, words))
+    if None in advances:
+        advances = [advance if advance is not None else measureWord(word) for (word, advance) in zip(words, advances)]
+    return advances
+
+# returns where each word of line (LaTeX) ends, from the start of the line,
+# with a space after it, in ems of the 10pt design; None if the line is
+# short enough to fit on one line lineWidth ems wide
+def wordEnds(line, lineWidth):
+    # the text LaTeX sets is never longer than the source, so a line with
+    # few enough characters fits whatever they are, and is not measured
+    if len(line) * widthTable().maxWidth <= lineWidth:
+        return None
+    return list(itertools.accumulate(wordAdvances(line)))
+
+# returns the number of lines the words ending at ends (see wordEnds, for a
+# line width no wider) are set in, lineWidth ems wide. a word wider than the
+# line sticks out of it, as TeX would.
+def countLinesOf(ends, lineWidth):
+    space = widthTable().widths[" "]
+    if ends is None or len(ends) <= 1 or ends[-1] <= lineWidth + space:
+        return 1
+    # the words of a line are those ending before it does: a line break is
+    # looked for once per line rather than once per word
+    lines = 1
+    start = 0.0
+    first = 0
+    while True:
+        stop = bisect.bisect_right(ends, start + lineWidth + space, first)
+        if stop == first:
+            stop += 1
+        if stop >= len(ends):
+            return lines
+        lines += 1
+        start = ends[stop - 1]
+        first = stop
+
+# returns the height of a level-1 item in the style (see bodyStyles), with
+# the level-2 items under it and the space after it, in points.
+# params:
+#  paraEnds, subBulletEnds: the wordEnds of the item and of its level-2 items
+#  singleColumnMax: the level-2 items are set in two columns if there are more
+def itemHeight(style, paraEnds, subBulletEnds, singleColumnMax):
+    height = countLinesOf(paraEnds, style.level1Width) * style.level1Skip + level1ItemSep
+    if len(subBulletEnds) == 0:
+        return height
+    height += level2TopSep
+    if len(subBulletEnds) <= singleColumnMax:
+        lines = sum([countLinesOf(ends, style.level2Width) for ends in subBulletEnds])
+        return height + lines * style.level2Skip + (len(subBulletEnds) - 1) * level2ItemSep
+    half = (len(subBulletEnds) + 1) // 2
+    left = sum([countLinesOf(ends, style.columnWidth) for ends in subBulletEnds[:half]])
+    right = sum([countLinesOf(ends, style.columnWidth) for ends in subBulletEnds[half:]])
+    return height + (max(left, right) - columnsRaise) * style.level2Skip + (half - 1) * level2ItemSep
+
+# returns the heights of a level-1 item (see itemHeight) in the regular and
+# in the small font. its words are measured once, for the narrower of the
+# lines of the two fonts.
+def paragraphHeights(para, subBullets, singleColumnMax):
+    paraEnds = wordEnds(para, min([style.level1Width for style in bodyStyles]))
+    if len(subBullets) <= singleColumnMax:
+        level2Width = min([style.level2Width for style in bodyStyles])
+    else:
+        level2Width = min([style.columnWidth for style in bodyStyles])
+    subBulletEnds = [wordEnds(sb, level2Width) for sb in subBullets]
+    return tuple([itemHeight(style, paraEnds, subBulletEnds, singleColumnMax) for style in bodyStyles])
+
+
+# the body of a regular slide, as the paginator measures it (see pagination.py)
+class BodyModel:
+    # params:
+    #  singleColumnMax: the most level-2 items set in a single column (see renderLevel2Bullets)
+    def __init__(self, singleColumnMax):
+        self.singleColumnMax = singleColumnMax
+        self.bodyHeight = bodyHeight
+        # the heights of the paragraphs include the space after each, which
+        # the last one does not need
+        self.room = bodyHeight + level1ItemSep
+
+    # returns the heights of a paragraph in the regular and in the small font,
+    # the space after it included
+    def heights(self, para, subBullets):
+        return paragraphHeights(para, subBullets, self.singleColumnMax)
+
+    # returns the height of the paragraphs of a body, given their heights in its font
+    def bodyHeightFrom(self, heights):
+        return sum(heights) - level1ItemSep
+
+def clearCaches():
+    wordCache.clear()
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+'''
+An index of the slide graphics, keyed by (chapter, slide) as parsed from the
+file names, e.g. "figures/Gen01_03.jpg" -> (1, 3).
+
+Each figure folder is listed with a single os.scandir pass. The listings can
+be saved to a manifest file, which is reused as long as the modification
+time of the folder is unchanged (adding, removing or renaming a file updates
+it). The same check lets a long-running process refresh the index cheaply.
+'''
+
+import json
+import os
+import re
+
+GraphicsNameRegex = re.compile("^Gen(\\d+)_(\\d+)$")
+
+manifestFormatVersion = 1
+
+
+class GraphicsIndex:
+    # params:
+    #  roots: the figure folders, in the order LaTeX searches them (\graphicspath)
+    #  extensions: the lower-case extensions LaTeX looks for, in the order it
+    #    tries them (\DeclareGraphicsExtensions)
+    def __init__(self, roots, extensions):
+        self.roots = list(roots)
+        self.extensions = list(extensions)
+        self.files = {}  # (chIndex, slideIndex) -> [(priority, graphics name)], best first
+        self.listings = {}  # root -> (mtime, [filenames]) as of the last scan
+
+    def parseFileName(self, filename):
+        (stem, ext) = os.path.splitext(filename)
+        if ext.lower() not in self.extensions:
+            return None
+        m = GraphicsNameRegex.match(stem)
+        if m is None:
+            return None
+        return (int(m.group(1)), int(m.group(2)))
+
+    # LaTeX finds "Gen01_03" given a declared extension, but needs the whole
+    # file name for any other spelling, e.g. "Gen01_03.JPG".
+    def graphicsName(self, filename):
+        (stem, ext) = os.path.splitext(filename)
+        return stem if ext in self.extensions else filename
+
+    # when a slide has several files, the one LaTeX would pick wins. graphicx
+    # tries each declared extension in turn, searching all the roots for it,
+    # so the extension ranks before the root. other spellings come last.
+    def priority(self, root, filename):
+        (stem, ext) = os.path.splitext(filename)
+        extRank = self.extensions.index(ext) if ext in self.extensions else len(self.extensions)
+        return (extRank, self.roots.index(root), filename)
+
+    # returns True if the graphics resolved for the slide of this file changed
+    def addFile(self, root, filename):
+        key = self.parseFileName(filename)
+        if key is None:
+            return False
+        candidates = self.files.setdefault(key, [])
+        entry = (self.priority(root, filename), self.graphicsName(filename))
+        if entry in candidates:
+            return False
+        prevBest = candidates[0] if len(candidates) > 0 else None
+        candidates.append(entry)
+        candidates.sort()
+        return candidates[0] != prevBest
+
+    # returns True if the graphics resolved for the slide of this file changed
+    def removeFile(self, root, filename):
+        key = self.parseFileName(filename)
+        if key is None or key not in self.files:
+            return False
+        candidates = self.files[key]
+        entry = (self.priority(root, filename), self.graphicsName(filename))
+        if entry not in candidates:
+            return False
+        wasBest = candidates[0] == entry
+        candidates.remove(entry)
+        if len(candidates) == 0:
+            del self.files[key]
+        return wasBest
+
+    # returns True if the file is the one resolved for its slide, so that a
+    # change to its content changes the deck
+    def isResolved(self, root, filename):
+        key = self.parseFileName(filename)
+        if key is None or key not in self.files:
+            return False
+        return self.files[key][0] == (self.priority(root, filename), self.graphicsName(filename))
+
+    # returns the name to pass to \includegraphics for a slide, or None
+    def resolve(self, chIndex, slideIndex):
+        candidates = self.files.get((chIndex, slideIndex))
+        if candidates is None:
+            return None
+        return candidates[0][1]
+
+    # returns the path of the file resolve() picks for a slide, or None
+    def resolvePath(self, chIndex, slideIndex):
+        candidates = self.files.get((chIndex, slideIndex))
+        if candidates is None:
+            return None
+        (extRank, rootIndex, filename) = candidates[0][0]
+        return os.path.join(self.roots[rootIndex], filename)
+
+    # returns the path of the file LaTeX finds for name, e.g. "placeholder",
+    # searching the roots for each extension in turn (see priority); or None.
+    # unlike resolve, this looks at the file system.
+    def findFile(self, name):
+        candidates = [name] if os.path.splitext(name)[1] in self.extensions else \
+                     [name + ext for ext in self.extensions]
+        for candidate in candidates:
+            for root in self.roots:
+                path = os.path.join(root, candidate)
+                if os.path.isfile(path):
+                    return path
+        return None
+
+    def listRoot(self, root):
+        filenames = []
+        try:
+            with os.scandir(root) as it:
+                for e in it:
+                    if self.parseFileName(e.name) is not None and e.is_file():
+                        filenames.append(e.name)
+        except FileNotFoundError:
+            pass
+        return filenames
+
+    # fills the index. with a manifest path, the listing of each root is taken
+    # from the manifest if the root has not been modified since; the manifest
+    # is then updated for the next run.
+    def scan(self, manifestPath=None):
+        manifest = {}
+        if manifestPath is not None:
+            try:
+                with open(manifestPath, encoding="utf-8") as f:
+                    manifest = json.load(f)
+                if manifest.get("version") != manifestFormatVersion:
+                    manifest = {}
+            except (OSError, ValueError):
+                manifest = {}
+
+        manifestRoots = manifest.get("roots", {})
+        newRoots = {}
+        changed = False
+        for root in self.roots:
+            try:
+                mtime = os.stat(root).st_mtime_ns
+            except OSError:
+                mtime = None
+            cached = manifestRoots.get(root)
+            if cached is not None and cached["mtime"] == mtime and mtime is not None:
+                filenames = cached["files"]
+            else:
+                filenames = self.listRoot(root)
+                changed = True
+            newRoots[root] = {"mtime": mtime, "files": filenames}
+            self.listings[root] = (mtime, filenames)
+            for filename in filenames:
+                self.addFile(root, filename)
+
+        if manifestPath is not None and (changed or len(newRoots) != len(manifestRoots)):
+            self.saveManifest(manifestPath, newRoots)
+
+    # returns the roots modified since the last scan or refresh, as a list of (root, mtime)
+    def modifiedRoots(self):
+        result = []
+        for root in self.roots:
+            try:
+                mtime = os.stat(root).st_mtime_ns
+            except OSError:
+                mtime = None
+            listing = self.listings.get(root)
+            if listing is None or listing[0] != mtime:
+                result.append((root, mtime))
+        return result
+
+    # lists the roots modified since the last scan or refresh again.
+    # returns True if the graphics resolved for any slide may have changed.
+    def refresh(self):
+        changed = False
+        for (root, mtime) in self.modifiedRoots():
+            prevFilenames = self.listings.get(root, (None, []))[1]
+            filenames = self.listRoot(root)
+            for filename in set(prevFilenames) - set(filenames):
+                changed = self.removeFile(root, filename) or changed
+            for filename in filenames:
+                changed = self.addFile(root, filename) or changed
+            self.listings[root] = (mtime, filenames)
+        return changed
+
+    # returns an independent copy of the index, e.g. to be refreshed while
+    # other threads keep using this one
+    def copy(self):
+        index = GraphicsIndex(self.roots, self.extensions)
+        index.files = {key: list(candidates) for (key, candidates) in self.files.items()}
+        index.listings = dict(self.listings)
+        return index
+
+    def saveManifest(self, manifestPath, roots):
+        folder = os.path.dirname(manifestPath)
+        if len(folder) > 0:
+            os.makedirs(folder, exist_ok=True)
+        tmpPath = "{0}.{1}.tmp".format(manifestPath, os.getpid())
+        with open(tmpPath, "w", encoding="utf-8") as f:
+            json.dump({"version": manifestFormatVersion, "roots": roots}, f, ensure_ascii=False)
+        os.replace(tmpPath, manifestPath)
+
+    # returns {chIndex: (missing, extra)}, for the chapters with any: the
+    # slides which were looked up without graphics, and the graphics of the
+    # chapter no slide asked for.
+    # params:
+    #  lookups: the (chIndex, slideIndex) of every slide which needed graphics
+    def report(self, lookups):
+        wanted = {}
+        for (chIndex, slideIndex) in lookups:
+            wanted.setdefault(chIndex, set()).add(slideIndex)
+        available = {}
+        for (chIndex, slideIndex) in self.files:
+            available.setdefault(chIndex, set()).add(slideIndex)
+        result = {}
+        for chIndex in sorted(set(wanted) | set(available)):
+            missing = sorted(wanted.get(chIndex, set()) - available.get(chIndex, set()))
+            extra = sorted(available.get(chIndex, set()) - wanted.get(chIndex, set()))
+            if len(missing) > 0 or len(extra) > 0:
+                result[chIndex] = (missing, extra)
+        return result
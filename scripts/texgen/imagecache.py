@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+'''
+Resized and re-encoded copies of the slide graphics, so that LaTeX does not
+have to embed full-size photos. This replaces running resize.sh over the
+figures folder, which overwrote the originals and re-encoded every image on
+every run.
+
+The copies live in a folder named after the target size and quality, e.g.
+    .texgen-cache/figures-1280x720-q82/Gen01_03.jpg
+under the same file name as the original, so the deck finds them by putting
+that folder first in \graphicspath. A manifest records the path and the content
+hash of the source each copy was made from; a copy is only made again when
+that hash changes. The copy of a source which was deleted or changed since is
+removed, so that LaTeX does not find a copy of a deleted original (e.g.
+Gen01_03.jpg replaced with Gen01_03.png), even if the deck no longer shows it.
+The copies of sources which are still there are kept, since decks sharing the
+figures and the cache folder each show some of them. Images are converted
+with ImageMagick, several at a time.
+'''
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import subprocess
+
+manifestFormatVersion = 2
+manifestName = "manifest.json"
+
+# vector graphics are embedded as they are
+rasterExtensions = [".jpg", ".jpeg", ".png"]
+
+
+def hashFile(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ImageCache:
+    # params:
+    #  folder: the cache folder, the copies go into a sub folder of it
+    #  maxWidth, maxHeight: larger images are scaled down to fit, keeping proportions
+    #  quality: the JPEG quality (PNGs are lossless)
+    #  convertCommand: the ImageMagick command line, as a list
+    #  jobs: the number of conversions run at a time (None for one per CPU)
+    def __init__(self, folder, maxWidth, maxHeight, quality, convertCommand, jobs=None):
+        self.maxWidth = maxWidth
+        self.maxHeight = maxHeight
+        self.quality = quality
+        self.convertCommand = list(convertCommand)
+        self.jobs = jobs
+        self.outputFolder = os.path.join(folder, "figures-{0}x{1}-q{2}".format(maxWidth, maxHeight, quality))
+        self.manifest = {}  # file name -> {"source", "size", "mtime", "hash"} of its source
+
+    def loadManifest(self):
+        try:
+            with open(os.path.join(self.outputFolder, manifestName), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if manifest.get("version") == manifestFormatVersion:
+            self.manifest = manifest["files"]
+
+    def saveManifest(self):
+        path = os.path.join(self.outputFolder, manifestName)
+        tmpPath = "{0}.{1}.tmp".format(path, os.getpid())
+        with open(tmpPath, "w", encoding="utf-8") as f:
+            json.dump({"version": manifestFormatVersion, "files": self.manifest}, f, ensure_ascii=False)
+        os.replace(tmpPath, path)
+
+    def convertArgs(self, sourcePath, outputPath):
+        args = self.convertCommand + [sourcePath]
+        if os.path.splitext(sourcePath)[1].lower() != ".png":
+            args += ["-quality", str(self.quality)]
+        # the trailing ">" only ever shrinks an image
+        args += ["-resize", "{0}x{1}>".format(self.maxWidth, self.maxHeight), outputPath]
+        return args
+
+    # writes the copy of sourcePath; returns None, or the error message
+    def convert(self, sourcePath, outputPath):
+        (base, ext) = os.path.splitext(outputPath)
+        tmpPath = "{0}.{1}.tmp{2}".format(base, os.getpid(), ext)
+        try:
+            result = subprocess.run(self.convertArgs(sourcePath, tmpPath),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:
+            return str(e)
+        if result.returncode != 0:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            return result.stderr.decode("utf-8", "replace").strip()
+        os.replace(tmpPath, outputPath)
+        return None
+
+    # makes sure there is an up-to-date copy of each source file, and
+    # removes the copies of the sources deleted or changed since.
+    # params:
+    #  sourcePaths: the paths of the original images the deck shows
+    # returns a tuple (converted, failed): the number of copies made, and a
+    # list of (sourcePath, error message).
+    def update(self, sourcePaths):
+        os.makedirs(self.outputFolder, exist_ok=True)
+        self.loadManifest()
+
+        pending = []
+        shown = set()
+        for sourcePath in sourcePaths:
+            filename = os.path.basename(sourcePath)
+            if os.path.splitext(filename)[1].lower() not in rasterExtensions:
+                continue
+            shown.add(filename)
+            source = os.path.abspath(sourcePath)
+            outputPath = os.path.join(self.outputFolder, filename)
+            st = os.stat(sourcePath)
+            entry = self.manifest.get(filename)
+            upToDate = entry is not None and entry["source"] == source and os.path.exists(outputPath)
+            if upToDate and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+                # skip hashing files which have not been touched
+                continue
+            sourceHash = hashFile(sourcePath)
+            if upToDate and entry["hash"] == sourceHash:
+                entry["size"] = st.st_size
+                entry["mtime"] = st.st_mtime_ns
+                continue
+            pending.append((sourcePath, outputPath, {"source": source, "size": st.st_size, "mtime": st.st_mtime_ns, "hash": sourceHash}))
+
+        failed = []
+        if len(pending) > 0:
+            # the work is done by the convert processes, threads are enough to drive them
+            with concurrent.futures.ThreadPoolExecutor(self.jobs) as executor:
+                errors = executor.map(lambda p: self.convert(p[0], p[1]), pending)
+                for ((sourcePath, outputPath, entry), error) in zip(pending, errors):
+                    filename = os.path.basename(outputPath)
+                    if error is None:
+                        self.manifest[filename] = entry
+                    else:
+                        failed.append((sourcePath, error))
+                        # let LaTeX fall back to the original
+                        self.manifest.pop(filename, None)
+                        if os.path.exists(outputPath):
+                            os.remove(outputPath)
+        self.removeStaleCopies(shown)
+        self.saveManifest()
+        return (len(pending) - len(failed), failed)
+
+    # removes the copies, and their manifest entries, of the sources deleted or
+    # changed since, other than those in shown (a set of file names, just
+    # brought up to date); and any file the manifest does not know. the
+    # temporary files of conversions still running in other processes are
+    # left alone.
+    def removeStaleCopies(self, shown):
+        for (filename, entry) in list(self.manifest.items()):
+            if filename not in shown and not self.isCurrent(entry):
+                del self.manifest[filename]
+        for filename in os.listdir(self.outputFolder):
+            if filename == manifestName or filename in self.manifest or ".tmp" in filename:
+                continue
+            try:
+                os.remove(os.path.join(self.outputFolder, filename))
+            except OSError:
+                pass
+
+    # returns whether the source of a manifest entry is still the one its copy
+    # was made from. a source only touched since is recorded as it is now.
+    def isCurrent(self, entry):
+        try:
+            st = os.stat(entry["source"])
+        except OSError:
+            return False
+        if entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+            return True
+        if hashFile(entry["source"]) != entry["hash"]:
+            return False
+        entry["size"] = st.st_size
+        entry["mtime"] = st.st_mtime_ns
+        return True
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+'''
+The inline rules turning the text of an outline line into LaTeX: escaping the
+characters LaTeX treats specially, *emphasis*, tying verse references
+together, and, on summary slides, setting ALL-CAPS words in boldface. The
+LaTeX an outline already has, e.g. \\& or $x_1$, is left as it is.
+
+The rules of a context are combined into one regular expression, one
+alternative per rule, so a line is transformed in a single re.sub pass
+however many rules there are. Where several rules match at the same
+position, the one registered first wins. The text a rule matched is not seen
+by the other rules, unless the rule passes it on to the transform it is given
+(as emphasis does), so a replacement is never matched again.
+
+More rules are registered before the Renderer using them is made:
+    def smallCaps(text, transform):
+        return "\\textsc{" + transform(text[2:-2]) + "}"
+    inline.register("small-caps", "\\^\\^[^^]+\\^\\^", smallCaps, startChars="\\^")
+'''
+
+import collections
+import hashlib
+import re
+
+# the contexts a line is transformed in:
+#  text: every line of the outline (titles, bullets)
+#  summary: the bullets of a summary slide
+textContext = "text"
+summaryContext = "summary"
+allContexts = (textContext, summaryContext)
+
+# name: identifies the rule, e.g. in the chapter cache salt
+# pattern: the regular expression of the text the rule applies to. it may
+#   have groups, but must not refer to them by number.
+# replace: a function (text, transform) returning the LaTeX for the matched
+#   text; transform(part) applies the rules of the same context to a part of
+#   it. it must be defined at module level, so that it can be pickled (e.g. to
+#   be sent to a worker process).
+# contexts: the contexts the rule applies in
+# startChars: the characters a match can start with, as the inside of a
+#   regular expression character class; or None if it may start with any
+InlineRule = collections.namedtuple("InlineRule", ["name", "pattern", "replace", "contexts", "startChars"])
+
+# the rules, in priority order
+rules = []
+
+def register(name, pattern, replace, contexts=allContexts, startChars=None):
+    if any(rule.name == name for rule in rules):
+        raise ValueError("an inline rule named {0!r} is already registered".format(name))
+    re.compile(pattern)
+    rules.append(InlineRule(name, pattern, replace, tuple(contexts), startChars))
+
+
+# the rules of one context, compiled into one regular expression
+class InlineTransformer:
+    def __init__(self, rules, context):
+        self.context = context
+        self.rules = tuple(rule for rule in rules if context in rule.contexts)
+        # each rule is the group "r<i>" of the expression, and the outermost
+        # group of a match is its lastgroup
+        self.replacers = {"r{0}".format(i): rule.replace for (i, rule) in enumerate(self.rules)}
+        alternatives = "|".join(["(?P<r{0}>{1})".format(i, rule.pattern) for (i, rule) in enumerate(self.rules)])
+        # an alternation is tried at every position of the text, alternative
+        # by alternative. if every rule tells the characters its matches can
+        # start with, the positions starting with none of them are skipped
+        # at once, which takes half the time on typical bullets.
+        if len(self.rules) > 0 and all(rule.startChars is not None for rule in self.rules):
+            alternatives = "(?=[" + "".join(rule.startChars for rule in self.rules) + "])(?:" + alternatives + ")"
+        self.regex = re.compile(alternatives) if len(self.rules) > 0 else None
+
+    def replaceMatch(self, m):
+        return self.replacers[m.lastgroup](m.group(), self)
+
+    # returns the LaTeX for text
+    def __call__(self, text):
+        if self.regex is None:
+            return text
+        return self.regex.sub(self.replaceMatch, text)
+
+    # identifies the rules, for the chapter cache salt
+    def digest(self):
+        h = hashlib.sha256()
+        for rule in self.rules:
+            h.update("{0}\0{1}\0{2}\0{3}.{4}\0".format(rule.name, rule.pattern, rule.startChars,
+                     rule.replace.__module__, rule.replace.__qualname__).encode("utf-8"))
+        return h.hexdigest()
+
+
+# $...$: math, which the outline wrote as LaTeX, left as it is
+MathPattern = "(?<!\\\\)\\$[^$\\n]+?(?<!\\\\)\\$"
+
+def keepMath(text, transform):
+    return text
+
+# "Gen 45:4", "1 Sam 3:10", "Matt. 5:3-12": ties the book to the chapter and
+# verse, so that a reference is never divided between two lines
+VerseReferencePattern = "\\b(?:[1-3] )?[A-Z][a-z]+\\.? \\d+:\\d+(?:[-–]\\d+)?\\b"
+
+def tieVerseReference(text, transform):
+    return text.replace(" ", "~")
+
+# *some words*
+EmphasisPattern = "\\*(?=\\S)[^*\\n]+?(?<=\\S)\\*"
+
+def emphasize(text, transform):
+    return "\\emph{" + transform(text[1:-1]) + "}"
+
+# \b is word boundary: any A-Z word whose length is at least 2, e.g. "LORD",
+# but not "AB12"
+AllCapsPattern = "\\b[A-Z]{2,}\\b"
+
+def boldface(text, transform):
+    return "\\textbf{" + text + "}"
+
+# non-ascii chars LaTeX may not have, and quotation marks it would otherwise mangle
+LatexCharTable = {
+    "…": "...",                     # get rid of non-campatible unicode chars
+    "“": "{\\textquotedblleft}",    # \textquotedblleft == ``
+    "”": "{\\textquotedblright}",   # \textquotedblright == ''
+    "‘": "{\\textquoteleft}",
+    "’": "{\\textquoteright}",
+    "\"": "\\symbol{34}",
+    "'": "\\symbol{39}",
+}
+LatexCharPattern = "[" + "".join(LatexCharTable) + "]"
+
+def replaceLatexChar(text, transform):
+    return LatexCharTable[text]
+
+# the characters which are commands to LaTeX, rather than text, unless
+# already escaped (e.g. \&). the backslash and the braces are left alone, so
+# that an outline can still use LaTeX commands, e.g. \textit{...}; so is $,
+# which starts math (see MathPattern) as often as it is a dollar sign.
+LatexSpecialChars = "&%#_"
+LatexSpecialPattern = "(?<!\\\\)[" + LatexSpecialChars + "]"
+
+def escapeLatexSpecial(text, transform):
+    return "\\" + text
+
+register("math", MathPattern, keepMath, startChars="$")
+register("verse-reference", VerseReferencePattern, tieVerseReference, startChars="1-3A-Z")
+register("emphasis", EmphasisPattern, emphasize, startChars="*")
+register("boldface", AllCapsPattern, boldface, (summaryContext,), startChars="A-Z")
+register("latex-chars", LatexCharPattern, replaceLatexChar, startChars=LatexCharPattern[1:-1])
+register("latex-specials", LatexSpecialPattern, escapeLatexSpecial, startChars=LatexSpecialChars)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+'''
+A compact, read-only representation of an outline: the text of the input as
+one string, the indentation level of each line in an array('b'), and where
+each line starts in an array('q'). A line is sliced out of the text only
+when it is read, so a 100k line outline takes about 9 bytes per line on top
+of its text, instead of a tuple and a string object per line.
+
+The text may also be UTF-8 bytes, e.g. a memory-mapped outline file (see
+Outline.read): the lines are then found in the bytes, and each one is
+decoded only when it is read, so the decoded text never exists as a whole.
+This saves memory, not time: every line is still decoded once. A line which
+is not valid UTF-8 raises a ValueError with its line number when it is read.
+
+Iterating over an Outline yields the same (indentation, line) tuples as
+renderer.tokenizeLines, so the rest of the pipeline takes either.
+'''
+
+import array
+import codecs
+import itertools
+import mmap
+import os
+
+# levels deeper than this are counted as this (the renderer ignores
+# everything below level 3 anyway)
+maxLevel = 127
+
+# the text is split into lines this many characters at a time, so that only
+# a chunk's worth of line strings exists at any time while parsing
+parseChunkSize = 64 * 1024
+
+# smaller files are read rather than memory-mapped
+mapSizeThreshold = 1024 * 1024
+
+
+# returns the number of indentation marks line starts with
+def countMarks(line, indentationMark):
+    count = 0
+    pos = 0
+    while line.startswith(indentationMark, pos):
+        count += 1
+        pos += len(indentationMark)
+    return count
+
+
+class Outline:
+    __slots__ = ("text", "levels", "offsets", "markLength", "firstLine")
+
+    # params:
+    #  text: the text the lines are taken from, a str, or UTF-8 bytes (or an mmap)
+    #  levels: an array('b'), the indentation level of each line
+    #  offsets: an array('q') of one more item than levels: where each line
+    #    starts in text (at its indentation), followed by where the last one ends
+    #  markLength: the length of the indentation mark in text (in bytes, if text is bytes)
+    #  firstLine: the index of the first line in the whole outline, for the messages
+    def __init__(self, text, levels, offsets, markLength, firstLine=0):
+        self.text = text
+        self.levels = levels
+        self.offsets = offsets
+        self.markLength = markLength
+        self.firstLine = firstLine
+
+    # params:
+    #  text: the whole outline, lines separated by "\n": a str, or UTF-8
+    #    bytes (or an mmap)
+    @classmethod
+    def parse(cls, text, indentationMark):
+        if isinstance(text, str):
+            newline = "\n"
+            pos = 1 if text.startswith("\ufeff") else 0
+        else:
+            newline = b"\n"
+            indentationMark = indentationMark.encode("utf-8")
+            pos = len(codecs.BOM_UTF8) if text[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8 else 0
+        markLength = len(indentationMark)
+        # a mark of one repeated character, e.g. spaces, is counted without a loop
+        markChar = indentationMark[:1]
+        repeated = indentationMark == markChar * markLength
+        levels = array.array("b")
+        offsets = array.array("q")
+        end = len(text)
+        while pos < end:
+            stop = text.find(newline, min(pos + parseChunkSize, end) - 1)
+            stop = end if stop < 0 else stop + 1
+            chunk = text[pos:stop]
+            lines = chunk.split(newline)
+            if len(lines[-1]) == 0:
+                # the chunk ends with a newline
+                lines.pop()
+            if repeated:
+                counts = [(len(line) - len(line.lstrip(markChar))) // markLength for line in lines]
+            else:
+                counts = [countMarks(line, indentationMark) for line in lines]
+            levels.extend([min(count, maxLevel) for count in counts] if max(counts) > maxLevel else counts)
+            offsets.extend(itertools.accumulate([len(line) + 1 for line in lines[:-1]], initial=pos))
+            pos = stop
+        offsets.append(end)
+        return cls(text, levels, offsets, markLength)
+
+    # reads the outline file at path, memory-mapped if it is large and mapped
+    # is set. a mapped file must not be truncated while the Outline is in use
+    # (e.g. by an editor saving it), or reading it crashes the process.
+    @classmethod
+    def read(cls, path, indentationMark, mapped=True):
+        with open(path, "rb") as f:
+            if not mapped or os.fstat(f.fileno()).st_size < mapSizeThreshold:
+                return cls.parse(f.read(), indentationMark)
+            return cls.parse(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), indentationMark)
+
+    def __len__(self):
+        return len(self.levels)
+
+    def decodeError(self, i, e):
+        return ValueError("line {0} is not valid UTF-8: {1}".format(self.firstLine + i + 1, e.reason))
+
+    # returns the text of line i, without its indentation
+    def line(self, i):
+        line = self.text[self.offsets[i] + self.levels[i] * self.markLength:self.offsets[i + 1]]
+        if isinstance(line, str):
+            return line
+        try:
+            return line.decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise self.decodeError(i, e) from None
+
+    # yields a tuple (indentation, line) for each line
+    def __iter__(self):
+        text = self.text
+        offsets = self.offsets
+        markLength = self.markLength
+        if isinstance(text, str):
+            for (i, level) in enumerate(self.levels):
+                yield (level, text[offsets[i] + level * markLength:offsets[i + 1]])
+        else:
+            i = 0
+            try:
+                for (i, level) in enumerate(self.levels):
+                    yield (level, text[offsets[i] + level * markLength:offsets[i + 1]].decode("utf-8"))
+            except UnicodeDecodeError as e:
+                raise self.decodeError(i, e) from None
+
+    # returns the lines [first, stop) as an Outline sharing this one's text
+    def slice(self, first, stop):
+        return Outline(self.text, self.levels[first:stop], self.offsets[first:stop + 1], self.markLength,
+                       self.firstLine + first)
+
+    # yields the chapters, as Outlines sharing this one's text. a new chapter
+    # starts with a line of no indentation following an indented line (the
+    # same rule as renderer.assembleSlides).
+    def chapters(self):
+        levels = self.levels
+        first = 0
+        for i in range(1, len(levels)):
+            if levels[i] == 0 and levels[i - 1] > 0:
+                yield self.slice(first, i)
+                first = i
+        if len(levels) > 0:
+            yield self.slice(first, len(levels))
+
+    # a slice is pickled (e.g. to be sent to a worker process) with its own
+    # lines only, rather than the whole text it shares
+    def __reduce__(self):
+        begin = self.offsets[0]
+        offsets = array.array("q", [offset - begin for offset in self.offsets])
+        return (Outline, (self.text[begin:self.offsets[-1]], self.levels, offsets, self.markLength, self.firstLine))
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+'''
+Divides the paragraphs (level-1 bullets) of a slide into sub slides, so that
+there is not too much text, or too many text lines, on each frame:
+ 1. the paragraphs of a sub slide fit the body of the frame, unless the sub
+    slide has a single paragraph;
+ 2. a sub slide has no more than paraLimit paragraphs;
+ 3. a paragraph with level-2 bullets has a sub slide of its own.
+
+Whether paragraphs fit is decided by one of two measures (see fits):
+ - metrics: their height, predicted from the widths of the glyphs (see
+   fontmetrics.py). A sub slide is set in the small font if it does not fit
+   in the regular one, and the paragraphs of a sub slide fit in the small one;
+ - chars: their character count, as texgen used to: fewer than charLimit
+   characters, and the small font for more than smallFontCharLimit of them
+   or for level-2 bullets.
+
+Each paragraph is measured once. The measurements travel with the sub slides,
+so that the slide writer can choose the font size without counting again.
+
+Between the paragraphs with level-2 bullets, the breaks are placed by a
+policy (see policies):
+ - greedy: fills each sub slide as much as it can, the way texgen always did;
+ - balanced: the same number of sub slides as greedy, but with the text
+   spread as evenly as possible (minimum raggedness), instead of leaving a
+   short tail.
+'''
+
+import collections
+
+# paragraphs: a tuple of (paragraph, subBullets) pairs
+# charCount: the characters of the paragraphs and of their level-2 bullets
+# smallFont: whether the text is set in a smaller font (see Paginator)
+# height: the predicted height of the text in its font, in points; None if
+#   measured by characters
+SubSlide = collections.namedtuple("SubSlide", ["paragraphs", "charCount", "smallFont", "height"], defaults=[None])
+
+
+# returns the indices at which the paragraphs of a run are divided, each
+# starting a sub slide, in increasing order and starting with 0.
+# params:
+#  lengths: the size of each paragraph of the run: its character count, or its height
+#  charLimit: the size the paragraphs of a sub slide stay below
+def greedyBreaks(lengths, charLimit, paraLimit):
+    breaks = []
+    charCount = 0
+    paraCount = 0
+    for (i, paraLen) in enumerate(lengths):
+        if i == 0 or paraCount >= paraLimit or charCount + paraLen >= charLimit:
+            breaks.append(i)
+            charCount = 0
+            paraCount = 0
+        charCount += paraLen
+        paraCount += 1
+    return breaks
+
+# minimizes the number of sub slides, then the sum of the squared sizes of
+# the sub slides, which for a given total is smallest when they are
+# even. a sub slide spans at most paraLimit paragraphs, so this takes
+# O(len(lengths) * paraLimit) steps.
+def balancedBreaks(lengths, charLimit, paraLimit):
+    n = len(lengths)
+    prefix = [0]
+    for paraLen in lengths:
+        prefix.append(prefix[-1] + paraLen)
+
+    # best[j]: the cost of dividing the first j paragraphs; start[j]: where
+    # the last sub slide of that division starts
+    best = [(0, 0)] + [None] * n
+    start = [0] * (n + 1)
+    for j in range(1, n + 1):
+        for i in range(j - 1, max(j - paraLimit, 0) - 1, -1):
+            charCount = prefix[j] - prefix[i]
+            if j - i > 1 and charCount >= charLimit:
+                # adding even more paragraphs does not help
+                break
+            (slides, raggedness) = best[i]
+            cost = (slides + 1, raggedness + charCount * charCount)
+            if best[j] is None or cost < best[j]:
+                best[j] = cost
+                start[j] = i
+
+    breaks = []
+    j = n
+    while j > 0:
+        j = start[j]
+        breaks.append(j)
+    breaks.reverse()
+    return breaks
+
+policies = {
+    "greedy": greedyBreaks,
+    "balanced": balancedBreaks,
+}
+
+
+# the measures of fits
+fits = ("metrics", "chars")
+
+
+class Paginator:
+    # params:
+    #  charLimit, paraLimit: the limits of rules 1 and 2
+    #  smallFontCharLimit: sub slides with more characters than this, or with
+    #    level-2 bullets, are set in a smaller font
+    #  policy: the name of the policy placing the breaks
+    #  model: a fontmetrics.BodyModel, measuring the paragraphs by their
+    #    height; or None to count their characters against charLimit and
+    #    smallFontCharLimit
+    def __init__(self, charLimit, paraLimit, smallFontCharLimit, policy="greedy", model=None):
+        self.charLimit = charLimit
+        self.paraLimit = paraLimit
+        self.smallFontCharLimit = smallFontCharLimit
+        self.policy = policy
+        self.breaks = policies[policy]
+        self.model = model
+        # the size the paragraphs of a sub slide stay below
+        self.limit = charLimit if model is None else model.room
+
+    # returns a tuple of SubSlide
+    def paginate(self, paragraphs, paraSubBullets):
+        pairs = tuple(zip(paragraphs, paraSubBullets))
+        lengths = [len(para) for para in paragraphs]
+        # what the breaks are placed by: the lengths, or the heights in the
+        # small font. one paragraph a sub slide needs neither.
+        sizes = lengths
+        if self.model is not None:
+            # (regular, small) for each paragraph
+            heights = [self.model.heights(para, subBullets) for (para, subBullets) in pairs]
+            if self.paraLimit > 1:
+                sizes = [small for (regular, small) in heights]
+
+        # the index of the first paragraph of each sub slide
+        breaks = []
+        runStart = 0
+        # (paraSubBullets may run longer than paragraphs, the extra entries are ignored)
+        for (i, (para, subBullets)) in enumerate(pairs):
+            if len(subBullets) == 0:
+                continue
+            self.breakRun(breaks, sizes, runStart, i)
+            breaks.append(i)
+            for sb in subBullets:
+                lengths[i] += len(sb)
+            runStart = i + 1
+        self.breakRun(breaks, sizes, runStart, len(sizes))
+        breaks.append(len(sizes))
+
+        subSlides = []
+        for k in range(len(breaks) - 1):
+            (begin, end) = (breaks[k], breaks[k + 1])
+            charCount = lengths[begin] if end - begin == 1 else sum(lengths[begin:end])
+            if self.model is None:
+                smallFont = len(pairs[begin][1]) > 0 or charCount > self.smallFontCharLimit
+                subSlides.append(SubSlide(pairs[begin:end], charCount, smallFont))
+                continue
+            height = self.model.bodyHeightFrom([regular for (regular, small) in heights[begin:end]])
+            smallFont = height > self.model.bodyHeight
+            if smallFont:
+                height = self.model.bodyHeightFrom([small for (regular, small) in heights[begin:end]])
+            subSlides.append(SubSlide(pairs[begin:end], charCount, smallFont, height))
+        return tuple(subSlides)
+
+    # whether subSlide is predicted to overflow the body of its frame
+    def overflows(self, subSlide):
+        return subSlide.height is not None and subSlide.height > self.model.bodyHeight
+
+    # adds the breaks of the paragraphs [begin, end), which have no level-2 bullets
+    def breakRun(self, breaks, sizes, begin, end):
+        if begin == end:
+            return
+        if begin == 0 and end == len(sizes):
+            breaks += self.breaks(sizes, self.limit, self.paraLimit)
+            return
+        for i in self.breaks(sizes[begin:end], self.limit, self.paraLimit):
+            breaks.append(begin + i)
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+
+'''
+Builds the PDF of a deck a chapter at a time (texgen.py --format pdf), rather
+than running one LaTeX file of the whole deck through pdflatex on one core.
+
+Each chapter is written as a standalone LaTeX file, a fragment, with the
+preamble of the deck; so are the title page and the closing frame. The
+fragments are compiled in parallel by the LaTeX command (--latex, run in the
+work folder with the name of the fragment), and their PDFs are merged in
+chapter order by the merge command (--merge, given the PDFs, then the output).
+
+A fragment is named after the hash of its text, of the LaTeX command, and of
+the size and modification time of the graphics it shows. The fragments and
+their PDFs are kept in the work folder next to the output (deck.pdf ->
+deck.chapters/), so only the fragments which changed are compiled again:
+editing a chapter compiles that chapter.
+
+The page numbers are left out of the fragments, and out of their hash. Each
+fragment reads them from its own small file (<name>.pages.tex), written when
+it is compiled: its first page, and the pages of the whole deck. A change in
+the number of pages compiles the chapters whose numbers changed, in the same
+pass as the one which was edited. In watch mode, they are left for later:
+the PDFs are merged with the page numbers they have, and compiled again with
+the new numbers by the next build which has no chapter to compile, once the
+outline has been quiet for a moment.
+
+The fragments are compiled in the work folder: their \\graphicspath is made
+relative to it, and the folder of the output, where the theme (latex/) is
+when the deck is compiled as one file, is added to TEXINPUTS.
+'''
+
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import subprocess
+import sys
+
+from . import stats
+from .renderer import LatexEmitter, writeLatexClosingFrame, writeLatexPreamble, writeLatexTitlePage
+
+# one pass is enough: beamer is told the page numbers instead of reading them
+# from the previous pass
+latexCommand = "pdflatex -interaction=nonstopmode -halt-on-error"
+# poppler's pdfunite takes the input files, then the output file
+mergeCommand = "pdfunite"
+
+workFolderSuffix = ".chapters"
+pagesSuffix = ".pages.tex"
+manifestName = "fragments.json"
+manifestFormatVersion = 1
+
+# the title page is the first page of the deck
+titlePages = 1
+closingPages = 1
+
+class CompileError(Exception):
+    pass
+
+# a standalone LaTeX file
+#  name: the file name without extension, the hash of what the PDF depends on
+#  label: what it is, e.g. "chapter 3", for the messages
+#  text: the LaTeX source
+#  pages: the LaTeX of its page numbers, read by text from <name>.pages.tex
+Fragment = collections.namedtuple("Fragment", ["name", "label", "text", "pages"])
+
+# returns the folder of the fragments of the PDF at outputPath
+def workFolder(outputPath):
+    return os.path.splitext(outputPath)[0] + workFolderSuffix
+
+# returns the config of the fragments: the graphics folders are relative to
+# the folder of the output, the fragments are compiled one level below
+def fragmentConfig(config):
+    def relocate(folder):
+        return folder if os.path.isabs(folder) else os.path.join(os.pardir, folder)
+    return config._replace(
+        graphicsFolders=tuple(relocate(folder) for folder in config.graphicsFolders),
+        processedGraphicsFolder=relocate(config.processedGraphicsFolder) if config.processedGraphicsFolder is not None else None)
+
+# returns the LaTeX of a fragment: the preamble, then body. its page numbers
+# are read from the file written by pagesText.
+# params:
+#  writeBody: a function writing the body to a LatexEmitter
+def fragmentText(config, writeBody):
+    out = LatexEmitter()
+    writeLatexPreamble(out, config)
+    out.indent += 1
+    out.line("\\InputIfFileExists{{\\jobname{0}}}{{}}{{}}".format(pagesSuffix))
+    out.indent -= 1
+    out.blank()
+    writeBody(out)
+    out.line("\\end{document}")
+    return out.getvalue()
+
+# returns the LaTeX numbering the pages of a fragment from firstPage out of
+# totalPages
+def pagesText(firstPage, totalPages):
+    return "\\setcounter{{page}}{{{0}}}\n\\renewcommand{{\\insertpresentationendpage}}{{{1}}}\n".format(firstPage, totalPages)
+
+
+class PdfCompiler:
+    # params:
+    #  latexCommand, mergeCommand: the command lines, as lists
+    #  imageCache: the ImageCache of the preprocessed graphics, or None
+    #  deferPageNumbers: whether the fragments whose page numbers are out of
+    #    date are left for a build which has no other fragment to compile (in
+    #    watch mode)
+    def __init__(self, latexCommand, mergeCommand, imageCache=None, deferPageNumbers=False):
+        self.latexCommand = list(latexCommand)
+        self.mergeCommand = list(mergeCommand)
+        self.imageCache = imageCache
+        self.deferPageNumbers = deferPageNumbers
+        self.outdatedFragments = 0  # left with out-of-date page numbers by the last build
+
+    # returns the name of a fragment
+    # params:
+    #  graphics: the paths of the graphics files it shows
+    def fragmentName(self, text, graphics):
+        h = hashlib.sha256()
+        h.update("\0".join(self.latexCommand).encode("utf-8") + b"\0\0")
+        for path in sorted(set(graphics)):
+            try:
+                st = os.stat(path)
+                h.update("{0}\0{1}\0{2}\0".format(path, st.st_size, st.st_mtime_ns).encode("utf-8"))
+            except OSError:
+                h.update("{0}\0\0".format(path).encode("utf-8"))
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()[:24]
+
+    # returns the fragments of the deck, in order
+    # params:
+    #  entries: the chapter cache entry of each chapter (see renderChapterEntry)
+    def fragments(self, renderer, entries):
+        config = fragmentConfig(renderer.config)
+        index = renderer.graphicsIndex
+        placeholder = index.findFile(renderer.config.placeholderGraphics)
+        totalPages = titlePages + sum(entry["pages"] for entry in entries) + closingPages
+
+        def fragment(label, writeBody, firstPage, graphics=()):
+            text = fragmentText(config, writeBody)
+            return Fragment(self.fragmentName(text, graphics), label, text, pagesText(firstPage, totalPages))
+
+        def chapterBody(entry):
+            return lambda out: out.write(entry["latex"])
+
+        result = [fragment("the title page", writeLatexTitlePage, 1, [placeholder] if placeholder is not None else [])]
+        page = 1 + titlePages
+        for (i, entry) in enumerate(entries, 1):
+            graphics = []
+            for (chIndex, slideIndex, graphicsName) in entry["graphics"]:
+                path = index.resolvePath(chIndex, slideIndex) if graphicsName is not None else placeholder
+                if path is not None:
+                    graphics.append(path)
+            result.append(fragment("chapter {0}".format(i), chapterBody(entry), page, graphics))
+            page += entry["pages"]
+        result.append(fragment("the closing frame", writeLatexClosingFrame, page))
+        return result
+
+    # compiles a fragment in folder.
+    # returns None, or the error message
+    def compile(self, folder, fragment, env):
+        texPath = os.path.join(folder, fragment.name + ".tex")
+        pdfPath = os.path.join(folder, fragment.name + ".pdf")
+        if not os.path.exists(texPath):
+            writeFile(texPath, fragment.text)
+        writeFile(os.path.join(folder, fragment.name + pagesSuffix), fragment.pages)
+        try:
+            result = subprocess.run(self.latexCommand + [fragment.name + ".tex"], cwd=folder, env=env,
+                                    stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            return str(e)
+        if result.returncode != 0 or not os.path.isfile(pdfPath):
+            # a PDF left behind by a failed run is not to be reused
+            if os.path.exists(pdfPath):
+                os.remove(pdfPath)
+            return "{0} exited with {1}, see {2}".format(self.latexCommand[0], result.returncode,
+                                                         os.path.join(folder, fragment.name + ".log"))
+        return None
+
+    # merges the PDFs at paths into outputPath
+    def merge(self, paths, outputPath):
+        (base, ext) = os.path.splitext(outputPath)
+        tmpPath = "{0}.{1}.tmp{2}".format(base, os.getpid(), ext)
+        try:
+            result = subprocess.run(self.mergeCommand + paths + [tmpPath], stdin=subprocess.DEVNULL,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:
+            raise CompileError("failed to merge the PDFs: {0}".format(e))
+        if result.returncode != 0 or not os.path.isfile(tmpPath):
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise CompileError("failed to merge the PDFs: {0}".format(result.stderr.decode("utf-8", "replace").strip()))
+        os.replace(tmpPath, outputPath)
+
+    # compiles the fragments which changed, jobs at a time (None for one per
+    # CPU), with the fragments whose page numbers are out of date (unless
+    # deferPageNumbers is set and some fragment changed), and merges them
+    # into the PDF at outputPath.
+    # returns whether the PDF was written.
+    def build(self, renderer, entries, outputPath, jobs):
+        folder = workFolder(outputPath)
+        os.makedirs(folder, exist_ok=True)
+        fragments = self.fragments(renderer, entries)
+        names = [fragment.name for fragment in fragments]
+        pending = []
+        outdated = []
+        for fragment in fragments:
+            if not os.path.isfile(os.path.join(folder, fragment.name + ".pdf")):
+                pending.append(fragment)
+            elif readFile(os.path.join(folder, fragment.name + pagesSuffix)) != fragment.pages:
+                outdated.append(fragment)
+        if len(pending) == 0 or not self.deferPageNumbers:
+            (pending, outdated) = (pending + outdated, [])
+        self.outdatedFragments = len(outdated)
+
+        if len(pending) > 0:
+            env = dict(os.environ)
+            outputFolder = os.path.abspath(os.path.dirname(outputPath) or ".")
+            # the trailing separator keeps the default search path
+            env["TEXINPUTS"] = outputFolder + os.pathsep + env.get("TEXINPUTS", "")
+            print("texgen: compiling {0} of {1} fragments in {2}".format(len(pending), len(fragments), folder), file=sys.stderr)
+            # the work is done by the LaTeX processes, threads are enough to drive them
+            with stats.stage("compile"), concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+                errors = list(executor.map(lambda fragment: self.compile(folder, fragment, env), pending))
+            failed = [(fragment, error) for (fragment, error) in zip(pending, errors) if error is not None]
+            if len(failed) > 0:
+                raise CompileError("; ".join("failed to compile {0}: {1}".format(fragment.label, error)
+                                             for (fragment, error) in failed))
+            if len(outdated) > 0:
+                print("texgen: the page numbers of {0} fragments are out of date until the next build".format(len(outdated)),
+                      file=sys.stderr)
+        elif os.path.isfile(outputPath) and readManifest(folder) == names:
+            return False
+
+        with stats.stage("merge"):
+            self.merge([os.path.join(folder, name + ".pdf") for name in names], outputPath)
+        writeManifest(folder, names)
+        removeStaleFiles(folder, set(names))
+        return True
+
+
+def writeFile(path, text):
+    tmpPath = "{0}.{1}.tmp".format(path, os.getpid())
+    with open(tmpPath, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmpPath, path)
+
+# returns the text of the file at path, or None
+def readFile(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+# the names of the fragments the output was last merged from
+def readManifest(folder):
+    try:
+        with open(os.path.join(folder, manifestName), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest.get("fragments") if manifest.get("version") == manifestFormatVersion else None
+
+def writeManifest(folder, names):
+    writeFile(os.path.join(folder, manifestName), json.dumps({"version": manifestFormatVersion, "fragments": names}))
+
+# removes the files of the fragments no longer in the deck (the LaTeX files,
+# the page numbers, the PDFs, the logs, ...)
+def removeStaleFiles(folder, names):
+    for filename in os.listdir(folder):
+        if filename != manifestName and filename.split(".", 1)[0] not in names:
+            try:
+                os.remove(os.path.join(folder, filename))
+            except OSError:
+                pass
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+'''
+The HTML preview of a deck (texgen.py --format html): the slides of the LaTeX
+source, divided into the same frames, written as one self-contained HTML file
+a browser shows at once, instead of minutes of pdflatex.
+
+The frames are laid out like the lucid theme on the 160mm x 120mm paper, in
+points of the paper (see fontmetrics.py), so that the text wraps about where
+LaTeX wraps it; a body which does not fit its frame is outlined in red. The
+graphics are referenced by their paths relative to the HTML file, never
+copied or re-encoded. The LaTeX of the inline rules (see inline.py) is turned
+back into HTML; other LaTeX commands of the outline are dropped, keeping
+their text. The page numbers are those of the PDF.
+'''
+
+import functools
+import html
+import os
+import re
+import urllib.parse
+
+from . import fontmetrics
+from . import stats
+from .renderer import ChapterTitleSlide, SummarySlide, deckSubtitle, deckTitle, pageCount, singleColumnLinesMax
+
+# the LaTeX commands of the outline text set as HTML elements; the others are dropped
+HtmlCommandTags = {
+    "emph": "em",
+    "textit": "em",
+    "textbf": "strong",
+    "texttt": "code",
+}
+
+HtmlMarkupRegex = re.compile("|".join(re.escape(latex) for latex in fontmetrics.LatexTextTable) +
+                             "|\\\\([a-zA-Z]+) ?(\\{?)|\\\\(.)|[{}~]")
+
+# returns the HTML for line, the LaTeX of a title or a bullet
+@functools.lru_cache(maxsize=8192)
+def htmlText(line):
+    if "\\" not in line and "{" not in line and "}" not in line and "~" not in line:
+        return html.escape(line, False)
+    pieces = []
+    closing = []  # the end tags of the open groups
+    pos = 0
+    for m in HtmlMarkupRegex.finditer(line):
+        pieces.append(html.escape(line[pos:m.start()], False))
+        pos = m.end()
+        token = m.group()
+        char = fontmetrics.LatexTextTable.get(token)
+        if char is not None:
+            pieces.append(html.escape(char, False))
+        elif m.group(1) is not None:
+            tag = HtmlCommandTags.get(m.group(1))
+            if len(m.group(2)) > 0:
+                pieces.append("<{0}>".format(tag) if tag is not None else "")
+                closing.append("</{0}>".format(tag) if tag is not None else "")
+        elif m.group(3) is not None:
+            # an escaped character, e.g. \&
+            pieces.append(html.escape(m.group(3), False))
+        elif token == "{":
+            closing.append("")
+        elif token == "}":
+            if len(closing) > 0:
+                pieces.append(closing.pop())
+        else:
+            pieces.append("&nbsp;")
+    pieces.append(html.escape(line[pos:], False))
+    pieces.extend(reversed(closing))
+    return "".join(pieces)
+
+
+# the sizes of the theme, in points of the paper (--pt)
+frameTitleTop = 2 * fontmetrics.pointsPerMM      # \vskip0.2cm
+frameTitleHeight = 8 * fontmetrics.pointsPerMM   # ht=0.8cm
+frameTitleInset = 2 * fontmetrics.pointsPerMM    # the bar starts at 0.2cm
+frameTitleSize = 14.4                            # \Large
+
+Style = """
+:root { --pt: calc(min(100vw - 16px, (100vh - 16px) * %(paperRatio).4f) / %(paperWidth).2f); }
+body { margin: 0; padding: 8px 0; background: #111; font-family: "Latin Modern Sans", "CMU Sans Serif", sans-serif; }
+.frame { position: relative; box-sizing: border-box; overflow: hidden; margin: 0 auto 8px;
+         width: calc(%(paperWidth).2f * var(--pt)); height: calc(%(paperHeight).2f * var(--pt));
+         padding: 0 calc(%(textMargin).2f * var(--pt)); background: rgb(40, 40, 40); color: white;
+         font-size: calc(%(normalSize).2f * var(--pt)); line-height: calc(%(normalSkip).2f * var(--pt)); }
+.frame h2 { box-sizing: border-box; margin: calc(%(titleTop).2f * var(--pt)) calc(%(titleInset).2f * var(--pt)) 0;
+            height: calc(%(titleHeight).2f * var(--pt)); padding-left: calc(%(titleInset).2f * var(--pt));
+            background: rgb(41, 170, 225); font-size: calc(%(titleSize).2f * var(--pt)); font-weight: normal;
+            line-height: calc(%(titleHeight).2f * var(--pt)); white-space: nowrap; overflow: hidden; }
+.figure { display: flex; align-items: center; justify-content: center; height: calc(%(figureHeight).2f * var(--pt)); }
+.figure img { max-width: 100%%; max-height: 100%%; }
+.figure .missing { color: rgb(80, 80, 80); }
+.image-only .figure { height: calc(%(imageOnlyHeight).2f * var(--pt)); }
+.body { height: calc(%(bodyHeight).2f * var(--pt)); }
+.body.overflow { outline: 2px solid red; }
+ul { margin: 0; padding-left: calc(%(itemIndent).2f * var(--pt)); list-style: square; }
+li { margin-bottom: calc(%(itemSep).2f * var(--pt)); }
+li::marker { color: rgb(240, 240, 240); }
+li ul { margin-top: calc(%(level2TopSep).2f * var(--pt)); font-size: calc(%(smallSize).2f * var(--pt));
+        line-height: calc(%(smallSkip).2f * var(--pt)); }
+li li { margin-bottom: calc(%(level2ItemSep).2f * var(--pt)); }
+.columns { display: flex; }
+.columns ul { width: %(columnPercent)d%%; padding-left: 0; }
+.small { line-height: calc(%(smallBodySkip).2f * var(--pt)); }
+.small > ul > li { font-size: calc(%(footnoteSize).2f * var(--pt)); }
+.small li ul { font-size: calc(%(scriptSize).2f * var(--pt)); line-height: calc(%(smallLevel2Skip).2f * var(--pt)); }
+.summary { margin-top: 1em; }
+.plain { display: flex; align-items: center; justify-content: center; text-align: center; }
+.chapter { font-size: calc(%(chapterSize).2f * var(--pt)); line-height: 1.2; }
+.title-page { flex-direction: column; }
+.title-page h1 { font-size: calc(%(titlePageSize).2f * var(--pt)); font-weight: normal; margin: 0 0 1em; }
+.title-page p { margin: 0; font-size: calc(%(subtitleSize).2f * var(--pt)); }
+.page { position: absolute; left: calc(8.5 * var(--pt)); bottom: calc(4 * var(--pt)); color: rgb(80, 80, 80);
+        font-size: calc(5 * var(--pt)); line-height: 1; }
+""" % {
+    "paperRatio": fontmetrics.paperWidth / fontmetrics.paperHeight,
+    "paperWidth": fontmetrics.paperWidth,
+    "paperHeight": fontmetrics.paperHeight,
+    "textMargin": fontmetrics.textMargin,
+    "normalSize": fontmetrics.normalSize.size,
+    "normalSkip": fontmetrics.normalSize.baselineSkip,
+    "titleTop": frameTitleTop,
+    "titleInset": frameTitleInset,
+    "titleHeight": frameTitleHeight,
+    "titleSize": frameTitleSize,
+    "figureHeight": 0.82 * fontmetrics.textHeight - frameTitleTop - frameTitleHeight,
+    "imageOnlyHeight": 0.82 * fontmetrics.textHeight,
+    "bodyHeight": fontmetrics.bodyHeight,
+    "itemIndent": fontmetrics.itemIndent,
+    "itemSep": fontmetrics.level1ItemSep,
+    "level2TopSep": fontmetrics.level2TopSep,
+    "level2ItemSep": fontmetrics.level2ItemSep,
+    "smallSize": fontmetrics.smallSize.size,
+    "smallSkip": fontmetrics.smallSize.baselineSkip,
+    "columnPercent": 100 * fontmetrics.columnWidthRatio,
+    "smallBodySkip": fontmetrics.bodyStyles[True].level1Skip,
+    "footnoteSize": fontmetrics.footnoteSize.size,
+    "scriptSize": fontmetrics.scriptSize.size,
+    "smallLevel2Skip": fontmetrics.bodyStyles[True].level2Skip,
+    "chapterSize": 17.28,       # \LARGE
+    "titlePageSize": 24.88,     # \Huge
+    "subtitleSize": 12.0,       # \large
+}
+
+# outlines the bodies which do not fit their frame
+Script = """
+document.querySelectorAll(".body").forEach(function (body) {
+    if (body.scrollHeight > body.clientHeight + 1) body.classList.add("overflow");
+});
+"""
+
+# the first page of the deck is the title page
+firstPage = 1
+
+
+# writes the HTML preview of a deck: collects the pieces, which are joined at the end
+class HtmlPreview:
+    # params:
+    #  folder: the folder of the HTML file, which the graphics paths are relative to
+    def __init__(self, renderer, folder):
+        self.renderer = renderer
+        self.folder = folder
+        self.parts = []
+        self.page = firstPage
+        self.placeholderUrl = self.graphicsUrl(renderer.graphicsIndex.findFile(renderer.config.placeholderGraphics))
+
+    def graphicsUrl(self, path):
+        if path is None:
+            return None
+        path = os.path.relpath(path, self.folder) if not os.path.isabs(path) else path
+        return urllib.parse.quote(path.replace(os.sep, "/"))
+
+    # adds a frame, shown on pages pages of the PDF
+    def frame(self, classes, content, pages=1):
+        self.parts.append('<section class="frame{0}" id="p{1}">{2}<div class="page">{1}</div></section>\n'.format(
+                          classes, self.page, content))
+        self.page += pages
+
+    def writeTitlePage(self):
+        self.frame(" plain title-page", "<h1>{0}</h1><p>{1}</p>".format(html.escape(deckTitle), html.escape(deckSubtitle)))
+
+    def writeSlide(self, slide):
+        if isinstance(slide, ChapterTitleSlide):
+            self.frame(" plain chapter", "<p>{0}</p>".format(htmlText(slide.title)))
+        elif isinstance(slide, SummarySlide):
+            title = "<h2>{0}</h2>".format(htmlText(slide.title))
+            self.frame("", title)
+            items = "".join(["<li>{0}</li>".format(htmlText(para)) for para in slide.paragraphs])
+            # beamer shows the bullets one by one, a page each
+            self.frame("", title + '<ul class="summary">{0}</ul>'.format(items), pageCount(slide) - 1)
+        else:
+            self.writeRegularSlide(slide)
+
+    def writeRegularSlide(self, slide):
+        url = self.graphicsUrl(self.renderer.graphicsIndex.resolvePath(slide.chIndex, slide.slideIndex))
+        if url is None:
+            url = self.placeholderUrl
+        if url is not None:
+            figure = '<div class="figure"><img src="{0}" loading="lazy" alt=""></div>'.format(html.escape(url))
+        else:
+            figure = '<div class="figure"><span class="missing">{0}</span></div>'.format(html.escape(slide.graphicsName))
+        title = htmlText(slide.title)
+        if len(slide.subSlides) == 0:
+            self.frame(" image-only", "<h2>{0}</h2>{1}".format(title, figure))
+            return
+        total = len(slide.subSlides)
+        for (i, subSlide) in enumerate(slide.subSlides, 1):
+            suffix = " ({0}/{1})".format(i, total) if total > 1 else ""
+            items = []
+            for (para, subBullets) in subSlide.paragraphs:
+                items.append("<li>{0}{1}</li>".format(htmlText(para), level2Html(subBullets)))
+            body = '<div class="body{0}"><ul>{1}</ul></div>'.format(" small" if subSlide.smallFont else "", "".join(items))
+            self.frame("", "<h2>{0}{1}</h2>{2}{3}".format(title, suffix, figure, body))
+
+    def getvalue(self):
+        return ('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>{0}</title>\n'
+                '<style>{1}</style>\n</head>\n<body>\n{2}<script>{3}</script>\n</body>\n</html>\n').format(
+                html.escape("{0}: {1}".format(deckTitle, deckSubtitle)), Style, "".join(self.parts), Script)
+
+def level2Html(subBullets):
+    if len(subBullets) == 0:
+        return ""
+    if len(subBullets) <= singleColumnLinesMax:
+        return "<ul>{0}</ul>".format("".join(["<li>{0}</li>".format(htmlText(sb)) for sb in subBullets]))
+    # two columns, the 1st one taking the extra bullet (see renderLevel2Bullets)
+    half = (len(subBullets) + 1) // 2
+    columns = ["".join(["<li>{0}</li>".format(htmlText(sb)) for sb in column])
+               for column in (subBullets[:half], subBullets[half:])]
+    return '<div class="columns"><ul>{0}</ul><ul>{1}</ul></div>'.format(*columns)
+
+# returns the HTML preview of a deck
+# params:
+#  slides: an iterable of ChapterTitleSlide, SummarySlide and RegularSlide (see pipelineSlides)
+#  folder: the folder of the HTML file, which the graphics paths are relative to
+def renderPreview(renderer, slides, folder):
+    preview = HtmlPreview(renderer, folder)
+    preview.writeTitlePage()
+    with stats.stage("emit"):
+        for slide in slides:
+            preview.writeSlide(slide)
+        return preview.getvalue()
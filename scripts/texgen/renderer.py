@@ -0,0 +1,799 @@
+# -*- coding: utf-8 -*-
+
+'''
+Renders an outline into the LaTeX source of a deck.
+
+Whatever the rendering depends on is held by a Renderer, made from an
+immutable Config: the graphics index, the slide templates and the paginator.
+None of it is module state, so several renderers (say, for different decks
+or settings) can be used side by side, and importing this module does no I/O.
+'''
+
+import collections
+import copy
+import functools
+import hashlib
+import os
+import re
+
+from . import chaptercache
+from . import fontmetrics
+from . import graphicsindex
+from . import inline
+from . import pagination
+from . import slidetemplates
+from . import stats
+
+LatexIndentation = [
+    "",                                     # no indentation
+    "    ",                                 # 1-stop 
+    "        ",                             # 2-stop
+    "            ",                         # 3-stop
+    "                ",                     # 4-stop
+    "                    ",                 # 5-stop
+    "                        ",             # 6-stop
+    "                            ",         # 7-stop
+    "                                ",     # 8-stop
+    "                                    ", # 9-stop
+    "                                        " # 10-stop
+]
+
+# collects the LaTeX source in memory and takes care of the indentation, so that
+# it can be written out with one large write (or returned as a string) instead
+# of one small write per line.
+class LatexEmitter:
+    def __init__(self, indent=0):
+        self.indent = indent
+        self.parts = []
+
+    # appends a line, indented by the current number of indents
+    def line(self, text):
+        self.parts.append(LatexIndentation[self.indent] + text + "\n")
+
+    def blank(self):
+        self.parts.append("\n")
+
+    # appends text as is, e.g. an already rendered chapter
+    def write(self, text):
+        self.parts.append(text)
+
+    def getvalue(self):
+        return "".join(self.parts)
+
+    # writes everything collected so far to f, and starts over
+    def flushTo(self, f):
+        if len(self.parts) > 0:
+            f.write("".join(self.parts))
+            self.parts.clear()
+
+def countIndentations(textLine, indentationMark):
+    indentation = 0
+    pos = 0
+    while textLine.startswith(indentationMark, pos):
+        indentation += 1
+        pos += len(indentationMark)
+    return (indentation, textLine[pos:])
+
+def extractChapterIndex(line):
+    # assume the chapter index follows this pattern: "Chapter xx: ..."
+    m = re.search("Chapter \\d+:", line)
+    if m is None:
+        raise ValueError("chapter title without 'Chapter N:': {0!r}".format(line.strip()))
+    chapterTag = m.group()
+    if len(chapterTag) > 0:
+        indexTag = re.search("\\d+", chapterTag).group()
+        if len(indexTag) > 0:
+            return int(indexTag)
+    return 0
+
+# for debug use
+def printChapter(lines):
+    for (indentation, line) in lines:
+        printline = ""
+        for i in range(indentation):
+            printline += "--"
+        line = trimTextLine(line)
+        if len(line) > 0:
+            printline += line
+            print(printline)
+    #print(lines)
+    print("============================")
+
+def generateSlideChapterTitle(out, renderer, line):
+    frame = renderer.templates.get("chapter-title", LatexIndentation[out.indent])
+    out.write(frame.render(title=line))
+
+
+def generateSlideSummary(out, renderer, title, paragraphs):
+    # a slide with title only (no bullets), then a new slide with the same
+    # title, and bullets to be shown one-by-one
+    templates = renderer.templates
+    frame = templates.get("summary", LatexIndentation[out.indent])
+    item = templates.get("summary-item", frame.blockPrefix("items"))
+    items = "".join([item.render(text=para) for para in paragraphs])
+    out.write(frame.render(title=title, items=items))
+
+
+# the templates of a regular slide, resolved once for each indentation (see Renderer.regularLayout)
+RegularLayout = collections.namedtuple("RegularLayout", ["frame", "figure", "imageOnly", "imageOnlyFigure", "bodies"])
+RegularBodyLayout = collections.namedtuple("RegularBodyLayout", ["body", "item", "level2", "level2Item", "columns", "leftItem", "rightItem"])
+
+def resolveRegularLayout(templates, prefix):
+    frame = templates.get("regular", prefix)
+    imageOnly = templates.get("image-only", prefix)
+    bodies = []
+    for smallFont in [False, True]:
+        suffix = "-small" if smallFont else ""
+        body = templates.get("regular-body" + suffix, frame.blockPrefix("body"))
+        item = templates.get("regular-item" + suffix, body.blockPrefix("items"))
+        level2 = templates.get("level2", item.blockPrefix("subitems"))
+        columns = templates.get("level2-columns", item.blockPrefix("subitems"))
+        bodies.append(RegularBodyLayout(body, item,
+                                        level2, templates.get("level2-item" + suffix, level2.blockPrefix("items")),
+                                        columns, templates.get("level2-item" + suffix, columns.blockPrefix("left")),
+                                        templates.get("level2-item" + suffix, columns.blockPrefix("right"))))
+    return RegularLayout(frame, templates.get("regular-figure", frame.blockPrefix("figure")),
+                         imageOnly, templates.get("image-only-figure", imageOnly.blockPrefix("figure")),
+                         tuple(bodies))
+
+def generateSubSlidesRegular(out, renderer, title, graphicsName, subSlidesParagraphics, chIndex, slideIndex):
+    layout = renderer.regularLayout(LatexIndentation[out.indent])
+
+    if 0 == len(subSlidesParagraphics):
+        # this is a slide with title and graphics only (no body text)
+        figure = ""
+        if len(graphicsName) > 0:
+            figure = layout.imageOnlyFigure.render(graphics=graphicsName)
+        out.write(layout.imageOnly.render(title=title, figure=figure))
+        # we're done here
+        return
+
+    # the space is devided into two portions:
+    # (1) Upper portion: 82% of textheight is for graphic content (vertically centered)
+    # (2) Lower portion: 18% of textheight is for text (vertically top-aligned)
+    figure = ""
+    if len(graphicsName) > 0:
+        figure = layout.figure.render(graphics=graphicsName)
+
+    subSlideTotal = len(subSlidesParagraphics)
+    subSlideIndex = 1
+    titleSuffix = ""
+    for subSlide in subSlidesParagraphics:
+        if subSlideTotal > 1:
+            titleSuffix = " ({0}/{1})".format(subSlideIndex, subSlideTotal)
+
+        body = ""
+        if len(subSlide.paragraphs) > 0:
+            # the font size was chosen by the paginator
+            bodyLayout = layout.bodies[subSlide.smallFont]
+            items = []
+            for (para, subBullets) in subSlide.paragraphs:
+                subItems = ""
+                if len(subBullets) > 0:
+                    subItems = renderLevel2Bullets(bodyLayout, subBullets)
+                items.append(bodyLayout.item.render(text=para, subitems=subItems))
+            body = bodyLayout.body.render(items="".join(items))
+
+        out.write(layout.frame.render(title=title + titleSuffix, figure=figure, body=body))
+        subSlideIndex += 1
+
+# the most level-2 bullets written in a single column
+singleColumnLinesMax = 3
+
+def renderLevel2Bullets(bodyLayout, subBullets):
+    if len(subBullets) <= singleColumnLinesMax:
+        # if the number of level-2 bullet items is less than 3, 
+        # write all the bullets in a single column
+        item = bodyLayout.level2Item.render
+        return bodyLayout.level2.render(items="".join([item(text=sb) for sb in subBullets]))
+
+    # write all the level-2 bullets in two columns, the 1st one taking the extra bullet
+    half = (len(subBullets) + 1) // 2
+    left = "".join([bodyLayout.leftItem.render(text=sb) for sb in subBullets[:half]])
+    right = "".join([bodyLayout.rightItem.render(text=sb) for sb in subBullets[half:]])
+    return bodyLayout.columns.render(left=left, right=right)
+
+# The chapter pipeline is a chain of generators:
+#   Outline (or readLines -> tokenizeLines) -> assembleSlides -> paginateSlides -> emitSlides
+# Each stage passes immutable records to the next one and only holds on to the
+# slide being assembled, so apart from the outline itself (see outline.py) the
+# memory use does not grow with the input size. assembleSlides yields the text
+# of the outline as is; paginateSlides turns it into LaTeX (see inline.py).
+
+# a slide with the chapter name only
+ChapterTitleSlide = collections.namedtuple("ChapterTitleSlide", ["title", "chIndex"])
+# a slide as written in the outline. paraSubBullets holds the level-2 bullets of
+# each level-1 bullet in paragraphs.
+Slide = collections.namedtuple("Slide", ["title", "paragraphs", "paraSubBullets", "chIndex", "slideIndex"])
+# a slide without graphics, all paragraphs shown one-by-one on a single frame
+SummarySlide = collections.namedtuple("SummarySlide", ["title", "paragraphs"])
+# a slide with graphics, its paragraphs divided into sub slides (a tuple of pagination.SubSlide)
+RegularSlide = collections.namedtuple("RegularSlide", ["title", "graphicsName", "subSlides", "chIndex", "slideIndex"])
+
+def readLines(fin):
+    for line in fin:
+        if len(line) == 0:
+            continue
+        yield line
+
+# yields a tuple (indentation, line) for each text line
+def tokenizeLines(lines, indentationMark):
+    for line in lines:
+        yield countIndentations(line, indentationMark)
+
+# params:
+#  tokens: an iterable of tuples: (indentation, line);
+# yields a ChapterTitleSlide or a Slide as soon as it is complete.
+def assembleSlides(tokens):
+    trim = trimTextLine if stats.active is None else stats.active.timedCall("trim", trimTextLine)
+    slideTitle = ""
+    slideParagraphs = []  # this array holds all the level-1 bullet text on a slide
+    subParagraphs = []    # this array holds all the level-2 bullet text of each level-1 text
+    subBullets = []
+    chIndex = 0
+    slideIndex = 0
+    prevIndentation = 0
+    prevLineIndentation = 0  # unlike prevIndentation, this one counts the empty lines as well
+    for (indentation, line) in tokens:
+        if prevLineIndentation > 0 and indentation == 0:
+            # this is the beginning of a new chapter.
+            # generate the last slide of the current chapter before starting over
+            subParagraphs.append(tuple(subBullets))
+            if len(slideTitle) > 0:
+                yield Slide(slideTitle, tuple(slideParagraphs), tuple(subParagraphs), chIndex, slideIndex)
+            slideTitle = ""
+            slideParagraphs.clear()
+            subParagraphs.clear()
+            subBullets.clear()
+            chIndex = 0
+            slideIndex = 0
+            prevIndentation = 0
+        prevLineIndentation = indentation
+
+        line = trim(line)
+        if 0 == len(line):
+            # skip this line if it's empty
+            continue
+        if 0 == indentation:
+            # this line is the chapter title
+            chIndex = extractChapterIndex(line)
+            # generate a separate slide with chapter name only
+            yield ChapterTitleSlide(line, chIndex)
+        elif 1 == indentation:
+            # this line is the beginning of a new slide (with slide title)
+            if 2 == prevIndentation or 3 == prevIndentation:
+                subParagraphs.append(tuple(subBullets))
+            if 0 != len(slideTitle):
+                # we have collected slide title and slide paragraphs, now generate the slide
+                yield Slide(slideTitle, tuple(slideParagraphs), tuple(subParagraphs), chIndex, slideIndex)
+            # udpate the slide title for the next slide
+            slideTitle = line
+            # clear the slide paragraphs
+            slideParagraphs.clear()
+            subParagraphs.clear()
+            slideIndex += 1
+        elif 2 == indentation:
+            # this line is a paragraph inside a slide
+            if 2 == prevIndentation or 3 == prevIndentation:
+                subParagraphs.append(tuple(subBullets))
+            # clear all the level-2 bullets from previous paragraph
+            subBullets.clear()
+            slideParagraphs.append(line)
+        elif 3 == indentation:
+            subBullets.append(line)
+
+        prevIndentation = indentation
+
+    subParagraphs.append(tuple(subBullets))
+    # generate the last slide
+    if len(slideTitle) > 0:
+        yield Slide(slideTitle, tuple(slideParagraphs), tuple(subParagraphs), chIndex, slideIndex)
+
+# the inline rules applied to a line, cached since outlines repeat many lines
+# (e.g. the "Takeaway" titles)
+@functools.lru_cache(maxsize=8192)
+def transformLine(transformer, line):
+    return transformer(line)
+
+# turns each Slide into either a SummarySlide or a RegularSlide, with the
+# inline rules applied to its text. with plainText, the text is left as it
+# is, but the paragraphs are still divided as they would be with the rules
+# applied (e.g. for the slide model, see slidemodel.py).
+def paginateSlides(slides, renderer, plainText=False):
+    config = renderer.config
+    text = renderer.inlineText
+    inline = keepLine if plainText else transformLine
+    for slide in slides:
+        if isinstance(slide, ChapterTitleSlide):
+            yield ChapterTitleSlide(inline(text, slide.title), slide.chIndex)
+        elif not isinstance(slide, Slide):
+            yield slide
+        elif config.summaryKeyword in slide.title:
+            # this is a slide without graphics. the rules of the paginator do not apply.
+            # simply generate one slide for all paragraphs
+            summary = renderer.inlineSummary
+            yield SummarySlide(inline(text, slide.title),
+                               tuple(inline(summary, para) for para in slide.paragraphs))
+        else:
+            # check if a graphics file exists for this slide.
+            # - a summary slide does not have an image
+            # - a regular slide should have one (and only one) image
+            # - if a graphic name for a regular slide is missing, use a placeholder image instead.
+            graphicsName = renderer.graphicsIndex.resolve(slide.chIndex, slide.slideIndex)
+            if graphicsName is None:
+                graphicsName = config.placeholderGraphics
+            # the paragraphs are measured as LaTeX (see fontmetrics.plainText)
+            paragraphs = tuple(transformLine(text, para) for para in slide.paragraphs)
+            paraSubBullets = tuple(tuple(transformLine(text, sb) for sb in subBullets)
+                                   for subBullets in slide.paraSubBullets)
+            subSlides = renderer.paginator.paginate(paragraphs, paraSubBullets)
+            if plainText:
+                subSlides = withParagraphs(subSlides, tuple(zip(slide.paragraphs, slide.paraSubBullets)))
+            yield RegularSlide(inline(text, slide.title), graphicsName, subSlides, slide.chIndex, slide.slideIndex)
+
+def keepLine(transformer, line):
+    return line
+
+# returns the sub slides with their paragraphs replaced by those of pairs
+# (paragraph, sub bullets), in order: the paginator divides the paragraphs
+# into runs, so the sub slides take as many of them each as they had
+def withParagraphs(subSlides, pairs):
+    result = []
+    begin = 0
+    for subSlide in subSlides:
+        end = begin + len(subSlide.paragraphs)
+        result.append(subSlide._replace(paragraphs=pairs[begin:end]))
+        begin = end
+    return tuple(result)
+
+# applies the inline rules to the text of slides already paginated, e.g. the
+# plain text of a slide model (see paginateSlides), keeping their sub slides
+def transformSlides(slides, renderer):
+    text = renderer.inlineText
+    for slide in slides:
+        if isinstance(slide, ChapterTitleSlide):
+            yield ChapterTitleSlide(transformLine(text, slide.title), slide.chIndex)
+        elif isinstance(slide, SummarySlide):
+            summary = renderer.inlineSummary
+            yield SummarySlide(transformLine(text, slide.title),
+                               tuple(transformLine(summary, para) for para in slide.paragraphs))
+        else:
+            subSlides = tuple(subSlide._replace(paragraphs=tuple(
+                                  (transformLine(text, para), tuple(transformLine(text, sb) for sb in subBullets))
+                                  for (para, subBullets) in subSlide.paragraphs))
+                              for subSlide in slide.subSlides)
+            yield slide._replace(title=transformLine(text, slide.title), subSlides=subSlides)
+
+# the slides of lines (a chapter, or a whole outline), assembled and
+# paginated. with stats on, each stage is timed and the slides are counted.
+def pipelineSlides(renderer, lines, plainText=False):
+    s = stats.active
+    if s is None:
+        return paginateSlides(assembleSlides(lines), renderer, plainText)
+    return countSlides(s, renderer, s.timed("paginate", paginateSlides(s.timed("assemble", assembleSlides(lines)), renderer, plainText)))
+
+def countSlides(s, renderer, slides):
+    for slide in slides:
+        s.count("frames", frameCount(slide))
+        if isinstance(slide, ChapterTitleSlide):
+            s.count("chapters")
+        else:
+            s.count("slides")
+        if isinstance(slide, RegularSlide):
+            s.count("subSlides", len(slide.subSlides))
+            s.count("smallFont", sum(1 for subSlide in slide.subSlides if subSlide.smallFont))
+            s.count("overflows", sum(1 for subSlide in slide.subSlides if renderer.paginator.overflows(subSlide)))
+            if renderer.graphicsIndex.resolve(slide.chIndex, slide.slideIndex) is None:
+                s.count("placeholders")
+        yield slide
+
+def emitSlide(out, renderer, slide):
+    if isinstance(slide, ChapterTitleSlide):
+        generateSlideChapterTitle(out, renderer, slide.title)
+    elif isinstance(slide, SummarySlide):
+        generateSlideSummary(out, renderer, slide.title, slide.paragraphs)
+    else:
+        generateSubSlidesRegular(out, renderer, slide.title, slide.graphicsName, slide.subSlides, slide.chIndex, slide.slideIndex)
+
+# params:
+#  out: a LatexEmitter
+#  slides: an iterable of ChapterTitleSlide, SummarySlide and RegularSlide;
+def emitSlides(out, renderer, slides):
+    with stats.stage("emit"):
+        for slide in slides:
+            emitSlide(out, renderer, slide)
+
+# like emitSlides, but writes the LaTeX source to the file f one chapter at a time.
+# params:
+#  indent: the number of indents to be added to the beginning of each LaTeX output line.
+def streamSlides(f, renderer, slides, indent):
+    out = LatexEmitter(indent)
+    with stats.stage("emit"):
+        for slide in slides:
+            if isinstance(slide, ChapterTitleSlide):
+                with stats.stage("write"):
+                    out.flushTo(f)
+            emitSlide(out, renderer, slide)
+    with stats.stage("write"):
+        out.flushTo(f)
+
+# params:
+#  f: the file instane
+#  lines: a array of tuples: (indentation, line);
+#  indent: the number of indents to be added to the beginning of each LaTeX output line.
+def processChapter(f, renderer, lines, indent):
+    out = LatexEmitter(indent)
+    emitSlides(out, renderer, pipelineSlides(renderer, lines))
+    out.flushTo(f)
+
+# renders the LaTeX source of one chapter into a string
+def renderChapter(renderer, lines):
+    with stats.span("chapter"):
+        out = LatexEmitter(renderer.config.bodyIndent)
+        emitSlides(out, renderer, pipelineSlides(renderer, lines))
+        return out.getvalue()
+
+# returns the number of frames a slide is shown on
+def frameCount(slide):
+    if isinstance(slide, ChapterTitleSlide):
+        return 1
+    if isinstance(slide, SummarySlide):
+        # a title only frame, then the bullets
+        return 2
+    return max(1, len(slide.subSlides))
+
+# returns the number of pages of the PDF a slide is shown on, which differs
+# from frameCount for the summary slides, their bullets shown one by one
+def pageCount(slide):
+    if isinstance(slide, SummarySlide):
+        return 1 + max(1, len(slide.paragraphs))
+    return frameCount(slide)
+
+# renders one chapter into a cache entry: the LaTeX source, the numbers of
+# frames and pages, plus the graphics that were looked up for each slide, as
+# [chIndex, slideIndex, name or None].
+def renderChapterEntry(renderer, lines):
+    with stats.span("chapter"):
+        return slidesEntry(renderer, list(pipelineSlides(renderer, lines)))
+
+# the cache entry of the slides of a chapter, see renderChapterEntry
+def slidesEntry(renderer, slides):
+    graphics = []
+    frames = 0
+    pages = 0
+    for slide in slides:
+        if isinstance(slide, RegularSlide):
+            graphics.append([slide.chIndex, slide.slideIndex, renderer.graphicsIndex.resolve(slide.chIndex, slide.slideIndex)])
+        frames += frameCount(slide)
+        pages += pageCount(slide)
+    out = LatexEmitter(renderer.config.bodyIndent)
+    emitSlides(out, renderer, slides)
+    return {"latex": out.getvalue(), "frames": frames, "pages": pages, "graphics": graphics}
+
+# everything except the chapter text that a rendered chapter depends on,
+# including the code rendering it, so that editing the code invalidates the cache.
+def chapterCacheSalt(renderer):
+    sources = []
+    for path in [__file__, inline.__file__, pagination.__file__, fontmetrics.__file__, fontmetrics.widthTablePath,
+                 slidetemplates.__file__]:
+        with open(path, "rb") as f:
+            sources.append(hashlib.sha256(f.read()).hexdigest())
+    config = renderer.config
+    return sources + [str(config.subSlideCharLimit), str(config.subSlideParaLimit),
+            str(config.smallFontCharLimit), config.pagination, config.fit, config.summaryKeyword,
+            config.placeholderGraphics, str(config.bodyIndent), renderer.templates.digest(),
+            renderer.inlineText.digest(), renderer.inlineSummary.digest()]
+
+def chapterCacheKey(salt, lines):
+    return chaptercache.hashStrings(salt + ["{0}:{1}".format(indentation, line) for (indentation, line) in lines])
+
+
+# characters which may open a quotation right before a bracketed note, e.g. "“[ref] I will ..."
+BracketQuoteMarks = "\"“‘"
+
+BracketRegex = re.compile("[\\[\\]]")
+LegacyBracketRegexes = [
+    # stage 1
+    (re.compile("\"\\[[^\\[]*?\\]\\s"), "\""),
+    (re.compile("“\\[[^\\[]*?\\]\\s"), "“"),
+    (re.compile("‘\\[[^\\[]*?\\]\\s"), "‘"),
+    # stage 2
+    (re.compile("\\s?\\[[^\\[]*?\\]"), ""),
+]
+
+# remove anything enclosed by [ ]
+#
+# The greedy regex (which maximize the content enclosed by the brackets) fails
+# when there are multiple matched brackets in each line. e.g.:
+# "I want to remove all words in brackets[ like [this] and [[this]] and [[even] this]]. How about [hello world] weeeee".
+# The greedy regex will return "I want to remove all words in brackets weeeee"
+#
+# The original approach was a conservative regex which minimize the content within
+# brackets, run repeatly until nothing more is removed, in two stages:
+# (1) to include the succeeding whitespace if there is an opening quotation
+#     mark ahead of the bracket. e.g.
+#     "[some words] I will ..." --> "I will ..."
+#     --------------                -
+#          MATCH     -->         REPLACE
+# (2) to include the proceeding whitespace immediately before the bracket,
+#     using "\s?": a whitespace appears zero or one time. e.g.
+#     "I will [some words] go to ... " --> "I will go to ..."
+#            -------------
+#               MATCH          -->       DELETED
+# NOTE: stage 1 has to be applied before stage 2
+#
+# Almost every bracket in our outlines is a single, non-nested note. For those
+# lines a bracket-depth scanner finds all the pairs in one pass and applies both
+# stages in one go. Nested or unbalanced brackets fall back to the regex loop,
+# whose semantics are hard to reproduce exactly.
+def stripBrackets(line):
+    if "[" not in line:
+        return line.strip()
+
+    # collect the bracket pairs; bail out on nesting or unmatched brackets
+    pairs = []
+    openPos = -1
+    for m in BracketRegex.finditer(line):
+        if m.group() == "[":
+            if openPos >= 0:
+                return stripBracketsLegacy(line)
+            openPos = m.start()
+        else:
+            if openPos < 0:
+                return stripBracketsLegacy(line)
+            pairs.append((openPos, m.start()))
+            openPos = -1
+    if openPos >= 0:
+        return stripBracketsLegacy(line)
+
+    pieces = []
+    pos = 0
+    lineLen = len(line)
+    for (start, end) in pairs:
+        if start > 0 and line[start - 1] in BracketQuoteMarks \
+                and end + 1 < lineLen and line[end + 1].isspace():
+            # stage 1: keep the quotation mark, drop the succeeding whitespace
+            pieces.append(line[pos:start])
+            pos = end + 2
+        else:
+            # stage 2: drop the proceeding whitespace, unless stage 1 of the
+            # previous bracket already consumed it
+            cut = start
+            if start - 1 >= pos and line[start - 1].isspace():
+                cut = start - 1
+            pieces.append(line[pos:cut])
+            pos = end + 1
+    pieces.append(line[pos:])
+    return "".join(pieces).strip()
+
+
+def stripBracketsLegacy(line):
+    condition = True
+    lineLen = len(line)
+    while condition:
+        for (regex, repl) in LegacyBracketRegexes:
+            line = regex.sub(repl, line)
+
+        if len(line) != lineLen:
+            lineLen = len(line)
+        else:
+            line = line.strip()
+            condition = False
+    return line
+
+
+# returns the text of a line, without its numbering and bracketed notes. the
+# inline rules are applied later (see paginateSlides).
+# outlines repeat many lines (e.g. the "Takeaway" titles), and the debug printer
+# trims every line a second time, so the results are cached.
+@functools.lru_cache(maxsize=8192)
+def trimTextLine(line):
+    # trim the leading chars: "1. "
+    line = line[3:]
+
+    # trim the ending New Line char: '\n'
+    if line.endswith('\n'):
+        line = line[:-1]
+
+    return stripBrackets(line)
+
+
+# the title page of the deck
+deckTitle = "Genesis"
+deckSubtitle = "EBCSV Summer Retreat 2018"
+deckInstitute = "Evangel Bible Church of Silicon Valley"
+
+# writes the preamble of the deck, up to \begin{document}
+def writeLatexPreamble(out, config):
+    out.line("\\documentclass{beamer}")
+    out.blank()
+    out.line("\\geometry{paperwidth=160mm,paperheight=120mm}")  # increase paper size (resolution) so that small fonts are still clear
+    out.blank()
+    out.line("\\usepackage{setspace}")        # to adjust line spacing
+    out.line("\\usepackage{graphicx}")
+    folders = config.graphicsFolders
+    if config.processedGraphicsFolder is not None:
+        folders = (config.processedGraphicsFolder,) + tuple(folders)
+    out.line("\\graphicspath{" + "".join("{" + latexGraphicsPath(folder) + "}" for folder in folders) + "}")
+    out.line("\\DeclareGraphicsExtensions{" + ",".join(config.graphicsExtensions) + "}")
+    out.blank()
+    out.line("\\usepackage[T1]{fontenc}")       # use a narrower font: Computer Modern family
+    out.line("\\setbeamerfont{institute}{size=\\tiny}")
+    out.blank()
+    out.line("\\setbeamersize{text margin left=4pt, text margin right=4pt}")
+    out.blank()
+    out.line("\\title{" + deckTitle + "}")
+    out.line("\\subtitle{" + deckSubtitle + "}")
+    out.line("\\institute{" + deckInstitute + "}")
+    out.blank()
+    out.line("\\usetheme{lucid}")
+    out.line("\\begin{document}")
+
+def writeLatexTitlePage(out):
+    out.indent += 1
+    out.line("\\frame {")
+    out.indent += 1
+    out.line("\\titlepage")
+    out.indent -= 1
+    out.line("}")
+    out.indent -= 1
+
+    out.blank()
+
+def writeLatexHeading(out, config):
+    writeLatexPreamble(out, config)
+    out.blank()
+    writeLatexTitlePage(out)
+
+def writeLatexClosingFrame(out):
+    # insert an empty slide at the end of the presentation
+    out.indent += 1
+    out.line("\\begin{frame}[plain]")
+    out.indent += 1
+    out.line("\\centerline{ }")
+    out.indent -= 1
+    out.line("\\end{frame}")
+    out.indent -= 1
+    out.blank()
+
+def writeLatexTailing(out):
+    writeLatexClosingFrame(out)
+    out.line("\\end{document}")
+
+# the folders in \graphicspath are relative to where LaTeX runs, e.g. "figures" -> "./figures/"
+def latexGraphicsPath(folder):
+    folder = folder.replace(os.sep, "/")
+    if not folder.endswith("/"):
+        folder += "/"
+    if not os.path.isabs(folder) and not folder.startswith("./"):
+        folder = "./" + folder
+    return folder
+
+
+# renders an outline into the LaTeX source of a whole deck.
+# params:
+#  outline: an Outline, or an iterable of tuples (indentation, line)
+def renderDeck(renderer, outline):
+    return renderDeckSlides(renderer, pipelineSlides(renderer, outline))
+
+# renders slides, e.g. read from a slide model (see slidemodel.py), into the LaTeX source of a whole deck.
+# params:
+#  slides: an iterable of ChapterTitleSlide, SummarySlide and RegularSlide
+def renderDeckSlides(renderer, slides):
+    config = renderer.config
+    out = LatexEmitter()
+    writeLatexHeading(out, config)
+    out.indent = config.bodyIndent
+    emitSlides(out, renderer, slides)
+    out.indent = 0
+    writeLatexTailing(out)
+    return out.getvalue()
+
+
+# the defaults of Config
+summarySlideKeyword = "Takeaway"
+placeholderGraphicsFile = "placeholder"
+
+bulletSmallFontCharLimit = 185
+
+# see pagination.py
+subSlideCharLimit = 220
+subSlideParaLimit = 1
+paginationPolicy = "greedy"
+fitMeasure = "chars"
+
+# the folders with the slide graphics, and the extensions LaTeX looks for, in search order
+graphicsFolders = ("figures/",)
+graphicsExtensions = (".pdf", ".jpg", ".jpeg", ".png")
+
+indentationMark = "   "
+texBodyIndent = 1
+
+# the settings a deck is rendered with. being immutable, a Config can be shared
+# freely, e.g. between threads, and serves as a dictionary key; use _replace()
+# to derive another one. the sequences are tuples.
+#  summaryKeyword: the word in the title of a summary slide (one without graphics)
+#  placeholderGraphics: the graphics of the slides which have none of their own
+#  smallFontCharLimit, subSlideCharLimit, subSlideParaLimit, pagination, fit: see pagination.py
+#  graphicsFolders, graphicsExtensions: where the graphics are, in the order LaTeX searches them
+#  processedGraphicsFolder: resized copies of the graphics (see imagecache.py), searched first; or None
+#  templatesFolder: templates replacing the default ones of the same name (see slidetemplates.py); or None
+#  indentationMark: one level of indentation in the outline
+#  bodyIndent: the number of indents of the slides in the LaTeX source
+Config = collections.namedtuple("Config", [
+    "summaryKeyword", "placeholderGraphics",
+    "smallFontCharLimit", "subSlideCharLimit", "subSlideParaLimit", "pagination", "fit",
+    "graphicsFolders", "graphicsExtensions", "processedGraphicsFolder", "templatesFolder",
+    "indentationMark", "bodyIndent",
+], defaults=[
+    summarySlideKeyword, placeholderGraphicsFile,
+    bulletSmallFontCharLimit, subSlideCharLimit, subSlideParaLimit, paginationPolicy, fitMeasure,
+    graphicsFolders, graphicsExtensions, None, None,
+    indentationMark, texBodyIndent,
+])
+
+
+# what a Config implies: the graphics index, the templates and the paginator.
+# making one does no I/O, prepare() loads what is needed.
+class Renderer:
+    def __init__(self, config):
+        self.config = config
+        model = None
+        if config.fit == "metrics":
+            model = fontmetrics.BodyModel(singleColumnLinesMax)
+        self.paginator = pagination.Paginator(config.subSlideCharLimit, config.subSlideParaLimit,
+                                              config.smallFontCharLimit, config.pagination, model)
+        self.graphicsIndex = graphicsindex.GraphicsIndex(config.graphicsFolders, config.graphicsExtensions)
+        self.graphicsScanned = False
+        # the inline rules registered by now (see inline.py)
+        self.inlineText = inline.InlineTransformer(inline.rules, inline.textContext)
+        self.inlineSummary = inline.InlineTransformer(inline.rules, inline.summaryContext)
+        self.templates = None
+        self.layouts = {}  # indentation prefix -> RegularLayout
+        self.salt = None
+
+    # loads the templates and scans the graphics folders. later calls only
+    # list the folders modified since, so a long-running process can call
+    # this before every deck it renders.
+    # params:
+    #  manifestPath: see GraphicsIndex.scan
+    def prepare(self, manifestPath=None):
+        if self.templates is None:
+            with stats.stage("templates"):
+                self.templates = slidetemplates.SlideTemplates.load(self.config.templatesFolder)
+        with stats.stage("graphics"):
+            if self.graphicsScanned:
+                self.graphicsIndex.refresh()
+            else:
+                self.graphicsIndex.scan(manifestPath)
+                self.graphicsScanned = True
+        return self
+
+    # returns a renderer with the graphics folders modified since listed
+    # again, or self if there are none. unlike prepare(), this leaves self
+    # as it is, so renders still using it from other threads are not disturbed.
+    def refreshed(self):
+        if len(self.graphicsIndex.modifiedRoots()) == 0:
+            return self
+        renderer = copy.copy(self)
+        renderer.graphicsIndex = self.graphicsIndex.copy()
+        renderer.graphicsIndex.refresh()
+        return renderer
+
+    def regularLayout(self, prefix):
+        layout = self.layouts.get(prefix)
+        if layout is None:
+            layout = resolveRegularLayout(self.templates, prefix)
+            self.layouts[prefix] = layout
+        return layout
+
+    # see chapterCacheSalt
+    def cacheSalt(self):
+        if self.salt is None:
+            self.salt = chapterCacheSalt(self)
+        return self.salt
+
+    # the layouts hold compiled templates, which cannot be pickled, e.g. to be
+    # sent to a worker process; they are resolved again where needed
+    def __getstate__(self):
+        return dict(self.__dict__, layouts={})
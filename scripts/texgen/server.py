@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+'''
+A local HTTP service rendering outlines on demand, e.g. for a preview form:
+    python texgen.py serve --port 8040
+    curl -H "Content-Type: text/plain" --data-binary @input.txt http://127.0.0.1:8040/render
+    curl -H "Content-Type: text/plain" --data-binary @input.txt "http://127.0.0.1:8040/render?fragments=1"
+    curl http://127.0.0.1:8040/stats
+
+POST /render takes the outline as the request body (or as the "outline" field
+of a form) and returns the LaTeX source; with fragments=1, a JSON object with
+the source of each chapter as well. GET /stats returns the request latency
+counters and the state of the caches, as JSON.
+
+The templates and the graphics index stay loaded between requests, and the
+rendered chapters are kept in memory, so a request only renders the chapters
+that changed. Each request renders with a snapshot of the renderer; when a
+graphics folder changes, the next request makes a refreshed copy rather than
+updating the one other requests may be using.
+'''
+
+import http.server
+import json
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+
+from . import build
+from .outline import Outline
+from .renderer import LatexEmitter, writeLatexHeading, writeLatexTailing
+
+defaultHost = "127.0.0.1"
+defaultPort = 8040
+
+# larger request bodies are refused
+maxRequestBytes = 16 * 1024 * 1024
+
+
+# counts the requests to one route, and how long they took
+class LatencyCounter:
+    # the upper bounds of the histogram buckets, in milliseconds
+    bucketBoundsMs = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.totalSeconds = 0.0
+        self.maxSeconds = 0.0
+        self.buckets = [0] * (len(self.bucketBoundsMs) + 1)
+
+    def record(self, seconds, failed):
+        self.count += 1
+        if failed:
+            self.errors += 1
+        self.totalSeconds += seconds
+        self.maxSeconds = max(self.maxSeconds, seconds)
+        ms = 1000 * seconds
+        bucket = 0
+        while bucket < len(self.bucketBoundsMs) and ms > self.bucketBoundsMs[bucket]:
+            bucket += 1
+        self.buckets[bucket] += 1
+
+    # returns the counters as a dict, for JSON. the buckets are cumulative:
+    # "le" bound -> the requests that took at most that many milliseconds.
+    def snapshot(self):
+        buckets = {}
+        total = 0
+        for (bound, n) in zip(list(self.bucketBoundsMs) + ["+Inf"], self.buckets):
+            total += n
+            buckets[str(bound)] = total
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "meanMs": round(1000 * self.totalSeconds / self.count, 3) if self.count > 0 else None,
+            "maxMs": round(1000 * self.maxSeconds, 3),
+            "buckets": buckets,
+        }
+
+
+# what the requests share: the current renderer, the chapter cache and the
+# counters. each part is either immutable once published or guarded by a lock.
+class RenderService:
+    routes = ("render", "stats")
+
+    # params:
+    #  renderer: a prepared Renderer
+    #  cache: a MemoryChapterCache
+    def __init__(self, renderer, cache):
+        self.renderer = renderer
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.counters = {route: LatencyCounter() for route in self.routes}
+        self.started = time.monotonic()
+
+    # returns the renderer to use for a request, refreshed if a graphics folder changed
+    def currentRenderer(self):
+        with self.lock:
+            self.renderer = self.renderer.refreshed()
+            return self.renderer
+
+    # returns a tuple (latex, chapters): the LaTeX source of the deck, and the
+    # cache entry of each chapter (see renderChapterEntry)
+    def render(self, text):
+        renderer = self.currentRenderer()
+        outline = Outline.parse(text, renderer.config.indentationMark)
+        chapters = build.renderChaptersCached(renderer, outline, 1, self.cache)
+        out = LatexEmitter()
+        writeLatexHeading(out, renderer.config)
+        for entry in chapters:
+            out.write(entry["latex"])
+        writeLatexTailing(out)
+        return (out.getvalue(), chapters)
+
+    def record(self, route, seconds, failed):
+        with self.lock:
+            self.counters[route].record(seconds, failed)
+
+    def stats(self):
+        with self.lock:
+            routes = {route: counter.snapshot() for (route, counter) in self.counters.items()}
+            renderer = self.renderer
+        with self.cache.lock:
+            cache = {"entries": len(self.cache.entries), "size": self.cache.size,
+                     "hits": self.cache.hits, "misses": self.cache.misses}
+        return {
+            "uptimeSeconds": round(time.monotonic() - self.started, 3),
+            "routes": routes,
+            "chapterCache": cache,
+            "graphics": len(renderer.graphicsIndex.files),
+        }
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    server_version = "texgen"
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/stats":
+            self.handleRoute("stats", self.handleStats, url)
+        else:
+            self.sendText(404, "not found: {0}\n".format(url.path))
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/render":
+            self.handleRoute("render", self.handleRender, url)
+        else:
+            self.sendText(404, "not found: {0}\n".format(url.path))
+
+    # calls handler(url), which returns the response status, and counts the
+    # request. an exception the handler does not expect is a bug: it is
+    # answered with a 500, and its traceback printed.
+    def handleRoute(self, route, handler, url):
+        start = time.monotonic()
+        status = 500
+        try:
+            try:
+                status = handler(url)
+            except Exception:
+                traceback.print_exc()
+                status = self.sendText(500, "internal error\n")
+        finally:
+            self.server.service.record(route, time.monotonic() - start, status >= 400)
+
+    def handleStats(self, url):
+        return self.sendJson(200, self.server.service.stats())
+
+    def handleRender(self, url):
+        query = urllib.parse.parse_qs(url.query)
+        fragments = query.get("fragments", ["0"])[-1] in ("1", "true", "yes")
+        length = self.headers.get("Content-Length")
+        if length is None or not length.isdigit():
+            return self.sendText(411, "a Content-Length is required\n")
+        if int(length) > maxRequestBytes:
+            return self.sendText(413, "the outline is larger than {0} bytes\n".format(maxRequestBytes))
+        body = self.rfile.read(int(length))
+        try:
+            text = body.decode("utf-8")
+        except UnicodeDecodeError:
+            return self.sendText(400, "the outline is not UTF-8\n")
+        if self.headers.get_content_type() == "application/x-www-form-urlencoded":
+            fields = urllib.parse.parse_qs(text)
+            if "outline" not in fields:
+                return self.sendText(400, "expected the outline as the outline field of a form, or as text/plain\n")
+            text = fields["outline"][-1]
+
+        start = time.monotonic()
+        try:
+            (latex, chapters) = self.server.service.render(text)
+        except ValueError as e:
+            return self.sendText(422, "failed to render the outline: {0!r}\n".format(e))
+        timing = "render;dur={0:.1f}".format(1000 * (time.monotonic() - start))
+
+        if not fragments:
+            return self.sendText(200, latex, "text/x-tex", timing)
+        return self.sendJson(200, {
+            "latex": latex,
+            "frames": sum(entry["frames"] for entry in chapters),
+            "chapters": [{"latex": entry["latex"], "frames": entry["frames"]} for entry in chapters],
+        }, timing)
+
+    def sendText(self, status, text, contentType="text/plain", timing=None):
+        return self.sendBody(status, text.encode("utf-8"), contentType + "; charset=utf-8", timing)
+
+    def sendJson(self, status, value, timing=None):
+        return self.sendText(status, json.dumps(value, ensure_ascii=False), "application/json", timing)
+
+    def sendBody(self, status, body, contentType, timing):
+        self.send_response(status)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
+        if timing is not None:
+            self.send_header("Server-Timing", timing)
+        self.end_headers()
+        self.wfile.write(body)
+        return status
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            http.server.BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+class RenderServer(http.server.ThreadingHTTPServer):
+    def __init__(self, address, service, verbose=False):
+        http.server.ThreadingHTTPServer.__init__(self, address, RequestHandler)
+        self.service = service
+        self.verbose = verbose
+
+
+# serves until interrupted
+def serve(service, host, port, verbose):
+    with RenderServer((host, port), service, verbose) as server:
+        (host, port) = server.server_address[:2]
+        print("texgen: serving on http://{0}:{1}/ (POST /render, GET /stats)".format(host, port), file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
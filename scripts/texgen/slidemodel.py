@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+
+'''
+The slides of a deck as a tree of plain records, for the tools which need
+the parsed deck rather than its LaTeX (a search index, translations, the
+list of the graphics of each slide):
+    Chapter -> Slide -> SubSlide -> Paragraph -> sub bullets (str)
+They hold what the pipeline decided (see renderer.py): the text trimmed
+from the outline, as plain text (the inline rules turning it into LaTeX, see
+inline.py, are applied when a deck is rendered), the graphics of each slide,
+with the placeholder for the slides without any, and the division of its
+paragraphs into sub slides, with the font size of each (measured as LaTeX).
+
+A deck is written one chapter at a time, and read back the same way, in
+one of two formats (see formats):
+ - jsonl: JSON Lines, a header line, then one object per chapter, its keys
+   the fields of the records;
+ - slides: a binary file, the header (magic), then one length-prefixed
+   record per chapter, its strings UTF-8 and its numbers varints.
+Either can be rendered again (texgen.py deck.jsonl -o deck.tex), the text
+given to the inline rules, without trimming or pagination.
+'''
+
+import json
+import struct
+
+from .pagination import SubSlide as PaginatedSubSlide
+from .renderer import ChapterTitleSlide, RegularSlide, SummarySlide
+
+# the format names, and the extension of their files
+formats = {
+    "jsonl": ".jsonl",
+    "slides": ".slides",
+}
+
+# bump this whenever the fields of the records change
+modelFormatVersion = 2
+jsonFormatName = "texgen-slides"
+binaryMagic = b"TEXGENSL"
+
+# the fields of a record are its __slots__, in order; a record compares
+# equal to another of the same type with equal fields
+class Record:
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return "{0}({1})".format(type(self).__name__,
+                                 ", ".join("{0}={1!r}".format(name, getattr(self, name)) for name in self.__slots__))
+
+# a level-1 bullet and its level-2 bullets (a tuple of str)
+class Paragraph(Record):
+    __slots__ = ("text", "subBullets")
+
+    def __init__(self, text, subBullets=()):
+        self.text = text
+        self.subBullets = subBullets
+
+# the paragraphs shown on one frame (see pagination.SubSlide)
+class SubSlide(Record):
+    __slots__ = ("paragraphs", "charCount", "smallFont", "height")
+
+    def __init__(self, paragraphs, charCount, smallFont, height=None):
+        self.paragraphs = paragraphs
+        self.charCount = charCount
+        self.smallFont = smallFont
+        self.height = height
+
+# a slide: a summary slide has one sub slide, its paragraphs shown one by
+# one, and neither graphics nor a chIndex and slideIndex. the chIndex is the
+# one the graphics were looked up with, which is 0 for the slides after a
+# chapter title which was trimmed away (see assembleSlides).
+class Slide(Record):
+    __slots__ = ("title", "chIndex", "slideIndex", "graphicsName", "summary", "subSlides")
+
+    def __init__(self, title, chIndex, slideIndex, graphicsName, summary, subSlides):
+        self.title = title
+        self.chIndex = chIndex
+        self.slideIndex = slideIndex
+        self.graphicsName = graphicsName
+        self.summary = summary
+        self.subSlides = subSlides
+
+# a chapter: its title slide (the title is None for the slides before the
+# first chapter title), then its slides
+class Chapter(Record):
+    __slots__ = ("title", "chIndex", "slides")
+
+    def __init__(self, title, chIndex, slides):
+        self.title = title
+        self.chIndex = chIndex
+        self.slides = slides
+
+
+# returns the Slide of a SummarySlide or a RegularSlide
+def modelSlide(slide):
+    if isinstance(slide, SummarySlide):
+        paragraphs = tuple(Paragraph(para) for para in slide.paragraphs)
+        return Slide(slide.title, None, None, None, True,
+                     (SubSlide(paragraphs, sum(len(para) for para in slide.paragraphs), False),))
+    subSlides = tuple(SubSlide(tuple(Paragraph(para, subBullets) for (para, subBullets) in subSlide.paragraphs),
+                               subSlide.charCount, subSlide.smallFont, subSlide.height)
+                      for subSlide in slide.subSlides)
+    return Slide(slide.title, slide.chIndex, slide.slideIndex, slide.graphicsName, False, subSlides)
+
+# yields the Chapter of each chapter of slides, as soon as it is complete
+# params:
+#  slides: an iterable of ChapterTitleSlide, SummarySlide and RegularSlide (see pipelineSlides)
+def buildChapters(slides):
+    title = None
+    chIndex = 0
+    chapterSlides = []
+    for slide in slides:
+        if isinstance(slide, ChapterTitleSlide):
+            if title is not None or len(chapterSlides) > 0:
+                yield Chapter(title, chIndex, tuple(chapterSlides))
+            title = slide.title
+            chIndex = slide.chIndex
+            chapterSlides = []
+        else:
+            chapterSlides.append(modelSlide(slide))
+    if title is not None or len(chapterSlides) > 0:
+        yield Chapter(title, chIndex, tuple(chapterSlides))
+
+# yields the slides of the chapters, as the pipeline does (see emitSlides)
+def pipelineSlidesOf(chapters):
+    for chapter in chapters:
+        if chapter.title is not None:
+            yield ChapterTitleSlide(chapter.title, chapter.chIndex)
+        for slide in chapter.slides:
+            if slide.summary:
+                yield SummarySlide(slide.title, tuple(para.text for subSlide in slide.subSlides for para in subSlide.paragraphs))
+            else:
+                subSlides = tuple(PaginatedSubSlide(tuple((para.text, para.subBullets) for para in subSlide.paragraphs),
+                                                    subSlide.charCount, subSlide.smallFont, subSlide.height)
+                                  for subSlide in slide.subSlides)
+                yield RegularSlide(slide.title, slide.graphicsName, subSlides, slide.chIndex, slide.slideIndex)
+
+
+# JSON Lines
+
+def chapterToJson(chapter):
+    return {
+        "title": chapter.title,
+        "chIndex": chapter.chIndex,
+        "slides": [{
+            "title": slide.title,
+            "chIndex": slide.chIndex,
+            "slideIndex": slide.slideIndex,
+            "graphicsName": slide.graphicsName,
+            "summary": slide.summary,
+            "subSlides": [{
+                "paragraphs": [{"text": para.text, "subBullets": list(para.subBullets)} for para in subSlide.paragraphs],
+                "charCount": subSlide.charCount,
+                "smallFont": subSlide.smallFont,
+                "height": subSlide.height,
+            } for subSlide in slide.subSlides],
+        } for slide in chapter.slides],
+    }
+
+def chapterFromJson(obj):
+    return Chapter(obj["title"], obj["chIndex"], tuple(
+        Slide(s["title"], s["chIndex"], s["slideIndex"], s["graphicsName"], s["summary"], tuple(
+            SubSlide(tuple(Paragraph(p["text"], tuple(p["subBullets"])) for p in ss["paragraphs"]),
+                     ss["charCount"], ss["smallFont"], ss["height"])
+            for ss in s["subSlides"]))
+        for s in obj["slides"]))
+
+# writes the chapters to the text file f, a line each
+def writeJsonLines(f, chapters):
+    f.write(json.dumps({"format": jsonFormatName, "version": modelFormatVersion}) + "\n")
+    for chapter in chapters:
+        f.write(json.dumps(chapterToJson(chapter), ensure_ascii=False, separators=(",", ":")) + "\n")
+
+# yields the chapters of the text file f, as they are read.
+# raises ValueError if f is not a JSON Lines deck of this version.
+def readJsonLines(f):
+    header = json.loads(f.readline() or "null")
+    if not isinstance(header, dict) or header.get("format") != jsonFormatName:
+        raise ValueError("not a JSON Lines deck")
+    if header.get("version") != modelFormatVersion:
+        raise ValueError("a JSON Lines deck of version {0}, expected {1}".format(header.get("version"), modelFormatVersion))
+    for line in f:
+        if len(line.strip()) > 0:
+            try:
+                yield chapterFromJson(json.loads(line))
+            except (KeyError, TypeError) as e:
+                raise ValueError("malformed chapter: {0!r}".format(e))
+
+
+# the binary format: the optional fields (None) are stored as 0, and the
+# others shifted by one
+
+doubleStruct = struct.Struct("<d")
+
+def putVarint(buf, n):
+    while n >= 0x80:
+        buf.append((n & 0x7f) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+def putString(buf, s):
+    data = s.encode("utf-8")
+    putVarint(buf, len(data))
+    buf += data
+
+def putOptional(buf, value, put):
+    if value is None:
+        buf.append(0)
+    else:
+        buf.append(1)
+        put(buf, value)
+
+def encodeChapter(chapter):
+    buf = bytearray()
+    putOptional(buf, chapter.title, putString)
+    putVarint(buf, chapter.chIndex)
+    putVarint(buf, len(chapter.slides))
+    for slide in chapter.slides:
+        putString(buf, slide.title)
+        putOptional(buf, slide.chIndex, putVarint)
+        putOptional(buf, slide.slideIndex, putVarint)
+        putOptional(buf, slide.graphicsName, putString)
+        buf.append(slide.summary)
+        putVarint(buf, len(slide.subSlides))
+        for subSlide in slide.subSlides:
+            putVarint(buf, subSlide.charCount)
+            buf.append(subSlide.smallFont)
+            putOptional(buf, subSlide.height, lambda b, height: b.extend(doubleStruct.pack(height)))
+            putVarint(buf, len(subSlide.paragraphs))
+            for para in subSlide.paragraphs:
+                putString(buf, para.text)
+                putVarint(buf, len(para.subBullets))
+                for sb in para.subBullets:
+                    putString(buf, sb)
+    return bytes(buf)
+
+# reads the fields of a record, in order
+class BinaryReader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def byte(self):
+        b = self.data[self.pos]
+        self.pos += 1
+        return b
+
+    def varint(self):
+        n = 0
+        shift = 0
+        while True:
+            b = self.byte()
+            n |= (b & 0x7f) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    def string(self):
+        length = self.varint()
+        end = self.pos + length
+        if end > len(self.data):
+            raise IndexError("string past the end of the record")
+        s = self.data[self.pos:end].decode("utf-8")
+        self.pos = end
+        return s
+
+    def double(self):
+        (value,) = doubleStruct.unpack_from(self.data, self.pos)
+        self.pos += doubleStruct.size
+        return value
+
+    def optional(self, read):
+        return read() if self.byte() != 0 else None
+
+def decodeChapter(data):
+    r = BinaryReader(data)
+    title = r.optional(r.string)
+    chIndex = r.varint()
+    slides = []
+    for i in range(r.varint()):
+        slideTitle = r.string()
+        slideChIndex = r.optional(r.varint)
+        slideIndex = r.optional(r.varint)
+        graphicsName = r.optional(r.string)
+        summary = r.byte() != 0
+        subSlides = []
+        for j in range(r.varint()):
+            charCount = r.varint()
+            smallFont = r.byte() != 0
+            height = r.optional(r.double)
+            paragraphs = []
+            for k in range(r.varint()):
+                text = r.string()
+                paragraphs.append(Paragraph(text, tuple(r.string() for n in range(r.varint()))))
+            subSlides.append(SubSlide(tuple(paragraphs), charCount, smallFont, height))
+        slides.append(Slide(slideTitle, slideChIndex, slideIndex, graphicsName, summary, tuple(subSlides)))
+    return Chapter(title, chIndex, tuple(slides))
+
+# writes the chapters to the binary file f, a record each
+def writeBinary(f, chapters):
+    header = bytearray(binaryMagic)
+    putVarint(header, modelFormatVersion)
+    f.write(header)
+    for chapter in chapters:
+        record = bytearray()
+        data = encodeChapter(chapter)
+        putVarint(record, len(data))
+        f.write(record + data)
+
+# yields the chapters of the binary file f, as they are read.
+# raises ValueError if f is not a binary deck of this version, or is truncated.
+def readBinary(f):
+    if f.read(len(binaryMagic)) != binaryMagic:
+        raise ValueError("not a binary deck")
+    version = readVarint(f)
+    if version != modelFormatVersion:
+        raise ValueError("a binary deck of version {0}, expected {1}".format(version, modelFormatVersion))
+    while True:
+        length = readVarint(f)
+        if length is None:
+            return
+        data = f.read(length)
+        if len(data) != length:
+            raise ValueError("truncated deck")
+        try:
+            yield decodeChapter(data)
+        except (IndexError, struct.error, UnicodeDecodeError) as e:
+            raise ValueError("malformed chapter: {0!r}".format(e))
+
+# reads a varint from the file f; returns None at the end of the file
+def readVarint(f):
+    n = 0
+    shift = 0
+    while True:
+        b = f.read(1)
+        if len(b) == 0:
+            if shift > 0:
+                raise ValueError("truncated deck")
+            return None
+        n |= (b[0] & 0x7f) << shift
+        if b[0] < 0x80:
+            return n
+        shift += 7
+
+
+# returns the format of the file at path by its extension, or None if it is not a deck
+def formatOf(path):
+    for (name, ext) in formats.items():
+        if path.endswith(ext):
+            return name
+    return None
+
+# writes the chapters to the file f, text for jsonl, binary for slides
+def writeChapters(f, chapters, modelFormat):
+    if modelFormat == "jsonl":
+        writeJsonLines(f, chapters)
+    else:
+        writeBinary(f, chapters)
+
+# yields the chapters of the deck at path, in the format of its extension
+def readChapters(path):
+    if formatOf(path) == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            yield from readJsonLines(f)
+    else:
+        with open(path, "rb") as f:
+            yield from readBinary(f)
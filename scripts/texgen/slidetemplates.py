@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+'''
+The layouts of the slides, as LaTeX templates compiled into format strings.
+
+Each layout is a file in the templates folder, e.g. templates/regular.tex,
+written at no indentation. A template refers to its slots as ${name}. A slot
+which takes a whole line is a block slot: it is filled with other rendered
+templates, indented like the slot, and its line is dropped when the block is
+empty. Everything else is copied as it is; write $$ for a literal $.
+
+A template is compiled once per indentation it is used at, into a function
+which concatenates its text and the slot values.
+'''
+
+import hashlib
+import keyword
+import os
+import re
+
+defaultTemplatesFolder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+templateExtension = ".tex"
+
+SlotRegex = re.compile("\\$(?:(\\$)|\\{(\\w+)\\}|(\\w+))")
+BlockSlotRegex = re.compile("^([ \\t]*)\\$(?:\\{(\\w+)\\}|(\\w+))[ \\t]*\\n?$")
+
+
+class CompiledTemplate:
+    # params:
+    #  parts: the text of the template, alternating literal text and slot
+    #    names, starting with literal text
+    #  blockPrefixes: the indentation of each block slot
+    def __init__(self, parts, blockPrefixes):
+        self.parts = parts
+        self.blockPrefixes = blockPrefixes
+        self.render = compileRender(parts)
+
+    # returns the indentation of the content of a block slot. templates which
+    # leave the slot out ignore its content, so any indentation will do.
+    def blockPrefix(self, name, default=""):
+        return self.blockPrefixes.get(name, default)
+
+
+# turns the parts of a template into a function concatenating them, e.g.
+#   def render(*, title="", **unused): return '\\frametitle{' + title + '}\n'
+# slots left out by the caller are empty, and arguments for slots the
+# template does not have are ignored, so a user template may drop any slot.
+def compileRender(parts):
+    slots = []
+    terms = []
+    for (i, part) in enumerate(parts):
+        if i % 2 == 0:
+            if len(part) > 0:
+                terms.append(repr(part))
+            continue
+        if not part.isidentifier() or keyword.iskeyword(part):
+            raise ValueError("invalid template slot name: " + part)
+        if part not in slots:
+            slots.append(part)
+        terms.append(part)
+    params = "".join([name + "=\"\", " for name in slots])
+    source = "def render(*, {0}**unused):\n    return {1}\n".format(params, " + ".join(terms) or "\"\"")
+    namespace = {}
+    exec(source, namespace)
+    return namespace["render"]
+
+
+# compiles the source of a template, to be used at the indentation prefix
+def compileTemplate(source, prefix):
+    parts = [""]
+    blockPrefixes = {}
+    for line in source.splitlines(True):
+        m = BlockSlotRegex.match(line)
+        if m is not None:
+            name = m.group(2) or m.group(3)
+            blockPrefixes[name] = prefix + m.group(1)
+            parts += [name, ""]
+            continue
+        if line.strip() == "":
+            # blank lines are not indented
+            parts[-1] += line.lstrip(" \t")
+            continue
+        parts[-1] += prefix
+        pos = 0
+        for m in SlotRegex.finditer(line):
+            parts[-1] += line[pos:m.start()]
+            if m.group(1):
+                parts[-1] += "$"
+            else:
+                parts += [m.group(2) or m.group(3), ""]
+            pos = m.end()
+        parts[-1] += line[pos:]
+    return CompiledTemplate(parts, blockPrefixes)
+
+
+class SlideTemplates:
+    # params:
+    #  sources: layout name -> template source
+    def __init__(self, sources):
+        self.sources = dict(sources)
+        self.compiled = {}  # (name, prefix) -> CompiledTemplate
+
+    # loads the default templates, replacing any of them by the files of the
+    # same name found in userFolder
+    @classmethod
+    def load(cls, userFolder=None):
+        sources = {}
+        for folder in [defaultTemplatesFolder, userFolder]:
+            if folder is None:
+                continue
+            for filename in sorted(os.listdir(folder)):
+                (name, ext) = os.path.splitext(filename)
+                if ext != templateExtension:
+                    continue
+                with open(os.path.join(folder, filename), encoding="utf-8") as f:
+                    source = f.read()
+                if not source.endswith("\n"):
+                    source += "\n"
+                sources[name] = source
+        return cls(sources)
+
+    # returns the template compiled for the indentation prefix
+    def get(self, name, prefix):
+        key = (name, prefix)
+        template = self.compiled.get(key)
+        if template is None:
+            template = compileTemplate(self.sources[name], prefix)
+            self.compiled[key] = template
+        return template
+
+    # the compiled templates are functions, which cannot be pickled, e.g. to
+    # be sent to a worker process; they are compiled again where needed
+    def __getstate__(self):
+        return {"sources": self.sources, "compiled": {}}
+
+    # a hash of all the template sources, e.g. for cache keys
+    def digest(self):
+        h = hashlib.sha256()
+        for name in sorted(self.sources):
+            h.update(name.encode("utf-8"))
+            h.update(b"\0")
+            h.update(self.sources[name].encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
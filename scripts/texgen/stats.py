@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+'''
+Where the time of a build goes (texgen.py --stats): the wall time of each
+stage, and the numbers of lines, slides, sub slides and frames produced.
+With --profile trace.json, the stages are also written as a Chrome trace
+(chrome://tracing, or https://ui.perfetto.dev).
+
+The stages are timed by hooks in the pipeline. Each hook checks active once
+per deck or chapter (or, for trimTextLine, once per chapter to decide which
+function to call), and does nothing else while it is None, so the hooks stay
+in place at no cost. The time of a stage excludes the stages it pulls from:
+the slides flow through lazy generators (see renderer.py), so the stages
+being run are kept on a stack, and the clock is charged to the one on top.
+
+A worker process has its own Stats, which it sends back with each result
+(see build.py), so the times of the stages add up over the processes.
+A Stats is not thread-safe; the server does not use one.
+'''
+
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+# the stages, in the order of the report, and what they do
+stages = {
+    "templates": "loading the slide templates",
+    "graphics": "listing the graphics folders",
+    "read": "reading and tokenizing the outline",
+    "cache": "looking up the chapter cache",
+    "trim": "trimming the lines (trimTextLine)",
+    "assemble": "assembling the slides",
+    "paginate": "inline rules, graphics lookup, fitting the sub slides",
+    "emit": "writing the LaTeX source, or the HTML preview",
+    "write": "writing the output file",
+    "compile": "compiling the chapters into PDFs (--format pdf)",
+    "merge": "merging the PDFs of the chapters",
+    "wait": "waiting for the worker processes",
+}
+
+class Stats:
+    # params:
+    #  tracing: whether to record the stages as trace events as well (see writeTrace)
+    def __init__(self, tracing=False):
+        self.seconds = collections.Counter()  # stage -> seconds
+        self.counts = collections.Counter()
+        self.events = [] if tracing else None
+        self.stack = []
+        self.mark = 0.0
+        self.workers = set()  # the processes whose stats were merged
+
+    def enter(self, stage):
+        now = time.perf_counter()
+        if len(self.stack) > 0:
+            self.seconds[self.stack[-1]] += now - self.mark
+        self.stack.append(stage)
+        self.mark = now
+
+    def leave(self):
+        now = time.perf_counter()
+        self.seconds[self.stack.pop()] += now - self.mark
+        self.mark = now
+
+    # times the block as stage (and, if tracing, records it as an event)
+    @contextlib.contextmanager
+    def stage(self, name):
+        self.enter(name)
+        start = self.mark
+        try:
+            yield
+        finally:
+            self.leave()
+            if self.events is not None:
+                self.addEvent(name, start, self.mark, None)
+
+    # records the block as a trace event only, e.g. a chapter, which is not a stage
+    @contextlib.contextmanager
+    def span(self, name, args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.events is not None:
+                self.addEvent(name, start, time.perf_counter(), args)
+
+    # yields the items of iterable, charging the time it takes to produce
+    # them to stage
+    def timed(self, stage, iterable):
+        iterator = iter(iterable)
+        while True:
+            self.enter(stage)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.leave()
+            yield item
+
+    # returns fn, charging the time of its calls to stage
+    def timedCall(self, stage, fn):
+        def call(*args):
+            self.enter(stage)
+            try:
+                return fn(*args)
+            finally:
+                self.leave()
+        return call
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def addEvent(self, name, start, end, args):
+        event = {"name": name, "ph": "X", "ts": round(1e6 * start, 1), "dur": round(1e6 * (end - start), 1),
+                 "pid": os.getpid(), "tid": threading.get_ident()}
+        if args is not None:
+            event["args"] = args
+        self.events.append(event)
+
+    # forgets the times and counts, e.g. between the rebuilds of watch mode;
+    # the trace events are kept
+    def clear(self):
+        self.seconds.clear()
+        self.counts.clear()
+
+    # returns what was collected since the last call, to be merged into the
+    # Stats of another process, and starts over
+    def take(self):
+        snapshot = {"pid": os.getpid(), "seconds": dict(self.seconds), "counts": dict(self.counts),
+                    "events": self.events}
+        self.clear()
+        if self.events is not None:
+            self.events = []
+        return snapshot
+
+    def merge(self, snapshot):
+        self.workers.add(snapshot["pid"])
+        self.seconds.update(snapshot["seconds"])
+        self.counts.update(snapshot["counts"])
+        if self.events is not None and snapshot["events"] is not None:
+            self.events.extend(snapshot["events"])
+
+    # prints the time of each stage and the counts to file
+    # params:
+    #  title: what was built, e.g. the output file
+    #  seconds: the wall time of the build
+    def report(self, file, title, seconds):
+        print("texgen: stats for {0}: {1:.1f} ms".format(title, 1000 * seconds), file=file)
+        names = [name for name in stages if name in self.seconds] + \
+                sorted(name for name in self.seconds if name not in stages)
+        for name in names:
+            print("texgen:   {0:<10} {1:9.1f} ms  {2}".format(name, 1000 * self.seconds[name], stages.get(name, "")), file=file)
+        if len(self.workers) > 0:
+            print("texgen:   (the times of {0} worker processes are added up)".format(len(self.workers)), file=file)
+        else:
+            other = seconds - sum(self.seconds.values())
+            print("texgen:   {0:<10} {1:9.1f} ms  {2}".format("other", 1000 * max(0.0, other), "the rest"), file=file)
+        c = self.counts
+        print("texgen:   {0} lines, {1} chapters rendered, {2} from the cache; "
+              "{3} slides, {4} sub slides, {5} frames".format(c["lines"], c["chapters"], c["cachedChapters"],
+              c["slides"], c["subSlides"], c["frames"]), file=file)
+        print("texgen:   {0} slides with the placeholder graphics, {1} sub slides in the small font, "
+              "{2} predicted to overflow".format(c["placeholders"], c["smallFont"], c["overflows"]), file=file)
+        if c["cachedChapters"] > 0:
+            print("texgen:   (the slides of the chapters from the cache are not counted)", file=file)
+
+    # writes the trace events to the file at path, in the Chrome trace format
+    def writeTrace(self, path):
+        names = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "texgen worker {0}".format(pid)}}
+                 for pid in sorted(self.workers)]
+        names.append({"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "texgen"}})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": names + (self.events or []), "displayTimeUnit": "ms"}, f)
+
+
+# the Stats of this process, or None (the default) to collect nothing
+active = None
+
+def enable(tracing=False):
+    global active
+    active = Stats(tracing)
+    return active
+
+def disable():
+    global active
+    active = None
+
+nullContext = contextlib.nullcontext()
+
+# the hooks, for the places run once per deck or chapter: each does nothing
+# unless stats are on
+
+def stage(name):
+    return nullContext if active is None else active.stage(name)
+
+def span(name, args=None):
+    return nullContext if active is None else active.span(name, args)
+
+def timed(stage, iterable):
+    return iterable if active is None else active.timed(stage, iterable)
+
+def count(name, n=1):
+    if active is not None:
+        active.counts[name] += n
+
+# see Stats.take; None if stats are off
+def take():
+    return None if active is None else active.take()
+
+def merge(snapshot):
+    if active is not None and snapshot is not None:
+        active.merge(snapshot)
+
+# how a worker process is to collect stats: None for not at all, or whether to trace
+def workerOptions():
+    return None if active is None else active.events is not None
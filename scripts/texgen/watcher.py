@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+'''
+Reports changes to a set of files and folders. On Linux the kernel's inotify
+interface is used (through ctypes, no extra packages needed); elsewhere, or if
+inotify is unavailable, the watched paths are polled.
+
+Both watchers report a list of FileEvent. A folder event names the entry that
+was added/modified or removed; a file event names the watched file itself.
+'''
+
+import collections
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+FileEvent = collections.namedtuple("FileEvent", ["path", "removed"])
+
+# from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+InotifyEventHeader = struct.Struct("iIII")  # wd, mask, cookie, len
+InotifyWatchMask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+InotifyRemovedMask = IN_MOVED_FROM | IN_DELETE
+
+
+class InotifyWatcher:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.addWatch = libc.inotify_add_watch
+        self.addWatch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # wd -> (folder, the only name of interest or None for all entries)
+        self.watches = {}
+
+    def watch(self, folder, name):
+        wd = self.addWatch(self.fd, os.fsencode(folder), InotifyWatchMask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed", folder)
+        if wd in self.watches and self.watches[wd][1] != name:
+            # the same folder is watched as a whole and for a single file
+            name = None
+        self.watches[wd] = (folder, name)
+
+    # a file is watched through its folder, so that editors which save by
+    # writing a new file and renaming it over the old one are noticed as well.
+    def watchFile(self, path):
+        self.watch(os.path.dirname(path) or ".", os.path.basename(path))
+
+    def watchFolder(self, folder):
+        self.watch(folder, None)
+
+    # waits up to timeout seconds (forever if None) and returns the events
+    def read(self, timeout=None):
+        (ready, _, _) = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            (wd, mask, cookie, nameLen) = InotifyEventHeader.unpack_from(data, offset)
+            offset += InotifyEventHeader.size
+            name = os.fsdecode(data[offset:offset + nameLen].rstrip(b"\0"))
+            offset += nameLen
+            if wd not in self.watches or len(name) == 0:
+                continue
+            (folder, wanted) = self.watches[wd]
+            if wanted is not None and name != wanted:
+                continue
+            events.append(FileEvent(os.path.join(folder, name), (mask & InotifyRemovedMask) != 0))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.files = {}    # path -> (mtime, size) or None if missing
+        self.folders = {}  # folder -> {name: (mtime, size)}
+
+    def statFile(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def listFolder(self, folder):
+        entries = {}
+        try:
+            with os.scandir(folder) as it:
+                for e in it:
+                    if e.is_file():
+                        st = e.stat()
+                        entries[e.name] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+        return entries
+
+    def watchFile(self, path):
+        self.files[path] = self.statFile(path)
+
+    def watchFolder(self, folder):
+        self.folders[folder] = self.listFolder(folder)
+
+    # the entries of the folders are listed every time, since a file written
+    # in place does not change the modification time of its folder
+    def poll(self):
+        events = []
+        for (path, prevStat) in self.files.items():
+            st = self.statFile(path)
+            if st != prevStat:
+                self.files[path] = st
+                events.append(FileEvent(path, st is None))
+        for (folder, prevEntries) in self.folders.items():
+            entries = self.listFolder(folder)
+            for (name, entryStat) in entries.items():
+                if prevEntries.get(name) != entryStat:
+                    events.append(FileEvent(os.path.join(folder, name), False))
+            for name in prevEntries:
+                if name not in entries:
+                    events.append(FileEvent(os.path.join(folder, name), True))
+            self.folders[folder] = entries
+        return events
+
+    def read(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            events = self.poll()
+            if len(events) > 0:
+                return events
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, max(0, deadline - time.monotonic()))
+            time.sleep(delay)
+
+    def close(self):
+        pass
+
+
+# returns an InotifyWatcher if the platform supports it, a PollingWatcher otherwise
+def createWatcher():
+    try:
+        return InotifyWatcher()
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+'''
+Tests of the inline rules (see texgen/inline.py).
+    python -m pytest tests
+'''
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from texgen import inline
+
+class InlineTest(unittest.TestCase):
+    def setUp(self):
+        self.text = inline.InlineTransformer(inline.rules, inline.textContext)
+        self.summary = inline.InlineTransformer(inline.rules, inline.summaryContext)
+
+    def testEscapesSpecials(self):
+        self.assertEqual(self.text("Tom & Jerry pay 5% for #1 of x_y"), "Tom \\& Jerry pay 5\\% for \\#1 of x\\_y")
+
+    # an outline which compiled before the specials were escaped wrote them escaped
+    def testLeavesEscapedSpecials(self):
+        self.assertEqual(self.text("Tom \\& Jerry pay 5\\% and \\#1 of x\\_y"), "Tom \\& Jerry pay 5\\% and \\#1 of x\\_y")
+
+    def testLeavesMath(self):
+        self.assertEqual(self.text("Tom \\& Jerry pay 5\\% and $x$"), "Tom \\& Jerry pay 5\\% and $x$")
+        self.assertEqual(self.text("$x_1 + y'$ and x_1"), "$x_1 + y'$ and x\\_1")
+        self.assertEqual(self.text("*see $a_b$*"), "\\emph{see $a_b$}")
+
+    def testLeavesDollarSign(self):
+        self.assertEqual(self.text("costs $5"), "costs $5")
+        self.assertEqual(self.text("costs \\$5"), "costs \\$5")
+
+    def testQuotesAndReferences(self):
+        self.assertEqual(self.text("“he said” Gen 45:4"), "{\\textquotedblleft}he said{\\textquotedblright} Gen~45:4")
+
+    def testBoldfaceOnSummaries(self):
+        self.assertEqual(self.summary("the LORD said"), "the \\textbf{LORD} said")
+        self.assertEqual(self.text("the LORD said"), "the LORD said")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+'''
+Tests of the Outline over UTF-8 bytes (see texgen/outline.py), and of the
+outline streamed from stdin (see StreamedOutline in texgen/build.py).
+    python -m pytest tests
+'''
+
+import io
+import os
+import pickle
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from texgen import build, outline, renderer
+
+text = "1. Chapter 1\n   1. Slide\n      1. “quoted”\n1. Chapter 2\n   1. Slide\n      1. bad \udcff byte\n"
+
+class OutlineTest(unittest.TestCase):
+    def parse(self, text):
+        return outline.Outline.parse(text.encode("utf-8", "surrogateescape"), renderer.indentationMark)
+
+    def testDecodesLines(self):
+        lines = self.parse(text.replace("\udcff", "é"))
+        self.assertEqual(list(lines), list(outline.Outline.parse(text.replace("\udcff", "é"), renderer.indentationMark)))
+        self.assertEqual(lines.line(2), "1. “quoted”\n")
+
+    def testReportsInvalidLine(self):
+        lines = self.parse(text)
+        with self.assertRaisesRegex(ValueError, "^line 6 is not valid UTF-8"):
+            list(lines)
+        with self.assertRaisesRegex(ValueError, "^line 6 is not valid UTF-8"):
+            lines.line(5)
+
+    def testReportsInvalidLineOfChapter(self):
+        # the line is numbered in the whole outline, also in a worker process
+        chapter = pickle.loads(pickle.dumps(list(self.parse(text).chapters())[1]))
+        with self.assertRaisesRegex(ValueError, "^line 6 is not valid UTF-8"):
+            list(chapter)
+
+    def testStreamedMatchesOutline(self):
+        # (with a blank line, which starts a chapter after an indented one)
+        streamText = text.replace("\udcff", "é") + "\n1. Chapter 3\n"
+        def stream():
+            return build.StreamedOutline(io.StringIO(streamText, newline="\n"), renderer.indentationMark)
+        lines = self.parse(streamText)
+        self.assertEqual(list(stream()), list(lines))
+        self.assertEqual([list(chapter) for chapter in stream().chapters()], [list(chapter) for chapter in lines.chapters()])
+
+    def testStreamedReportsInvalidInput(self):
+        f = io.TextIOWrapper(io.BytesIO(text.encode("utf-8", "surrogateescape")), encoding="utf-8", newline="\n")
+        with self.assertRaisesRegex(ValueError, "^the input is not valid UTF-8"):
+            list(build.StreamedOutline(f, renderer.indentationMark))
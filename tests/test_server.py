@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+'''
+Tests of the HTTP render service (see texgen/server.py), served on a free
+port of 127.0.0.1 for the duration of the tests.
+    python -m pytest tests
+'''
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import texgen
+from texgen import chaptercache, renderer, server
+
+outline = "1. Chapter 1: Joseph\n   1. Slide one\n      1. A paragraph.\n1. Chapter 2: Jacob\n   1. Slide two\n      1. Another paragraph.\n"
+
+class ServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp()
+        cls.config = renderer.Config(graphicsFolders=(cls.folder,))
+        service = server.RenderService(renderer.Renderer(cls.config).prepare(),
+                                       chaptercache.MemoryChapterCache(1024 * 1024))
+        cls.server = server.RenderServer(("127.0.0.1", 0), service)
+        cls.url = "http://127.0.0.1:{0}".format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+        shutil.rmtree(cls.folder)
+
+    # returns a tuple (status, headers, body)
+    def request(self, path, data=None):
+        headers = {"Content-Type": "text/plain"} if data is not None else {}
+        req = urllib.request.Request(self.url + path, data=data, headers=headers)
+        try:
+            with urllib.request.urlopen(req) as response:
+                return (response.status, response.headers, response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            return (e.code, e.headers, e.read().decode("utf-8"))
+
+    def testRender(self):
+        (status, headers, body) = self.request("/render", outline.encode("utf-8"))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers.get_content_type(), "text/x-tex")
+        self.assertEqual(body, texgen.render(outline, self.config))
+
+    def testRenderFragments(self):
+        (status, headers, body) = self.request("/render?fragments=1", outline.encode("utf-8"))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers.get_content_type(), "application/json")
+        self.assertIn("Server-Timing", headers)
+        result = json.loads(body)
+        self.assertEqual(result["latex"], texgen.render(outline, self.config))
+        self.assertEqual(len(result["chapters"]), 2)
+        self.assertIn("".join(chapter["latex"] for chapter in result["chapters"]), result["latex"])
+        self.assertEqual(result["frames"], sum(chapter["frames"] for chapter in result["chapters"]))
+
+    def testRenderFailure(self):
+        # a chapter title without "Chapter N:"
+        (status, headers, body) = self.request("/render", "1. Joseph\n   1. Slide\n".encode("utf-8"))
+        self.assertEqual(status, 422)
+        self.assertTrue(body.startswith("failed to render the outline"))
+        self.assertIn("Chapter N:", body)
+
+    def testInternalError(self):
+        service = self.server.service
+        def fail(text):
+            raise AttributeError("a bug")
+        service.render = fail
+        try:
+            (status, headers, body) = self.request("/render", outline.encode("utf-8"))
+        finally:
+            del service.render
+        self.assertEqual(status, 500)
+
+    def testStats(self):
+        self.request("/render", outline.encode("utf-8"))
+        self.request("/render", b"\xff")
+        (status, headers, body) = self.request("/stats")
+        self.assertEqual(status, 200)
+        stats = json.loads(body)
+        render = stats["routes"]["render"]
+        self.assertGreaterEqual(render["count"], 2)
+        self.assertGreaterEqual(render["errors"], 1)
+        self.assertEqual(render["buckets"]["+Inf"], render["count"])
+        self.assertGreaterEqual(stats["chapterCache"]["entries"], 2)
+
+    def testNotFound(self):
+        self.assertEqual(self.request("/nowhere")[0], 404)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+'''
+Tests trimTextLine and the inline rules against the regex loop they replaced
+(the trimTextLine of the original texgen.py), on the lines of trim_corpus.txt:
+bracketed notes, nested and unbalanced brackets, quotation marks and
+whitespace, each line without its "1. " numbering.
+    python -m pytest tests
+'''
+
+import os
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from texgen import inline, renderer
+
+corpusPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trim_corpus.txt")
+
+# the original trimTextLine
+def legacyTrimTextLine(line):
+    line = line[3:]
+    if line.endswith('\n'):
+        line = line[:-1]
+    line = line.replace("…", "...")
+    condition = True
+    lineLen = len(line)
+    while condition:
+        line = re.sub("\"\\[[^\\[]*?\\]\\s", "\"", line)
+        line = re.sub("“\\[[^\\[]*?\\]\\s", "“", line)
+        line = re.sub("‘\\[[^\\[]*?\\]\\s", "‘", line)
+        line = re.sub("\\s?\\[[^\\[]*?\\]", "", line)
+        if len(line) != lineLen:
+            lineLen = len(line)
+        else:
+            line = line.strip()
+            condition = False
+    line = line.replace("“", "{\\textquotedblleft}")
+    line = line.replace("”", "{\\textquotedblright}")
+    line = line.replace("‘", "{\\textquoteleft}")
+    line = line.replace("’", "{\\textquoteright}")
+    line = line.replace("\"", "\\symbol{34}")
+    line = line.replace("'", "\\symbol{39}")
+    return line.strip()
+
+class TrimTest(unittest.TestCase):
+    def testMatchesLegacy(self):
+        transform = inline.InlineTransformer(inline.rules, inline.textContext)
+        with open(corpusPath, encoding="utf-8", newline="") as f:
+            lines = f.read().split("\n")[:-1]
+        self.assertGreater(len(lines), 1000)
+        for (lineIndex, text) in enumerate(lines, 1):
+            line = "1. " + text + "\n"
+            with self.subTest(line=lineIndex, text=text):
+                self.assertEqual(transform(renderer.trimTextLine(line)), legacyTrimTextLine(line))
+
+    def testFallsBackOnNesting(self):
+        line = "1. I want to remove all words in brackets[ like [this] and [[this]] and [[even] this]]. How about [hello world] weeeee\n"
+        self.assertEqual(renderer.trimTextLine(line), "I want to remove all words in brackets. How about weeeee")